@@ -8,7 +8,6 @@ This replaces both the ``collect`` and ``label`` steps for PDF form pipelines.
 from __future__ import annotations
 
 import random
-import re
 import sys
 import urllib.request
 from pathlib import Path
@@ -20,6 +19,7 @@ from faker import Faker
 # Ensure repo root is importable
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
 
+from shared.forms import classify_field
 from shared.utils import PipelineError, clamp, load_config, pdf_rect_to_yolo
 
 # ---------------------------------------------------------------------------
@@ -35,49 +35,9 @@ RENDER_DPI = 200  # render resolution — higher = more detail but larger images
 CHECKBOX_PAD_FACTOR = 1.0  # expand each side by this multiple of the original size
                            # 1.0 → 3× total size (25px → ~75px), well within YOLO range
 
-# Heuristic patterns to classify text fields more precisely
-_DATE_PATTERNS = re.compile(r"(date|dob|birth|filed|entered)", re.I)
-_DOLLAR_PATTERNS = re.compile(r"(amount|dollar|rent|cost|fee|price|damages|sum|payment|money|\$)", re.I)
-_CASE_PATTERNS = re.compile(r"(case.*num|case.*no|docket|file.*num)", re.I)
-_SIGNATURE_PATTERNS = re.compile(r"(sign|signature)", re.I)
-
 fake = Faker()
 
 
-# ---------------------------------------------------------------------------
-# Field classification
-# ---------------------------------------------------------------------------
-
-def classify_field(widget: Any) -> str:
-    """Map a pymupdf Widget to one of our YOLO class names.
-
-    Uses ``widget.field_type_string`` (e.g. "CheckBox", "Text", "Button")
-    which is reliable across pymupdf versions, rather than integer constants
-    which vary.
-    """
-    fts = (widget.field_type_string or "").lower()
-    name = (widget.field_name or "").lower()
-
-    # Checkbox / radio button
-    if fts in ("checkbox", "radiobutton"):
-        return "checkbox"
-    # Signature widget
-    if fts == "signature" or _SIGNATURE_PATTERNS.search(name):
-        return "signature"
-    # Push buttons — not a fillable field, but label as checkbox for detection
-    if fts == "button":
-        return "checkbox"
-
-    # Text or choice fields — refine by name heuristics
-    if _CASE_PATTERNS.search(name):
-        return "case_number"
-    if _DATE_PATTERNS.search(name):
-        return "date_field"
-    if _DOLLAR_PATTERNS.search(name):
-        return "dollar_amount"
-    return "text_field"
-
-
 # ---------------------------------------------------------------------------
 # Synthetic data generation
 # ---------------------------------------------------------------------------
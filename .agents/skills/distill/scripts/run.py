@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Distill skill: pseudo-label with the trained teacher, train a small student."""
+
+from __future__ import annotations
+
+import shutil
+import sys
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+
+from shared.utils import load_config
+
+
+def collect_images(frames_dir: Path, aug_dir: Path, exclude: set[str]) -> list[Path]:
+    """All frames + augmented images, minus the eval split (kept ground truth only)."""
+    images = sorted(frames_dir.glob("*.jpg"))
+    if aug_dir.exists():
+        images += sorted(aug_dir.glob("*.jpg"))
+    return [p for p in images if p.name not in exclude]
+
+
+def pseudo_label(
+    teacher_pt: Path,
+    images: list[Path],
+    out_images: Path,
+    out_labels: Path,
+    imgsz: int,
+    conf: float,
+    batch: int,
+) -> int:
+    """Write the teacher's detections as YOLO labels; returns the box count."""
+    from ultralytics import YOLO
+
+    out_images.mkdir(parents=True, exist_ok=True)
+    out_labels.mkdir(parents=True, exist_ok=True)
+    teacher = YOLO(str(teacher_pt))
+
+    total = 0
+    for i in range(0, len(images), batch):
+        chunk = images[i:i + batch]
+        results = teacher.predict(source=[str(p) for p in chunk], imgsz=imgsz, conf=conf, verbose=False)
+        for img_path, result in zip(chunk, results):
+            lines = [
+                f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}"
+                for (x, y, w, h), c in zip(result.boxes.xywhn.tolist(), result.boxes.cls.tolist())
+            ]
+            total += len(lines)
+            shutil.copy2(img_path, out_images / img_path.name)
+            (out_labels / img_path.with_suffix(".txt").name).write_text("\n".join(lines), encoding="utf-8")
+        print(f"[distill] Pseudo-labeled {min(i + batch, len(images))}/{len(images)} images")
+    return total
+
+
+def generate_dataset_yaml(distill_dir: Path, val_dir: Path, classes: list[str], output_path: Path) -> Path:
+    """Teacher labels for train, the original ground-truth split for val."""
+    data = {
+        "path": str(distill_dir.resolve()),
+        "train": "images/train",
+        "val": str(val_dir.resolve()),
+        "names": {i: name for i, name in enumerate(classes)},
+    }
+    output_path.write_text(yaml.dump(data, default_flow_style=False), encoding="utf-8")
+    print(f"[distill] distill.yaml written to {output_path}")
+    return output_path
+
+
+def train_student(
+    dataset_yaml: Path,
+    student_model: str,
+    epochs: int,
+    imgsz: int,
+    batch: int,
+    run_dir: Path,
+) -> Path:
+    """Train the student with ultralytics and return its best weights."""
+    from ultralytics import YOLO
+
+    import torch
+    if torch.cuda.is_available():
+        device = "cuda"
+    elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
+        device = "mps"
+    else:
+        device = "cpu"
+    print(f"[distill] Training {student_model} on {device}, imgsz {imgsz}, batch {batch}")
+
+    results = YOLO(student_model).train(
+        data=str(dataset_yaml),
+        epochs=epochs,
+        imgsz=imgsz,
+        batch=batch,
+        device=device,
+        project=str(run_dir),
+        name="student_run",
+        exist_ok=True,
+    )
+    return Path(results.save_dir) / "weights" / "best.pt"
+
+
+def main() -> int:
+    config = load_config()
+    output_dir = Path(config.get("output_dir", "output"))
+    frames_dir = output_dir / "frames"
+    aug_dir = output_dir / "augmented"
+    weights_dir = output_dir / "weights"
+    teacher_pt = weights_dir / "best.pt"
+    distill_dir = output_dir / "distill"
+    val_images = output_dir / "dataset" / "images" / "val"
+    imgsz = config.get("imgsz", 640)
+    student_model = config.get("student_model", "yolov8n.pt")
+    epochs = config.get("student_epochs", config.get("epochs", 50))
+    batch = config.get("student_batch", config.get("batch", 4) * 4)
+    conf = config.get("distill_conf", 0.25)
+
+    if not teacher_pt.exists():
+        print("[distill] Error: best.pt not found. Run train skill first.", file=sys.stderr)
+        return 1
+    if not val_images.exists():
+        print("[distill] Error: dataset/images/val not found. Run train skill first.", file=sys.stderr)
+        return 1
+
+    classes_path = output_dir / "classes.txt"
+    if not classes_path.exists():
+        print("[distill] Error: classes.txt not found. Run label skill first.", file=sys.stderr)
+        return 1
+    classes = [c for c in classes_path.read_text().strip().split("\n") if c]
+
+    # The val split stays out of the pseudo-labelled set so eval compares
+    # student and teacher on images neither was trained on.
+    images = collect_images(frames_dir, aug_dir, {p.name for p in val_images.glob("*.jpg")})
+    if not images:
+        print("[distill] Error: no frames to pseudo-label.", file=sys.stderr)
+        return 1
+
+    if distill_dir.exists():
+        shutil.rmtree(distill_dir)
+    boxes = pseudo_label(
+        teacher_pt,
+        images,
+        distill_dir / "images" / "train",
+        distill_dir / "labels" / "train",
+        imgsz,
+        conf,
+        config.get("batch", 4),
+    )
+    print(f"[distill] Teacher produced {boxes} boxes on {len(images)} images")
+
+    dataset_yaml = generate_dataset_yaml(distill_dir, val_images, classes, output_dir / "distill.yaml")
+    best = train_student(dataset_yaml, student_model, epochs, imgsz, batch, distill_dir)
+
+    student_pt = weights_dir / "student.pt"
+    if best.exists():
+        shutil.copy2(best, student_pt)
+        print(f"[distill] Student weights saved to {student_pt}")
+    else:
+        print("[distill] Warning: best.pt not found in student training output", file=sys.stderr)
+        return 1
+
+    print("[distill] Distillation complete. Run eval skill to compare student and teacher.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,6 +5,7 @@ from __future__ import annotations
 
 import json
 import sys
+import time
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
@@ -12,6 +13,51 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.pare
 from shared.utils import load_config
 
 
+def measure_latency(weights: Path, images: list[Path], imgsz: int) -> float:
+    """Mean CPU ms per image for single-image predict (warm-up excluded)."""
+    from ultralytics import YOLO
+
+    model = YOLO(str(weights))
+    model.predict(source=str(images[0]), imgsz=imgsz, device="cpu", verbose=False)
+    t0 = time.perf_counter()
+    for img in images:
+        model.predict(source=str(img), imgsz=imgsz, device="cpu", verbose=False)
+    return (time.perf_counter() - t0) / len(images) * 1000
+
+
+def compare_student(
+    teacher_pt: Path,
+    student_pt: Path,
+    dataset_yaml: Path,
+    teacher_map50: float,
+    teacher_map50_95: float,
+    val_images: list[Path],
+    imgsz: int,
+    tolerance: float,
+) -> dict:
+    """mAP-versus-latency of the distilled student against the teacher."""
+    from ultralytics import YOLO
+
+    results = YOLO(str(student_pt)).val(data=str(dataset_yaml))
+    student_map50 = float(results.box.map50)
+    student_map50_95 = float(results.box.map)
+    teacher_ms = measure_latency(teacher_pt, val_images, imgsz)
+    student_ms = measure_latency(student_pt, val_images, imgsz)
+    map50_drop = teacher_map50 - student_map50
+
+    return {
+        "teacher": {"map50": round(teacher_map50, 4), "map50_95": round(teacher_map50_95, 4),
+                    "cpu_ms_per_image": round(teacher_ms, 1)},
+        "student": {"map50": round(student_map50, 4), "map50_95": round(student_map50_95, 4),
+                    "cpu_ms_per_image": round(student_ms, 1)},
+        "map50_drop": round(map50_drop, 4),
+        "speedup": round(teacher_ms / student_ms, 2) if student_ms else None,
+        "map_tolerance": tolerance,
+        "within_tolerance": map50_drop <= tolerance,
+        "deploy_weights": str(student_pt if map50_drop <= tolerance else teacher_pt),
+    }
+
+
 def main() -> int:
     config = load_config()
     output_dir = Path(config.get("output_dir", "output"))
@@ -68,6 +114,21 @@ def main() -> int:
         "weakest_classes": [c["class"] for c in per_class[:3]] if per_class else [],
     }
 
+    # Distilled student (distill skill): compare mAP against CPU latency.
+    student_pt = weights_dir / "student.pt"
+    val_images = sorted((output_dir / "dataset" / "images" / "val").glob("*.jpg"))
+    if student_pt.exists() and val_images:
+        eval_results["distillation"] = compare_student(
+            best_pt,
+            student_pt,
+            dataset_yaml,
+            map50,
+            map50_95,
+            val_images[: config.get("latency_images", 20)],
+            config.get("imgsz", 640),
+            config.get("student_map_tolerance", 0.02),
+        )
+
     results_path = output_dir / "eval_results.json"
     results_path.write_text(json.dumps(eval_results, indent=2), encoding="utf-8")
 
@@ -76,6 +137,12 @@ def main() -> int:
     print(f"[eval] Target: {target_accuracy} | Meets target: {meets_target}")
     if per_class:
         print(f"[eval] Weakest classes: {', '.join(eval_results['weakest_classes'])}")
+    if "distillation" in eval_results:
+        d = eval_results["distillation"]
+        print(f"[eval] Student mAP@50: {d['student']['map50']:.4f} (drop {d['map50_drop']:+.4f}, "
+              f"tolerance {d['map_tolerance']}) | CPU {d['teacher']['cpu_ms_per_image']:.1f} → "
+              f"{d['student']['cpu_ms_per_image']:.1f} ms/image ({d['speedup']}×)")
+        print(f"[eval] Deploy: {d['deploy_weights']}")
     print(f"[eval] Results saved to {results_path}")
 
     return 0
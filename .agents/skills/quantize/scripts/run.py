@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Quantize skill: INT8 post-training quantization of best.pt for CPU inference."""
+
+from __future__ import annotations
+
+import json
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+
+from shared.detector import OnnxDetector, letterbox
+from shared.utils import load_config
+
+
+def sample_frames(frames_dir: Path, count: int, seed: int = 0) -> list[Path]:
+    """Pick a reproducible random sample of rendered frames."""
+    frames = sorted(frames_dir.glob("*.jpg"))
+    random.Random(seed).shuffle(frames)
+    return frames[:count]
+
+
+def load_rgb(path: Path) -> np.ndarray:
+    return np.asarray(Image.open(path).convert("RGB"))
+
+
+class FrameCalibrationReader:
+    """Feeds letterboxed frames to ONNX Runtime's static calibration."""
+
+    def __init__(self, frames: list[Path], input_name: str, imgsz: int) -> None:
+        self.frames = iter(frames)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self) -> dict[str, np.ndarray] | None:
+        path = next(self.frames, None)
+        if path is None:
+            return None
+        tensor, _, _ = letterbox(load_rgb(path), (self.imgsz, self.imgsz), auto=False)
+        return {self.input_name: tensor[None]}
+
+
+def head_nodes(model_path: Path) -> list[str]:
+    """Nodes of the Detect head (the last ``/model.N/`` block), kept in float.
+
+    Box decoding and class sigmoids lose most accuracy when quantized, and
+    they are a small share of the compute.
+    """
+    import onnx
+
+    names = [n.name for n in onnx.load(str(model_path)).graph.node]
+    blocks = [int(n.split("/")[1].split(".")[1]) for n in names if n.startswith("/model.")]
+    if not blocks:
+        return []
+    prefix = f"/model.{max(blocks)}/"
+    return [n for n in names if n.startswith(prefix)]
+
+
+def export_fp32(best_pt: Path, imgsz: int) -> Path:
+    """Export a static-shape ``best_fp32.onnx`` (calibration needs fixed shapes).
+
+    ultralytics names the export after the weights file, so exporting from
+    a copy leaves the (possibly dynamic) ``best.onnx`` the API serves alone.
+    """
+    from ultralytics import YOLO
+
+    fp32_pt = best_pt.with_name(f"{best_pt.stem}_fp32.pt")
+    shutil.copyfile(best_pt, fp32_pt)
+    try:
+        out = YOLO(str(fp32_pt)).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    finally:
+        fp32_pt.unlink(missing_ok=True)
+    return Path(out)
+
+
+def quantize(fp32_path: Path, int8_path: Path, frames: list[Path], imgsz: int, exclude_head: bool) -> Path:
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    # Fold constants and annotate shapes first; calibration and QDQ
+    # placement both work on the pre-processed graph.
+    prep_path = fp32_path.with_name(f"{fp32_path.stem}_prep.onnx")
+    quant_pre_process(str(fp32_path), str(prep_path))
+
+    input_name = OnnxDetector(fp32_path, imgsz).input_name
+    try:
+        quantize_static(
+            str(prep_path),
+            str(int8_path),
+            FrameCalibrationReader(frames, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=head_nodes(fp32_path) if exclude_head else [],
+        )
+    finally:
+        prep_path.unlink(missing_ok=True)
+    return int8_path
+
+
+def evaluate(model_path: Path, dataset_yaml: Path, imgsz: int) -> dict[str, float]:
+    """mAP on the eval split, through ultralytics (it runs .onnx via onnxruntime)."""
+    from ultralytics import YOLO
+
+    results = YOLO(str(model_path), task="detect").val(
+        data=str(dataset_yaml), imgsz=imgsz, batch=1, plots=False, verbose=False
+    )
+    return {"map50": round(float(results.box.map50), 4), "map50_95": round(float(results.box.map), 4)}
+
+
+def time_model(model_path: Path, frames: list[Path], imgsz: int) -> float:
+    """Mean ms per frame through the API's ONNX backend (warm-up excluded)."""
+    detector = OnnxDetector(model_path, imgsz)
+    images = [load_rgb(p) for p in frames]
+    detector.predict(images[:1], 0.25)
+    t0 = time.perf_counter()
+    for img in images:
+        detector.predict([img], 0.25)
+    return (time.perf_counter() - t0) / max(1, len(images)) * 1000
+
+
+def main() -> int:
+    config = load_config()
+    output_dir = Path(config.get("output_dir", "output"))
+    frames_dir = output_dir / "frames"
+    weights_dir = output_dir / "weights"
+    best_pt = weights_dir / "best.pt"
+    dataset_yaml = output_dir / "dataset.yaml"
+    imgsz = config.get("imgsz", 640)
+    num_calibration = config.get("quantize_calibration_frames", 200)
+    num_timing = config.get("quantize_timing_frames", 20)
+    exclude_head = config.get("quantize_exclude_head", True)
+
+    if not best_pt.exists():
+        print("[quantize] Error: best.pt not found. Run train skill first.", file=sys.stderr)
+        return 1
+    if not dataset_yaml.exists():
+        print("[quantize] Error: dataset.yaml not found. Run train skill first.", file=sys.stderr)
+        return 1
+
+    frames = sample_frames(frames_dir, num_calibration + num_timing)
+    if len(frames) <= num_timing:
+        print(f"[quantize] Error: need more than {num_timing} frames in {frames_dir}. Run collect skill first.",
+              file=sys.stderr)
+        return 1
+    calibration, timing = frames[num_timing:], frames[:num_timing]
+    print(f"[quantize] Calibrating on {len(calibration)} frames, timing on {len(timing)}")
+
+    fp32_path = export_fp32(best_pt, imgsz)
+    int8_path = quantize(fp32_path, weights_dir / "best_int8.onnx", calibration, imgsz, exclude_head)
+    print(f"[quantize] INT8 model written to {int8_path}")
+
+    # Compare against the float ONNX export so the delta is quantization alone.
+    fp32_metrics = evaluate(fp32_path, dataset_yaml, imgsz)
+    int8_metrics = evaluate(int8_path, dataset_yaml, imgsz)
+    fp32_ms = time_model(fp32_path, timing, imgsz)
+    int8_ms = time_model(int8_path, timing, imgsz)
+
+    results = {
+        "int8_model": str(int8_path),
+        "fp32_onnx": str(fp32_path),
+        "calibration_frames": len(calibration),
+        "exclude_head": exclude_head,
+        "fp32": {**fp32_metrics, "ms_per_frame": round(fp32_ms, 1)},
+        "int8": {**int8_metrics, "ms_per_frame": round(int8_ms, 1)},
+        "map50_delta": round(int8_metrics["map50"] - fp32_metrics["map50"], 4),
+        "map50_95_delta": round(int8_metrics["map50_95"] - fp32_metrics["map50_95"], 4),
+        "speedup": round(fp32_ms / int8_ms, 2) if int8_ms else None,
+        "model_bytes": {"fp32": fp32_path.stat().st_size, "int8": int8_path.stat().st_size},
+    }
+
+    results_path = output_dir / "quantize_results.json"
+    results_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"[quantize] mAP@50: {fp32_metrics['map50']:.4f} → {int8_metrics['map50']:.4f} "
+          f"(Δ {results['map50_delta']:+.4f})")
+    print(f"[quantize] mAP@50-95: {fp32_metrics['map50_95']:.4f} → {int8_metrics['map50_95']:.4f} "
+          f"(Δ {results['map50_95_delta']:+.4f})")
+    print(f"[quantize] CPU latency: {fp32_ms:.1f} → {int8_ms:.1f} ms/frame ({results['speedup']}× faster)")
+    print("[quantize] Serve with: FORMDEX_DETECTOR=onnx FORMDEX_DETECTOR_PRECISION=int8")
+    print(f"[quantize] Results saved to {results_path}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
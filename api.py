@@ -3,68 +3,377 @@
 
 Accepts a filled PDF (any number of pages), runs YOLOv8 detection on every page,
 extracts text via OCR, determines checkbox states, and returns structured JSON
-plus annotated page images.
+plus annotated page images.  Filled AcroForm PDFs are read straight from their
+widgets instead (see ``process_pdf``).
 
 Usage:
     uv run uvicorn api:app --host 0.0.0.0 --port 8000
 
+Rendering, detection, OCR and image encoding run on a bounded worker pool so
+the event loop stays responsive while a PDF is being processed.  The pool is
+configured through environment variables:
+
+    FORMDEX_PROJECT         default project, served when routing finds no match (default: ud100-form)
+    FORMDEX_WEIGHTS         default project's .pt (default: runs/<project>/weights/best.pt; e.g. student.pt)
+    FORMDEX_DETECTOR        "ultralytics" (default, best.pt), "onnx" or "openvino" (exported model)
+    FORMDEX_DETECTOR_PRECISION  "fp32" (default) or "int8" (quantized ONNX model from the quantize skill)
+    FORMDEX_DETECTOR_MODEL  exported model path (default: next to best.pt, as export_detector.py writes it)
+    FORMDEX_MODEL_HISTORY   previous model versions kept loaded for rollback (default: 2)
+    FORMDEX_SMOKE_PDF       page new weights must detect on before they are swapped in
+                            (default: api_test_output/test_filled_ud100.pdf)
+    FORMDEX_SMOKE_MIN_DETECTIONS  detections required on that page (default: 1)
+    FORMDEX_PINNED_PROJECTS comma-separated projects whose models are never unloaded (default: the default project)
+    FORMDEX_MODEL_CACHE_SIZE / FORMDEX_MODEL_CACHE_MB
+                            resident project models before LRU eviction (default: 4 / 4096 MB)
+    FORMDEX_MODEL_IDLE_SEC  unload unpinned models idle this long (default: 1800, 0 = never)
+    FORMDEX_ROUTE_MAX_DISTANCE  layout-hash bits (of 256) a page may differ from a template (default: 64)
+    FORMDEX_REGISTRATION    align pages to the project's form_template.pdf instead of running YOLO (default: 1)
+    FORMDEX_REGISTRATION_MIN_INLIERS / FORMDEX_REGISTRATION_MIN_RATIO
+                            alignment needed to trust it over YOLO (default: 40 / 0.3)
+    FORMDEX_WARMUP_RUNS     dummy detection batches at startup before /ready turns 200 (default: 2)
+    FORMDEX_EXECUTOR        "thread" (default) or "process" (one model copy per worker)
+    FORMDEX_WORKERS         pool size (default: CPU count)
+    FORMDEX_MAX_IN_FLIGHT   max concurrent /extract requests before 503 (default: 2 × workers)
+    FORMDEX_JOB_WORKERS     concurrent /jobs being processed (default: 1)
+    FORMDEX_MAX_UPLOAD_MB   uploads are spooled to disk; larger ones get 413 (default: 256)
+    FORMDEX_LOW_MEMORY      one page at a time, fields written to results.json as they finish (default: 0)
+    FORMDEX_BATCH_SIZE      max pages per YOLO batch (default: 4)
+    FORMDEX_BATCH_WAIT_MS   max wait to fill a batch (default: 10)
+    FORMDEX_TILING          also detect on overlapping native-resolution tiles of large pages (default: 0)
+    FORMDEX_TILE_SIZE / FORMDEX_TILE_OVERLAP / FORMDEX_TILE_BATCH
+                            tile side, overlap in px, images per predict() call (default: 1280 / 256 / 8)
+    FORMDEX_DETECT_WORKERS  / FORMDEX_OCR_WORKERS / FORMDEX_ENCODE_WORKERS
+                            per-stage workers of the page pipeline (default: batch size / 2 / 1)
+    FORMDEX_STAGE_QUEUE     bounded queue size between pipeline stages (default: 2)
+    FORMDEX_OCR_MODE        "crop" (one Tesseract call per field, default) or "page" (one per page)
+    FORMDEX_OCR_BACKEND     "auto" (default), "tesserocr" or "pytesseract"
+    FORMDEX_OCR_ENGINES     long-lived OCR engines per process (default: OCR workers × pool threads)
+    FORMDEX_TEXT_LAYER      read values from the PDF text layer before OCR (default: 1)
+    FORMDEX_ARTIFACTS       annotated pages and crops: "none", "lazy" (default, rendered on first
+                            GET /files) or "eager" (written during the request)
+    FORMDEX_CACHE           answer repeat uploads from the result cache (default: 1)
+    FORMDEX_CACHE_ENTRIES   / FORMDEX_CACHE_MB
+                            cache limits before LRU eviction (default: 256 results / 2048 MB)
+    FORMDEX_CACHE_PAGES     memoised pages reused across uploads (default: 4096, 0 = off)
+
 Endpoints:
     POST /extract          → JSON results + download URLs for annotated images
+                             (?stream=ndjson|sse: one event per page as it finishes, summary last)
+    POST /jobs             → queue a PDF, returns job_id immediately
+    GET  /jobs/{id}        → job status + per-page progress
+    GET  /jobs/{id}/result → results.json of a finished job
     GET  /files/{job}/{f}  → serve annotated images and crops
-    GET  /health           → health check
+    GET  /projects         → servable projects, resident models, cache limits
+    POST /projects/{p}/pin → keep a project's model loaded (also /unpin, /unload)
+    GET  /models           → current model version + versions kept for rollback
+    POST /models           → load new weights in the background, validate, swap in
+    POST /models/rollback  → swap a previous version back in
+    GET  /health           → health check (+ readiness)
+    GET  /ready            → 200 once warmed up, 503 before (load-balancer probe)
     GET  /                 → interactive docs redirect
 """
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import io
+import json
+import multiprocessing
+import os
+import re
 import shutil
+import threading
 import time
 import uuid
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import IO, Any, Literal
 
 import fitz  # pymupdf
 import numpy as np
-import pytesseract
 from fastapi import FastAPI, File, Query, UploadFile
-from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
-from ultralytics import YOLO
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from PIL import Image, ImageDraw, ImageFont
+
+from shared import jobs
+from shared.batching import MicroBatcher
+from shared.cache import ResultCache, cache_key, file_digest, page_fingerprint
+from shared.detector import Detector, default_model_path, make_detector, predict_tiled
+from shared.forms import acroform_is_filled, read_widget_fields
+from shared.jobs import JobStore
+from shared.memory import PeakRss
+from shared.ocr import (
+    OCR_TARGET_HEIGHT,
+    Word,
+    configure_ocr_pool,
+    extract_text_from_crop,
+    get_ocr_pool,
+    ocr_fields_on_page,
+)
+from shared.page_image import PageImage, pixmap_array
+from shared.projects import LayoutSignature, ModelCache, Project, discover_projects, layout_signature, route
+from shared.registry import ModelRegistry, ModelVersion
+from shared.stages import Stage, run_stages
+from shared.templates import FormTemplate, align, load_template, project_fields, registration_stats, to_gray
+from shared.text_layer import page_words, text_in_boxes, text_layer_stats
 
 # ── Paths ──────────────────────────────────────────────────────────────────
 ROOT = Path(__file__).resolve().parent
-WEIGHTS = ROOT / "runs" / "ud100-form" / "weights" / "best.pt"
-CLASSES_FILE = ROOT / "runs" / "ud100-form" / "classes.txt"
+RUNS_DIR = ROOT / "runs"
+# Served when a request names no project and auto-routing finds no match.
+DEFAULT_PROJECT = os.environ.get("FORMDEX_PROJECT", "ud100-form")
+WEIGHTS = Path(os.environ.get("FORMDEX_WEIGHTS") or RUNS_DIR / DEFAULT_PROJECT / "weights" / "best.pt")
 JOBS_DIR = ROOT / "api_jobs"
 JOBS_DIR.mkdir(exist_ok=True)
+# SQLite state lives outside JOBS_DIR, which GET /files serves from.
+STATE_DIR = ROOT / "api_state"
+STATE_DIR.mkdir(exist_ok=True)
+
+# ── Detector backend ───────────────────────────────────────────────────────
+# "ultralytics" runs best.pt through PyTorch; "onnx" / "openvino" run a model
+# exported with scripts/export_detector.py (NumPy pre/post-processing, no torch).
+# "int8" picks the quantized model from the quantize skill (onnx backend only).
+# FORMDEX_WEIGHTS / FORMDEX_DETECTOR_MODEL apply to the default project; other
+# projects use the same backend and precision on runs/<project>/weights/.
+DETECTOR_BACKEND = os.environ.get("FORMDEX_DETECTOR", "ultralytics").lower()
+DETECTOR_PRECISION = os.environ.get("FORMDEX_DETECTOR_PRECISION", "fp32").lower()
+DETECTOR_MODEL = Path(
+    os.environ.get("FORMDEX_DETECTOR_MODEL")
+    or default_model_path(DETECTOR_BACKEND, WEIGHTS, DETECTOR_PRECISION)
+)
+
+# ── Model registry ─────────────────────────────────────────────────────────
+# POST /models loads new weights in the background, checks them on a smoke
+# page and swaps them in; MODEL_HISTORY previous versions stay loaded for
+# instant rollback.  Only weights under runs/ may be loaded (a .pt is a pickle).
+MODEL_HISTORY = max(0, int(os.environ.get("FORMDEX_MODEL_HISTORY", 2)))
+SMOKE_PDF = Path(os.environ.get("FORMDEX_SMOKE_PDF") or ROOT / "api_test_output" / "test_filled_ud100.pdf")
+SMOKE_MIN_DETECTIONS = max(0, int(os.environ.get("FORMDEX_SMOKE_MIN_DETECTIONS", 1)))
+
+# ── Projects ───────────────────────────────────────────────────────────────
+# Every runs/<project>/ with a classes.txt can be served.  Loaded models are
+# kept in an LRU cache capped at MODEL_CACHE_SIZE projects / MODEL_CACHE_MB;
+# pinned projects are never unloaded, others are unloaded after
+# MODEL_IDLE_SEC without traffic.  Uploads that name no project are routed
+# by a layout hash of their first page against each form_template.pdf.
+PINNED_PROJECTS = {
+    p.strip() for p in os.environ.get("FORMDEX_PINNED_PROJECTS", DEFAULT_PROJECT).split(",") if p.strip()
+}
+MODEL_CACHE_SIZE = max(1, int(os.environ.get("FORMDEX_MODEL_CACHE_SIZE", 4)))
+MODEL_CACHE_MB = max(0, int(os.environ.get("FORMDEX_MODEL_CACHE_MB", 4096)))
+MODEL_IDLE_SEC = max(0.0, float(os.environ.get("FORMDEX_MODEL_IDLE_SEC", 1800)))
+ROUTE_MAX_DISTANCE = max(0, int(os.environ.get("FORMDEX_ROUTE_MAX_DISTANCE", 64)))
+
+# ── Template registration ──────────────────────────────────────────────────
+# Flattened or scanned pages of a project's own form are aligned to its
+# form_template.pdf and the widget rects projected onto them, skipping YOLO.
+# Pages whose homography has fewer than REGISTRATION_MIN_INLIERS inliers (or
+# a lower inlier ratio) go to the detector as before.
+REGISTRATION = os.environ.get("FORMDEX_REGISTRATION", "1").lower() not in ("0", "false", "no")
+REGISTRATION_MIN_INLIERS = max(4, int(os.environ.get("FORMDEX_REGISTRATION_MIN_INLIERS", 40)))
+REGISTRATION_MIN_RATIO = float(os.environ.get("FORMDEX_REGISTRATION_MIN_RATIO", 0.3))
+
+# ── Warmup ─────────────────────────────────────────────────────────────────
+# Dummy detection batches run at startup before the instance reports ready
+# (0 = no warmup: load lazily on first request, ready immediately).
+WARMUP_RUNS = max(0, int(os.environ.get("FORMDEX_WARMUP_RUNS", 2)))
+
+# ── Execution backend ──────────────────────────────────────────────────────
+EXECUTOR_KIND = os.environ.get("FORMDEX_EXECUTOR", "thread").lower()
+EXECUTOR_WORKERS = max(1, int(os.environ.get("FORMDEX_WORKERS", os.cpu_count() or 1)))
+MAX_IN_FLIGHT = max(1, int(os.environ.get("FORMDEX_MAX_IN_FLIGHT", EXECUTOR_WORKERS * 2)))
+JOB_WORKERS = max(1, int(os.environ.get("FORMDEX_JOB_WORKERS", 1)))
+
+# ── Detection batching ─────────────────────────────────────────────────────
+# Pages from the current PDF and from concurrent requests are gathered into
+# one predict() call of up to BATCH_SIZE images, waiting at most
+# BATCH_WAIT_MS after the first page arrives.
+BATCH_SIZE = max(1, int(os.environ.get("FORMDEX_BATCH_SIZE", 4)))
+BATCH_WAIT_MS = float(os.environ.get("FORMDEX_BATCH_WAIT_MS", 10))
+
+# ── Sliced inference ───────────────────────────────────────────────────────
+# Off by default.  When on, pages larger than TILE_SIZE are also cut into
+# overlapping TILE_SIZE tiles at native resolution (the default matches
+# _INFERENCE_IMGSZ, so tiles aren't rescaled) so small checkboxes keep their
+# pixels at high DPI.  A page's tiles and its whole-page pass share
+# predict() calls of up to TILE_BATCH images and are merged by cross-tile NMS.
+TILING = os.environ.get("FORMDEX_TILING", "0").lower() not in ("0", "false", "no")
+TILE_SIZE = max(64, int(os.environ.get("FORMDEX_TILE_SIZE", 1280)))
+TILE_OVERLAP = max(0, min(TILE_SIZE // 2, int(os.environ.get("FORMDEX_TILE_OVERLAP", 256))))
+TILE_BATCH = max(1, int(os.environ.get("FORMDEX_TILE_BATCH", 8)))
+
+# ── Page pipeline ──────────────────────────────────────────────────────────
+# process_pdf overlaps render → detect → extract (OCR) → encode across pages.
+# Rendering always has one worker (MuPDF is serialised); the other stages
+# are sized independently, with bounded hand-off queues between them.
+DETECT_WORKERS = max(1, int(os.environ.get("FORMDEX_DETECT_WORKERS", BATCH_SIZE)))
+OCR_WORKERS = max(1, int(os.environ.get("FORMDEX_OCR_WORKERS", 2)))
+ENCODE_WORKERS = max(1, int(os.environ.get("FORMDEX_ENCODE_WORKERS", 1)))
+STAGE_QUEUE_SIZE = max(1, int(os.environ.get("FORMDEX_STAGE_QUEUE", 2)))
+
+# ── OCR ────────────────────────────────────────────────────────────────────
+# "crop": one Tesseract call per field (per-class whitelist, most accurate).
+# "page": one Tesseract call per page, words mapped back onto field boxes.
+OCR_MODE = os.environ.get("FORMDEX_OCR_MODE", "crop").lower()
+# "auto" uses in-process tesserocr engines when installed, else pytesseract.
+# Engines are pooled per process and stay initialised across requests; the
+# default covers every extract worker that can run at once in this process.
+OCR_BACKEND = os.environ.get("FORMDEX_OCR_BACKEND", "auto").lower()
+OCR_ENGINES = max(1, int(os.environ.get(
+    "FORMDEX_OCR_ENGINES",
+    OCR_WORKERS * (EXECUTOR_WORKERS if EXECUTOR_KIND == "thread" else 1),
+)))
+configure_ocr_pool(backend=OCR_BACKEND, size=OCR_ENGINES)
+# Flattened digital PDFs keep their values as text: read it from the text
+# layer and only OCR fields whose region has no embedded text.
+TEXT_LAYER = os.environ.get("FORMDEX_TEXT_LAYER", "1").lower() not in ("0", "false", "no")
+
+# ── Artifacts ──────────────────────────────────────────────────────────────
+# Annotated pages and field crops: "eager" writes them during the request,
+# "lazy" renders each one the first time /files asks for it, "none" skips
+# them.  Most clients only read the JSON, so lazy keeps the encode work off
+# the hot path.  The ?artifacts= query param overrides this per request.
+ARTIFACT_MODES = ("none", "lazy", "eager")
+ARTIFACTS = os.environ.get("FORMDEX_ARTIFACTS", "lazy").lower()
+if ARTIFACTS not in ARTIFACT_MODES:
+    raise ValueError(f"FORMDEX_ARTIFACTS must be one of {', '.join(ARTIFACT_MODES)}, got {ARTIFACTS!r}")
+
+# ── Uploads ────────────────────────────────────────────────────────────────
+# Uploads are copied to disk UPLOAD_CHUNK bytes at a time, never held whole
+# in memory, and MuPDF opens them by path.  Past FORMDEX_MAX_UPLOAD_MB the
+# copy stops and the request gets a 413.
+MAX_UPLOAD_MB = max(1, int(os.environ.get("FORMDEX_MAX_UPLOAD_MB", 256)))
+UPLOAD_CHUNK = 1 << 20
+UPLOADS_DIR = JOBS_DIR / ".uploads"
+UPLOADS_DIR.mkdir(exist_ok=True)
+
+# ── Low-memory mode ────────────────────────────────────────────────────────
+# For very long PDFs: each page goes through render → detect → extract →
+# encode before the next one starts, MuPDF's resource store is emptied
+# after it, and its fields are appended to results.json instead of being
+# collected until the end, so peak RSS stays flat however many pages there
+# are.  Slower, since pages no longer overlap across stages.
+LOW_MEMORY = os.environ.get("FORMDEX_LOW_MEMORY", "0").lower() not in ("0", "false", "no")
+
+# ── Result cache ───────────────────────────────────────────────────────────
+# Repeat uploads (client retries, workflows that run twice) are answered from
+# the stored results.json.  Least-recently-used entries are evicted once the
+# cache holds more than CACHE_ENTRIES results or CACHE_MB of artifacts.
+CACHE_ENABLED = os.environ.get("FORMDEX_CACHE", "1").lower() not in ("0", "false", "no")
+CACHE_ENTRIES = max(1, int(os.environ.get("FORMDEX_CACHE_ENTRIES", 256)))
+CACHE_MB = max(0, int(os.environ.get("FORMDEX_CACHE_MB", 2048)))
+# Unchanged pages of an amended upload are reused from earlier results.
+CACHE_PAGES = max(0, int(os.environ.get("FORMDEX_CACHE_PAGES", 4096)))
+
+# ── Models ─────────────────────────────────────────────────────────────────
+# Each project's detector lives in a registry so new weights can be swapped
+# in without a restart.  predict() itself is only ever called from the
+# detection batcher's thread (and, for a candidate not yet swapped in, its
+# loader thread), since ultralytics keeps per-call predictor state on the
+# model object and isn't safe to share between threads.
+_model_cache: ModelCache | None = None
+_model_cache_lock = threading.Lock()
+_projects: dict[str, Project] = {}
+
+# MuPDF is not thread-safe: every fitz call in this process goes through here.
+_FITZ_LOCK = threading.RLock()
+
+
+def get_projects() -> dict[str, Project]:
+    global _projects
+    if not _projects:
+        _projects = discover_projects(RUNS_DIR)
+    return _projects
+
+
+def get_project(name: str | None = None) -> Project:
+    """Look up a project by name (default: ``FORMDEX_PROJECT``); rescans runs/ once on a miss."""
+    global _projects
+    name = name or DEFAULT_PROJECT
+    if name not in get_projects():
+        _projects = discover_projects(RUNS_DIR)
+    if name not in _projects:
+        raise KeyError(name)
+    return _projects[name]
+
+
+def _load_detector(path: Path) -> Detector:
+    return make_detector(DETECTOR_BACKEND, path, _INFERENCE_IMGSZ)
+
+
+def _project_registry(name: str) -> ModelRegistry:
+    project = get_project(name)
+    if name == DEFAULT_PROJECT:
+        model_path = DETECTOR_MODEL
+    else:
+        model_path = default_model_path(DETECTOR_BACKEND, project.weights, DETECTOR_PRECISION)
+    return ModelRegistry(
+        model_path,
+        _load_detector,
+        validate=functools.partial(validate_detector, project=project),
+        keep=MODEL_HISTORY,
+    )
+
+
+def get_model_cache() -> ModelCache:
+    global _model_cache
+    if _model_cache is None:
+        with _model_cache_lock:
+            if _model_cache is None:
+                _model_cache = ModelCache(
+                    _project_registry,
+                    max_models=MODEL_CACHE_SIZE,
+                    max_bytes=MODEL_CACHE_MB << 20,
+                    idle_sec=MODEL_IDLE_SEC,
+                    pinned=PINNED_PROJECTS,
+                )
+    return _model_cache
+
 
-# ── Class colours (one per class) ──────────────────────────────────────────
-COLORS = [
-    (30, 144, 255),   # text_field    – dodger blue
-    (0, 200, 83),     # checkbox      – green
-    (255, 165, 0),    # date_field    – orange
-    (220, 20, 60),    # dollar_amount – crimson
-    (148, 103, 189),  # signature     – purple
-    (0, 191, 255),    # case_number   – deep sky blue
-]
+def get_registry(project: str | None = None) -> ModelRegistry:
+    """The model registry of *project* (default project when omitted), loading it on demand."""
+    return get_model_cache().get(project or DEFAULT_PROJECT)
 
-# ── Load model once at startup ─────────────────────────────────────────────
-model: YOLO | None = None
-class_names: list[str] = []
 
+def get_model(project: str | None = None) -> Detector:
+    """The current detector (new requests pin a version via ``get_registry().current()``)."""
+    return get_registry(project).current().detector
 
-def get_model() -> YOLO:
-    global model
-    if model is None:
-        model = YOLO(str(WEIGHTS))
-    return model
 
+_result_cache: ResultCache | None = None
 
-def get_class_names() -> list[str]:
-    global class_names
-    if not class_names:
-        class_names = CLASSES_FILE.read_text().strip().splitlines()
-    return class_names
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        _result_cache = ResultCache(
+            STATE_DIR / "cache.db",
+            JOBS_DIR,
+            max_entries=CACHE_ENTRIES,
+            max_bytes=CACHE_MB << 20,
+            max_pages=CACHE_PAGES,
+        )
+    return _result_cache
+
+
+def result_cache_key(content: bytes, project: Project, version: ModelVersion, **options) -> str:
+    """Cache key: PDF digest + request options + project, model weights + classes + extraction settings."""
+    return cache_key(
+        content,
+        project=project.name,
+        weights=f"{DETECTOR_BACKEND}:{version.digest}",
+        classes=project.classes,
+        ocr_mode=OCR_MODE,
+        text_layer=TEXT_LAYER,
+        registration=REGISTRATION,
+        tiling=(TILE_SIZE, TILE_OVERLAP) if TILING else None,
+        **options,
+    )
 
 
 # ── Fonts (loaded once) ───────────────────────────────────────────────────
@@ -100,142 +409,374 @@ _INFERENCE_IMGSZ = 1280  # should stay in sync with config.json → imgsz
 # ── Core logic ─────────────────────────────────────────────────────────────
 
 
-def is_checkbox_checked(crop: Image.Image) -> bool:
-    """Determine if a checkbox crop is checked by analyzing dark pixel density."""
-    gray = ImageOps.grayscale(crop)
-    w, h = gray.size
+# Field regions are rendered from the page's display list, which is parsed
+# once: a clipped page.get_pixmap() re-runs the whole content stream (and
+# decodes a scan's full image) for every field.  No OCR render goes above
+# this zoom, however thin the box.
+_MAX_OCR_ZOOM = 1200 / 72
+
+
+def render_region(display: fitz.DisplayList, rect: fitz.Rect, zoom: float) -> np.ndarray:
+    """Render only *rect* (PDF points) of a page's display list at *zoom*; caller holds ``_FITZ_LOCK``."""
+    return pixmap_array(display.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=rect), _FITZ_LOCK)
+
+
+def ocr_zoom(rect: fitz.Rect, zoom: float) -> float:
+    """Zoom at which *rect* (PDF points) comes out ``OCR_TARGET_HEIGHT`` px tall, never below *zoom*."""
+    return max(zoom, min(_MAX_OCR_ZOOM, OCR_TARGET_HEIGHT / max(rect.height, 1.0)))
+
+
+def coarse_zoom(page: fitz.Page, zoom: float) -> float:
+    """Zoom at which *page* fills the detector input (``_INFERENCE_IMGSZ``), capped at *zoom*.
+
+    YOLO letterboxes every page to that size anyway, so rendering any larger
+    for detection only costs pixels.
+    """
+    return min(zoom, _INFERENCE_IMGSZ / max(page.rect.width, page.rect.height))
+
+
+def is_checkbox_checked(crop: np.ndarray) -> bool:
+    """Determine if an RGB checkbox crop is checked by analyzing dark pixel density."""
+    h, w = crop.shape[:2]
     mx = max(int(w * 0.2), 1)
     my = max(int(h * 0.2), 1)
-    inner = gray.crop((mx, my, w - mx, h - my))
-    arr = np.array(inner)
-    return bool(np.mean(arr < 128) > 0.05)
-
-
-def extract_text_from_crop(crop: Image.Image, field_class: str) -> str:
-    """Run Tesseract OCR on a cropped field image."""
-    w, h = crop.size
-    scale = max(1, 150 // max(h, 1))
-    if scale > 1:
-        crop = crop.resize((w * scale, h * scale), Image.LANCZOS)
-    gray = ImageOps.grayscale(crop)
-    gray = gray.filter(ImageFilter.SHARPEN)
-    if field_class in ("date_field", "dollar_amount", "case_number"):
-        config = "--psm 7 -c tessedit_char_whitelist=0123456789/.-$,ABCDEFGHIJKLMNOPQRSTUVWXYZ "
-    else:
-        config = "--psm 7"
-    try:
-        text = pytesseract.image_to_string(gray, config=config).strip()
-        return text.replace("|", "").replace("\\", "").strip()
-    except Exception:
-        return ""
+    inner = crop[my:h - my, mx:w - mx].astype(np.uint32)
+    # ITU-R 601-2 luma with PIL's fixed-point weights, same as ImageOps.grayscale
+    gray = (inner[..., 0] * 19595 + inner[..., 1] * 38470 + inner[..., 2] * 7471 + 0x8000) >> 16
+    return bool(np.mean(gray < 128) > 0.05)
+
+
+def _boxes_to_detections(
+    boxes: np.ndarray, orig_w: int, orig_h: int, conf: float, names: list[str]
+) -> list[dict]:
+    """Convert one image's ``(N, 6)`` detector output into detection dicts, keeping boxes ≥ *conf*."""
+    detections: list[dict] = []
+    for x1, y1, x2, y2, score, cls in boxes.tolist():
+        if score < conf:
+            continue
+        cls_id = int(cls)
+
+        # Every backend already maps boxes to original image coords;
+        # just clamp to bounds.
+        x1 = max(0, min(int(x1), orig_w))
+        y1 = max(0, min(int(y1), orig_h))
+        x2 = max(0, min(int(x2), orig_w))
+        y2 = max(0, min(int(y2), orig_h))
+
+        detections.append({
+            "class_id": cls_id,
+            "class_name": names[cls_id] if cls_id < len(names) else f"class_{cls_id}",
+            "confidence": round(score, 3),
+            "bbox": [x1, y1, x2, y2],
+        })
+    return detections
+
+
+def _predict_batch(items: list[tuple[np.ndarray, float, ModelVersion, list[str]]]) -> list[list[dict]]:
+    """Run detector calls over a batch of (image, conf, model version, class names) items.
+
+    Items are grouped by the model version their request pinned (a batch
+    mixes versions right after a swap, or when several projects are busy).  Each group is predicted at its
+    lowest requested threshold and each caller's boxes are then filtered
+    back up to its own ``conf``.  With ``TILING`` each large page also
+    expands into tiles inside the same call (see ``predict_tiled``).
+    """
+    out: list[list[dict]] = [[] for _ in items]
+    groups: dict[str, list[int]] = {}
+    for i, (_, _, version, _) in enumerate(items):
+        groups.setdefault(version.version, []).append(i)
+    for idx in groups.values():
+        version = items[idx[0]][2]
+        images = [items[i][0] for i in idx]
+        threshold = min(items[i][1] for i in idx)
+        if TILING:
+            results = predict_tiled(version.detector, images, threshold, TILE_SIZE, TILE_OVERLAP, TILE_BATCH)
+        else:
+            results = version.detector.predict(images, conf=threshold)
+        for i, boxes in zip(idx, results):
+            img, c, _, names = items[i]
+            out[i] = _boxes_to_detections(boxes, img.shape[1], img.shape[0], c, names)
+    return out
+
+
+_batcher: MicroBatcher | None = None
+_batcher_init_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher:
+    """Return this process's detection batcher, starting it on first use."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_init_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    _predict_batch,
+                    max_batch=BATCH_SIZE,
+                    max_wait_ms=BATCH_WAIT_MS,
+                    name="formdex-detect",
+                )
+    return _batcher
+
 
+def submit_detection(
+    img: np.ndarray,
+    conf: float,
+    version: ModelVersion | None = None,
+    project: Project | None = None,
+) -> Future:
+    """Queue a page for batched detection; the future resolves to its detections.
 
-def detect_on_image(img: Image.Image, conf: float) -> list[dict]:
-    """Run YOLO on a PIL image and return raw detections.
+    ``project`` picks the model and class names (default: the default
+    project); ``version`` pins the model (default: the project's current one).
+    """
+    project = project or get_project()
+    version = version or get_registry(project.name).current()
+    # The page array goes to the detector as is (usually a pixmap view, see PageImage).
+    return get_batcher().submit((img, conf, version, project.classes))
+
+
+def detect_on_image(
+    img: np.ndarray,
+    conf: float,
+    version: ModelVersion | None = None,
+    project: Project | None = None,
+) -> list[dict]:
+    """Run YOLO on an RGB page array and return raw detections.
 
     The image is passed directly to YOLO which handles letterbox resizing
     internally (single resize, no quality loss).  YOLO returns bounding
     boxes already mapped back to the original image coordinates.
+
+    Pages from concurrent requests (and look-ahead pages of the same PDF)
+    share one ``predict`` call via the micro-batcher.
     """
-    orig_w, orig_h = img.size
+    return submit_detection(img, conf, version, project).result()
 
-    # Convert PIL → numpy for ultralytics (avoids temp-file I/O)
-    img_np = np.array(img)
 
-    yolo = get_model()
-    names = get_class_names()
-    results = yolo.predict(
-        source=img_np,
-        conf=conf,
-        imgsz=_INFERENCE_IMGSZ,
-        verbose=False,
-    )
+# Smoke pages new model versions must pass before they are swapped in, by path.
+_smoke_pages: dict[Path, np.ndarray] = {}
 
-    detections: list[dict] = []
-    for r in results:
-        for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            cls_id = int(box.cls[0])
-
-            # Ultralytics already maps boxes to original image coords;
-            # just clamp to bounds.
-            x1 = max(0, min(int(x1), orig_w))
-            y1 = max(0, min(int(y1), orig_h))
-            x2 = max(0, min(int(x2), orig_w))
-            y2 = max(0, min(int(y2), orig_h))
-
-            detections.append({
-                "class_id": cls_id,
-                "class_name": names[cls_id] if cls_id < len(names) else f"class_{cls_id}",
-                "confidence": round(float(box.conf[0]), 3),
-                "bbox": [x1, y1, x2, y2],
-            })
-    return detections
 
+def _get_smoke_page(pdf_path: Path) -> np.ndarray | None:
+    if pdf_path not in _smoke_pages and pdf_path.exists():
+        with _FITZ_LOCK:
+            doc = fitz.open(str(pdf_path))
+            try:
+                pix = doc[0].get_pixmap(matrix=fitz.Matrix(200 / 72, 200 / 72))
+                page = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3).copy()
+                del pix  # freed under the lock, not when the function returns
+            finally:
+                doc.close()
+        _smoke_pages[pdf_path] = page
+    return _smoke_pages.get(pdf_path)
 
-def annotate_page(
-    img: Image.Image,
-    detections: list[dict],
-    crops_dir: Path,
-    page_idx: int,
-) -> tuple[Image.Image, list[dict]]:
-    """Annotate one page image and extract field values.
 
-    Returns (annotated_image, list_of_extracted_entries).
+def validate_detector(detector: Detector, project: Project) -> None:
+    """Raise unless *detector* produces sane boxes on the smoke page.
+
+    The default project is checked on ``SMOKE_PDF`` (which must yield
+    ``SMOKE_MIN_DETECTIONS`` boxes); other projects on their blank
+    ``form_template.pdf``, where only well-formed boxes are required.
     """
-    img = img.copy().convert("RGB")
-    draw = ImageDraw.Draw(img)
-    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    overlay_draw = ImageDraw.Draw(overlay)
+    smoke_pdf = SMOKE_PDF if project.name == DEFAULT_PROJECT else project.template
+    page = _get_smoke_page(smoke_pdf)
+    if page is None:
+        page = np.full((_INFERENCE_IMGSZ, _INFERENCE_IMGSZ, 3), 255, dtype=np.uint8)
+    boxes = detector.predict([page], conf=0.25)[0]
+    if boxes.ndim != 2 or boxes.shape[1] != 6:
+        raise ValueError(f"detector returned boxes of shape {boxes.shape}, expected (N, 6)")
+    num_classes = len(project.classes)
+    if len(boxes) and boxes[:, 5].max() >= num_classes:
+        raise ValueError(f"detector predicts class {int(boxes[:, 5].max())}, but only {num_classes} classes exist")
+    if smoke_pdf == SMOKE_PDF and smoke_pdf in _smoke_pages and len(boxes) < SMOKE_MIN_DETECTIONS:
+        raise ValueError(
+            f"only {len(boxes)} detections on the smoke page ({SMOKE_PDF.name}), need {SMOKE_MIN_DETECTIONS}"
+        )
 
-    class_counts: dict[str, int] = {}
+
+def extract_fields(
+    img: PageImage | None,
+    detections: list[dict],
+    page_idx: int,
+    words: list[Word] | None = None,
+    mat: fitz.Matrix | None = None,
+    crop: Callable[[tuple[int, int, int, int]], np.ndarray] | None = None,
+    ocr_crop: Callable[[tuple[int, int, int, int]], np.ndarray] | None = None,
+) -> list[dict]:
+    """Read the value of every detection: text layer or OCR for text fields, ink density for checkboxes.
+
+    ``words`` is the page's text layer (unrotated PDF points) and ``mat`` the
+    matrix from those points to render pixels, ``page.rotation_matrix`` times
+    the render matrix.  Each text field's bbox is mapped back through the
+    inverse matrix; fields with embedded text take it as their value and only
+    the rest are OCRed.  ``value_source`` records which path produced a value.
+
+    ``crop(bbox)`` supplies field images as RGB arrays (default: slices of
+    *img*, no copy).  When
+    given, fields are always OCRed one by one, since *img* may not be at the
+    bboxes' resolution.  ``ocr_crop(bbox)`` supplies the images per-field OCR
+    reads (default: ``crop``, upscaled by ``extract_text_from_crop``).
+    """
+    page_ocr = OCR_MODE == "page" and crop is None
+    crop = crop or img.crop
+    ocr_crop = ocr_crop or crop
     extracted: list[dict] = []
+    text_idx = [i for i, d in enumerate(detections) if d["class_name"] != "checkbox"]
+
+    layer_texts: dict[int, str] = {}
+    if words and mat is not None:
+        to_pdf = ~mat
+        boxes = [tuple(fitz.Rect(detections[i]["bbox"]) * to_pdf) for i in text_idx]
+        layer_texts = {i: t for i, t in zip(text_idx, text_in_boxes(words, boxes)) if t}
+    ocr_idx = [i for i in text_idx if i not in layer_texts]
+
+    # Page mode: read every remaining text field with a single Tesseract pass.
+    page_texts: dict[int, str] = {}
+    if page_ocr and ocr_idx:
+        texts = ocr_fields_on_page(
+            img.array, [(tuple(detections[i]["bbox"]), detections[i]["class_name"]) for i in ocr_idx]
+        )
+        page_texts = dict(zip(ocr_idx, texts))
+
+    if layer_texts:
+        if page_ocr:
+            avoided = 0 if ocr_idx else 1
+        else:
+            avoided = len(layer_texts)
+        text_layer_stats.record(len(layer_texts), avoided)
 
-    for det in detections:
+    for det_idx, det in enumerate(detections):
         x1, y1, x2, y2 = det["bbox"]
         cls_name = det["class_name"]
-        conf = det["confidence"]
-        cls_id = det["class_id"]
-        color = COLORS[cls_id % len(COLORS)]
-
-        crop = img.crop((x1, y1, x2, y2))
-        class_counts[cls_name] = class_counts.get(cls_name, 0) + 1
-        crop_name = f"p{page_idx}_{cls_name}_{class_counts[cls_name]:03d}.jpg"
-        crop.save(crops_dir / crop_name)
 
         entry: dict = {
             "page": page_idx,
             "field_type": cls_name,
-            "confidence": conf,
+            "confidence": det["confidence"],
             "bbox": [x1, y1, x2, y2],
-            "crop_file": crop_name,
+            "crop_file": None,
         }
+        if "field_name" in det:  # registered against a template
+            entry["field_name"] = det["field_name"]
 
         if cls_name == "checkbox":
-            checked = is_checkbox_checked(crop)
+            checked = is_checkbox_checked(crop((x1, y1, x2, y2)))
             entry["checked"] = checked
             entry["value"] = "✓ CHECKED" if checked else "☐ UNCHECKED"
+            entry["value_source"] = "ink"
+        elif det_idx in layer_texts:
+            entry["value"] = layer_texts[det_idx]
+            entry["value_source"] = "text_layer"
+        elif det_idx in page_texts:
+            entry["value"] = page_texts[det_idx]
+            entry["value_source"] = "ocr"
         else:
-            entry["value"] = extract_text_from_crop(crop, cls_name)
+            entry["value"] = extract_text_from_crop(ocr_crop((x1, y1, x2, y2)), cls_name)
+            entry["value_source"] = "ocr"
 
         extracted.append(entry)
+    return extracted
+
+
+def widget_entries(fields: list[dict], page_idx: int, mat: fitz.Matrix) -> list[dict]:
+    """Turn AcroForm widget fields into result entries (bbox in render pixels).
+
+    Widget rects are in unrotated page space, so *mat* must include the
+    page's rotation: ``page.rotation_matrix * render_matrix``.
+    """
+    entries: list[dict] = []
+    for f in fields:
+        r = f["rect"] * mat
+        entry: dict = {
+            "page": page_idx,
+            "field_type": f["class_name"],
+            "confidence": 1.0,
+            "bbox": [int(r.x0), int(r.y0), int(r.x1), int(r.y1)],
+            "crop_file": None,
+        }
+        if f["class_name"] == "checkbox":
+            entry["checked"] = f["checked"]
+            entry["value"] = "✓ CHECKED" if f["checked"] else "☐ UNCHECKED"
+        else:
+            entry["value"] = f["value"]
+        entry["field_name"] = f["field_name"]
+        entry["value_source"] = "acroform"
+        entries.append(entry)
+    return entries
+
+
+def save_crops(
+    img: PageImage,
+    entries: list[dict],
+    crops_dir: Path,
+    page_idx: int,
+    crop: Callable[[tuple[int, int, int, int]], np.ndarray] | None = None,
+) -> None:
+    """Write one JPEG per entry and record its name in ``crop_file``.
+
+    ``crop(bbox)`` supplies the field images, as in ``extract_fields``.
+    """
+    crop = crop or img.crop
+    name_crops(entries, page_idx)
+    for entry in entries:
+        Image.fromarray(crop(tuple(entry["bbox"]))).save(crops_dir / entry["crop_file"])
+
+
+def name_crops(entries: list[dict], page_idx: int) -> None:
+    """Set each entry's ``crop_file`` (``p<page>_<class>_<n>.jpg``) without writing anything."""
+    class_counts: dict[str, int] = {}
+    for entry in entries:
+        cls_name = entry["field_type"]
+        class_counts[cls_name] = class_counts.get(cls_name, 0) + 1
+        entry["crop_file"] = f"p{page_idx}_{cls_name}_{class_counts[cls_name]:03d}.jpg"
+
+
+def scale_boxes(items: list[dict], factor: float) -> list[dict]:
+    """Copies of detection / result dicts with ``bbox`` multiplied by *factor*."""
+    return [{**d, "bbox": [round(v * factor) for v in d["bbox"]]} for d in items]
+
+
+def _tint(img: Image.Image, box: list[float], fill: tuple, outline: tuple, width: int) -> None:
+    """Alpha-blend a filled, outlined rectangle onto the RGB *img*, touching only *box*'s pixels."""
+    w, h = img.size
+    left, top = max(0, int(box[0])), max(0, int(box[1]))
+    right, bottom = min(w, int(box[2]) + 2), min(h, int(box[3]) + 2)
+    if right <= left or bottom <= top:
+        return
+    overlay = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+    ImageDraw.Draw(overlay).rectangle(
+        [box[0] - left, box[1] - top, box[2] - left, box[3] - top], fill=fill, outline=outline, width=width
+    )
+    region = Image.alpha_composite(img.crop((left, top, right, bottom)).convert("RGBA"), overlay)
+    img.paste(region.convert("RGB"), (left, top))
+
+
+def draw_annotations(img: Image.Image, entries: list[dict], project: Project | None = None) -> Image.Image:
+    """Draw boxes, labels and values for *entries* onto *img* (in place).
+
+    Boxes use the project's class colours.  Returns the annotated RGB image.
+    """
+    project = project or get_project()
+    draw = ImageDraw.Draw(img)
+    # Translucent checkbox highlights, blended in at the end one box at a
+    # time rather than through a page-sized RGBA overlay and composite.
+    tints: list[tuple] = []
+
+    for entry in entries:
+        x1, y1, x2, y2 = entry["bbox"]
+        cls_name = entry["field_type"]
+        conf = entry["confidence"]
+        color = project.color(cls_name)
 
-        # ── Draw ───────────────────────────────────────────────────────
         if cls_name == "checkbox":
             pad = 6
             if entry.get("checked"):
-                overlay_draw.rectangle(
-                    [x1 - pad, y1 - pad, x2 + pad, y2 + pad],
-                    fill=(0, 200, 83, 70), outline=(0, 200, 83, 255), width=3,
-                )
+                tints.append(([x1 - pad, y1 - pad, x2 + pad, y2 + pad], (0, 200, 83, 70), (0, 200, 83, 255)))
                 draw.text((x2 + 4, y1 - 4), "✓", fill=(0, 180, 60), font=FONT_CHECK)
                 label = f"CHECKED {conf:.0%}"
                 lbl_color = (0, 200, 83)
             else:
-                overlay_draw.rectangle(
-                    [x1 - pad, y1 - pad, x2 + pad, y2 + pad],
-                    fill=(220, 20, 60, 50), outline=(220, 20, 60, 255), width=3,
-                )
+                tints.append(([x1 - pad, y1 - pad, x2 + pad, y2 + pad], (220, 20, 60, 50), (220, 20, 60, 255)))
                 draw.text((x2 + 4, y1 - 4), "✗", fill=(220, 20, 60), font=FONT_CHECK)
                 label = f"UNCHECKED {conf:.0%}"
                 lbl_color = (220, 20, 60)
@@ -255,95 +796,869 @@ def annotate_page(
             if entry.get("value"):
                 draw.text((x1 + 2, y2 + 2), entry["value"][:50], fill=color, font=FONT_SM)
 
-    # Composite overlay
-    img_rgba = img.convert("RGBA")
-    img_rgba = Image.alpha_composite(img_rgba, overlay)
-    return img_rgba.convert("RGB"), extracted
+    for box, fill, outline in tints:
+        _tint(img, box, fill, outline, width=3)
+    return img
 
 
-def process_pdf(pdf_bytes: bytes, conf: float, dpi: int) -> tuple[str, dict]:
-    """Process all pages of a PDF and return (job_id, result_dict)."""
-    job_id = uuid.uuid4().hex[:12]
-    job_dir = JOBS_DIR / job_id
-    job_dir.mkdir(parents=True)
-    crops_dir = job_dir / "crops"
-    crops_dir.mkdir()
+def annotate_page(
+    img: Image.Image,
+    detections: list[dict],
+    crops_dir: Path,
+    page_idx: int,
+) -> tuple[Image.Image, list[dict]]:
+    """Annotate one page image and extract field values.
 
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    num_pages = len(doc)
+    Values are read and crops saved from the clean page before anything is
+    drawn on it.  Returns (annotated_image, list_of_extracted_entries).
+    """
+    page = PageImage(np.asarray(img if img.mode == "RGB" else img.convert("RGB")))
+    extracted = extract_fields(page, detections, page_idx)
+    save_crops(page, extracted, crops_dir, page_idx)
+    return draw_annotations(page.to_pil(), extracted), extracted
 
-    all_extracted: list[dict] = []
-    page_summaries: list[dict] = []
-    annotated_files: list[str] = []
 
-    t0 = time.time()
+_templates: dict[str, FormTemplate | None] = {}
 
-    for page_idx in range(num_pages):
-        page = doc[page_idx]
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
-        pix = page.get_pixmap(matrix=mat)
 
-        # Convert pixmap → PIL
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+def get_template(project: Project) -> FormTemplate | None:
+    """The project's registration template (``None`` without a form_template.pdf or OpenCV)."""
+    if project.name not in _templates:
+        template = None
+        if project.template.exists():
+            try:
+                with _FITZ_LOCK:
+                    template = load_template(project.template)
+            except RuntimeError:
+                pass  # OpenCV missing: YOLO for everything
+        _templates[project.name] = template if template and template.pages else None
+    return _templates[project.name]
 
-        # Detect
-        detections = detect_on_image(img, conf=conf)
 
-        # Annotate + extract
-        annotated_img, page_extracted = annotate_page(img, detections, crops_dir, page_idx)
+def register_page(
+    img: PageImage,
+    page_idx: int,
+    signature: LayoutSignature,
+    template: FormTemplate,
+    project: Project,
+    dpi: float,
+) -> tuple[list[dict], dict] | None:
+    """Project the template's fields onto page *page_idx*, rendered at *dpi*.
+
+    Returns (detections, alignment info), or ``None`` when no template page
+    matches or the alignment isn't confident enough.
+    """
+    t0 = time.perf_counter()
+    template_page, _ = template.match_page(signature, ROUTE_MAX_DISTANCE, index=page_idx)
+    alignment = align(to_gray(img.array, dpi), template_page) if template_page is not None else None
+    ok = (
+        alignment is not None
+        and alignment.inliers >= REGISTRATION_MIN_INLIERS
+        and alignment.inlier_ratio >= REGISTRATION_MIN_RATIO
+    )
+    registration_stats.record(ok, time.perf_counter() - t0)
+    if not ok:
+        return None
+    detections = project_fields(template_page, alignment, dpi, img.size, project.classes)
+    return detections, {**alignment.info(), "template_page": template_page.index}
 
-        # Save annotated page
+
+def route_document(doc: fitz.Document) -> tuple[Project, str, int | None]:
+    """Pick the project for an upload that didn't name one.
+
+    Compares a layout hash of the first page with every project's
+    ``form_template.pdf`` and takes the closest within
+    ``ROUTE_MAX_DISTANCE`` bits.  Returns (project, how, distance), where
+    how is ``"layout"`` or ``"default"``.  Call with ``_FITZ_LOCK`` held.
+    """
+    projects = get_projects()
+    if len(projects) > 1 and len(doc):
+        match, distance = route(layout_signature(doc[0]), list(projects.values()), ROUTE_MAX_DISTANCE)
+        if match is not None:
+            return match, "layout", distance
+    return get_project(), "default", None
+
+
+def memo_entry(work: dict, eager: bool) -> tuple[str, int, dict]:
+    """A finished page as a ``ResultCache.put_pages`` entry (with the artifact files it relies on)."""
+    files = []
+    if eager:
+        files = [f"crops/{e['crop_file']}" for e in work["extracted"] if e["crop_file"]] + [f"page_{work['page']}.jpg"]
+    return work["page_key"], work["page"], {"source": work["source"], "extracted": work["extracted"], "files": files}
+
+
+def format_fields(entries: list[dict], first: bool) -> str:
+    """*entries* as they appear inside ``results.json``'s ``fields`` list (*first*: no leading comma)."""
+    text = ",\n".join(
+        "\n".join("    " + line for line in json.dumps(e, indent=2, ensure_ascii=False).splitlines())
+        for e in entries
+    )
+    return text if first or not text else ",\n" + text
+
+
+def write_results(path: Path, result: dict, fields: IO[str] | None = None) -> None:
+    """Write *result* to *path* as indented JSON.
+
+    With *fields* (a file of ``format_fields`` output, written page by page),
+    the ``fields`` list is copied from it in chunks instead of being taken
+    from *result*; the file comes out the same either way.
+    """
+    if fields is None:
+        path.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        return
+    head = json.dumps({**result, "fields": []}, indent=2, ensure_ascii=False)
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(head[: -len("[]\n}")])
+        if fields.tell():
+            out.write("[\n")
+            fields.seek(0)
+            shutil.copyfileobj(fields, out)
+            out.write("\n  ]\n}")
+        else:
+            out.write("[]\n}")
+
+
+def adopt_result(result: dict, job_id: str) -> dict:
+    """Give queued job *job_id* its own copy of a cached *result* and of its artifacts.
+
+    Pages and crops are hard-linked (copied across filesystems) so the job
+    keeps serving them after the cache evicts the directory that produced
+    them; the result's ``job_id`` and URLs are rewritten to point at the job.
+    Raises ``FileNotFoundError`` if that directory is evicted meanwhile.
+    """
+    src_dir, job_dir = JOBS_DIR / result["job_id"], JOBS_DIR / job_id
+    (job_dir / "crops").mkdir(exist_ok=True)
+    for src in [*src_dir.glob("page_*.jpg"), *src_dir.glob("crops/*.jpg")]:
+        dst = job_dir / src.relative_to(src_dir)
+        try:
+            os.link(src, dst)
+        except FileExistsError:
+            pass
+        except OSError:
+            if not src.exists():
+                raise FileNotFoundError(src) from None
+            shutil.copyfile(src, dst)
+    old_prefix = f"/files/{result['job_id']}/"
+    result = {
+        **result,
+        "job_id": job_id,
+        "cached": True,
+        "pages": [
+            {**p, "annotated_image": p["annotated_image"] and p["annotated_image"].replace(old_prefix, f"/files/{job_id}/", 1)}
+            for p in result["pages"]
+        ],
+    }
+    write_results(job_dir / "results.json", result)
+    return result
+
+
+def process_pdf(
+    pdf_path: Path,
+    conf: float,
+    dpi: int,
+    job_id: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    acroform: bool = True,
+    annotate: bool = True,
+    project: str | None = None,
+    adaptive: bool = False,
+    artifacts: str = "eager",
+    on_page: Callable[[dict], None] | None = None,
+    low_memory: bool | None = None,
+) -> tuple[str, dict]:
+    """Process all pages of the PDF at *pdf_path* and return (job_id, result_dict).
+
+    ``job_id`` reuses an existing job directory (queued jobs store their
+    upload there); ``progress(page_idx, num_pages)`` is called after each page.
+    ``on_page(event)`` gets ``{"event": "page", "page": summary, "fields": [...]}``
+    as soon as each page is finished (in completion order; also replayed
+    from a cached result).
+
+    With ``acroform`` set and a filled AcroForm, pages that carry widgets are
+    read straight from the widget values — no detection or OCR — and are only
+    rendered when ``annotate`` asks for annotated images and crops.  Pages
+    without widgets go through the vision path.
+
+    ``artifacts`` says when those are written: ``"eager"`` during the run,
+    ``"lazy"`` only the first time ``/files`` asks for one (see
+    ``render_artifact``; the upload is kept as ``input.pdf`` for that), or
+    ``"none"`` (same as ``annotate=False``).
+
+    Results are cached by content (see ``result_cache_key``); a repeat upload
+    returns the stored result and artifact URLs without touching the PDF.
+    Otherwise each page is looked up by its own fingerprint, and only pages
+    not seen before are rendered, detected and OCRed.
+
+    ``project`` names the form project whose model and classes to use;
+    without it the first page is routed by layout (see ``route_document``).
+    The whole document runs on the model version that is current when it
+    starts, even if new weights are swapped in meanwhile.
+
+    Text fields that go to per-field OCR are rendered on their own, straight
+    from the PDF, at the zoom that makes them ``OCR_TARGET_HEIGHT`` px tall
+    (see ``ocr_zoom``), so the page itself only needs detection resolution.
+    With ``adaptive`` each page is rendered only as large as the detector
+    input (see ``coarse_zoom``) and checkboxes and crops are re-rendered at
+    *dpi* the same way.  Bboxes are always reported in *dpi* pixels.
+
+    The PDF is opened by path, so MuPDF reads it from disk as needed.  The
+    result's ``memory`` is the process's RSS before and at its highest
+    during the run (see ``shared/memory.py``).
+
+    ``low_memory`` (default ``LOW_MEMORY``) runs one page at a time and
+    appends each page's fields to ``results.json`` as it finishes; the
+    returned result then has no ``fields`` (they are only in the file).
+    """
+    low_memory = LOW_MEMORY if low_memory is None else low_memory
+    mode = artifacts if annotate else "none"
+    eager, lazy = mode == "eager", mode == "lazy"
+    doc = None
+    if project is None:
+        with _FITZ_LOCK:
+            doc = fitz.open(str(pdf_path))
+            target, routed_by, distance = route_document(doc)
+    else:
+        target, routed_by, distance = get_project(project), "request", None
+    version = get_registry(target.name).current()
+    key = None
+    if CACHE_ENABLED:
+        key = result_cache_key(
+            file_digest(pdf_path).encode(), target, version, conf=conf, dpi=dpi, acroform=acroform, adaptive=adaptive, artifacts=mode
+        )
+        cached = get_result_cache().get(key)
+        if cached is not None and job_id is not None:
+            try:
+                cached = adopt_result(cached, job_id)
+            except FileNotFoundError:
+                cached = None  # evicted before its files were linked: process the upload
+        if cached is not None:
+            cached["cached"] = True
+            if doc is not None:
+                with _FITZ_LOCK:
+                    doc.close()
+            if job_id is not None and progress is not None:
+                for page_idx in range(cached["num_pages"]):
+                    progress(page_idx, cached["num_pages"])
+            if on_page is not None:
+                for summary in cached["pages"]:
+                    fields = [e for e in cached["fields"] if e["page"] == summary["page"]]
+                    on_page({"event": "page", "page": summary, "fields": fields})
+            return job_id or cached["job_id"], cached
+
+    queued = job_id is not None
+    job_id = job_id or uuid.uuid4().hex[:12]
+    job_dir = JOBS_DIR / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    crops_dir = job_dir / "crops"
+    crops_dir.mkdir(exist_ok=True)
+    if lazy and not queued:
+        shutil.copyfile(pdf_path, job_dir / "input.pdf")  # queued jobs already keep theirs
+
+    t0 = time.time()
+
+    with _FITZ_LOCK:
+        doc = doc or fitz.open(str(pdf_path))
+        num_pages = len(doc)
+        use_widgets = acroform and acroform_is_filled(doc)
+    template = get_template(target) if REGISTRATION else None
+
+    scale = dpi / 72
+    mat = fitz.Matrix(scale, scale)
+
+    # ── Stages: render → detect → extract (OCR) → encode ──────────────────
+    # Each page flows through as a dict.  While page N is in detection,
+    # page N+1 is rendering and page N-1 is being OCRed.
+
+    def render(page_idx: int) -> dict:
+        work: dict = {"page": page_idx, "source": "vision"}
+        if CACHE_ENABLED and CACHE_PAGES:
+            # Unchanged page (same content, same settings) → reuse its results.
+            with _FITZ_LOCK:
+                fingerprint = page_fingerprint(doc[page_idx])
+            work["page_key"] = result_cache_key(
+                fingerprint.encode(), target, version, conf=conf, dpi=dpi, acroform=use_widgets, adaptive=adaptive,
+                artifacts=mode,
+            )
+            hit = get_result_cache().get_page(work["page_key"])
+            if hit is not None:
+                src_job, src_page, data = hit
+                work["source"] = data["source"]
+                work["reused"] = (src_job, src_page)
+                work["extracted"] = [{**e, "page": page_idx} for e in data["extracted"]]
+                return work
+
+        with _FITZ_LOCK:
+            page = doc[page_idx]
+            fields = read_widget_fields(page) if use_widgets else []
+            if fields:
+                work["source"] = "acroform"
+                work["extracted"] = widget_entries(fields, page_idx, page.rotation_matrix * mat)
+            elif TEXT_LAYER:
+                work["words"] = page_words(page)
+                work["words_mat"] = page.rotation_matrix * mat  # words ignore /Rotate
+            if not fields and template is not None:
+                work["layout"] = layout_signature(page)
+            if not fields or eager:
+                work["zoom"] = coarse_zoom(page, scale) if adaptive else scale
+                work["display"] = page.get_displaylist()
+                pix = work["display"].get_pixmap(matrix=fitz.Matrix(work["zoom"], work["zoom"]))
+                # A view of the pixmap, not a copy; freed under the lock by whoever drops it last.
+                work["img"] = PageImage.from_pixmap(pix, _FITZ_LOCK)
+                work["pixels"] = pix.width * pix.height
+        return work
+
+    def detect(work: dict) -> dict:
+        if "extracted" in work:
+            return work
+        registered = None
+        if "layout" in work:
+            # Known form: project the template's fields, YOLO only if it doesn't align.
+            registered = register_page(
+                work["img"], work["page"], work.pop("layout"), template, target, work["zoom"] * 72
+            )
+        if registered is not None:
+            work["detections"], work["alignment"] = registered
+            work["source"] = "template"
+        else:
+            work["detections"] = detect_on_image(work["img"].array, conf=conf, version=version, project=target)
+        if work["zoom"] != scale:
+            # Coarse render: report boxes in dpi pixels like the full-size path.
+            work["detections"] = scale_boxes(work["detections"], scale / work["zoom"])
+        return work
+
+    def field_renderer(work: dict, display: fitz.DisplayList, rendered: dict) -> Callable[..., np.ndarray]:
+        """Render a field's region of the page from *display*: at *dpi*, or with ``for_ocr`` at OCR size.
+
+        Regions are memoised in *rendered*, which the caller empties under ``_FITZ_LOCK``.
+        """
+
+        def render(bbox: tuple[int, int, int, int], for_ocr: bool = False) -> np.ndarray:
+            rect = fitz.Rect(bbox) * ~mat
+            zoom = ocr_zoom(rect, scale) if for_ocr else scale
+            if (bbox, zoom) not in rendered:
+                with _FITZ_LOCK:
+                    region = rendered[bbox, zoom] = render_region(display, rect, zoom)
+                work["pixels"] += region.shape[0] * region.shape[1]
+            return rendered[bbox, zoom]
+
+        return render
+
+    def extract(work: dict) -> dict:
+        img = work.pop("img", None)
+        display = work.pop("display", None)
+        rendered: dict = {}
+        render_field = crop = ocr_crop = None
+        try:
+            if img is not None:
+                render_field = field_renderer(work, display, rendered)
+                ocr_crop = functools.partial(render_field, for_ocr=True)
+                if work["zoom"] != scale:
+                    crop = render_field
+            if "extracted" not in work:
+                work["extracted"] = extract_fields(
+                    img, work.pop("detections"), work["page"],
+                    words=work.pop("words", None), mat=work.pop("words_mat", None), crop=crop, ocr_crop=ocr_crop,
+                )
+            if eager and img is not None:
+                save_crops(img, work["extracted"], crops_dir, work["page"], crop=crop)
+                entries = work["extracted"] if crop is None else scale_boxes(work["extracted"], work["zoom"] / scale)
+                work["annotated"] = draw_annotations(img.to_pil(), entries, target)
+            elif lazy and "reused" not in work:
+                name_crops(work["extracted"], work["page"])
+        finally:
+            # Freeing the page pixmap, its display list and the regions
+            # rendered from it drops images held in MuPDF's shared store:
+            # not outside the lock.
+            with _FITZ_LOCK:
+                rendered.clear()
+                img = display = render_field = crop = ocr_crop = None
+        return work
+
+    def encode(work: dict) -> dict:
+        page_idx = work["page"]
+        page_extracted = work["extracted"]
         ann_name = f"page_{page_idx}.jpg"
-        annotated_img.save(job_dir / ann_name, quality=95)
-        annotated_files.append(ann_name)
 
-        all_extracted.extend(page_extracted)
+        # Save annotated page
+        ann_url = None
+        if "annotated" in work:
+            work.pop("annotated").save(job_dir / ann_name, quality=95)
+            ann_url = f"/files/{job_id}/{ann_name}"
+        elif "reused" in work:
+            # Copy the memoised page's artifacts under this page's names
+            # (lazy ones are rendered from this job's own PDF when asked for).
+            src_job, src_page = work["reused"]
+            src_dir = JOBS_DIR / src_job
+            for entry in page_extracted:
+                if entry["crop_file"]:
+                    crop_name = f"p{page_idx}_{entry['crop_file'].split('_', 1)[1]}"
+                    if eager:
+                        shutil.copyfile(src_dir / "crops" / entry["crop_file"], crops_dir / crop_name)
+                    entry["crop_file"] = crop_name
+            if eager:
+                shutil.copyfile(src_dir / f"page_{src_page}.jpg", job_dir / ann_name)
+                ann_url = f"/files/{job_id}/{ann_name}"
+        if lazy:
+            ann_url = f"/files/{job_id}/{ann_name}"
 
         # Per-page summary
         checkboxes = [e for e in page_extracted if e["field_type"] == "checkbox"]
-        page_summaries.append({
+        work["summary"] = {
             "page": page_idx,
             "total_fields": len(page_extracted),
             "checkboxes": len(checkboxes),
             "checked": sum(1 for c in checkboxes if c.get("checked")),
             "unchecked": sum(1 for c in checkboxes if not c.get("checked")),
             "text_fields": len([e for e in page_extracted if e["field_type"] != "checkbox"]),
-            "annotated_image": f"/files/{job_id}/{ann_name}",
-        })
+            "source": work["source"],
+            "alignment": work.get("alignment"),
+            "render_dpi": round(work["zoom"] * 72) if "zoom" in work else None,
+            "rendered_mpx": round(work.get("pixels", 0) / 1e6, 2),
+            "reused": "reused" in work,
+            "annotated_image": ann_url,
+        }
 
-    doc.close()
+        work["value_sources"] = Counter(e["value_source"] for e in page_extracted)
+
+        if on_page is not None:
+            on_page({"event": "page", "page": work["summary"], "fields": page_extracted})
+        if progress is not None:
+            progress(page_idx, num_pages)
+        if low_memory:
+            # Hand the fields to disk (and the page memo) and keep only the summary.
+            fields_part.write(format_fields(page_extracted, first=not fields_part.tell()))
+            if key is not None and "page_key" in work and "reused" not in work:
+                get_result_cache().put_pages(job_id, [memo_entry(work, eager)])
+            del work["extracted"]
+        return work
+
+    fields_part = open(job_dir / "fields.part", "w+", encoding="utf-8") if low_memory else None
+    try:
+        with PeakRss() as rss:
+            if low_memory:
+                done = []
+                for page_idx in range(num_pages):
+                    done.append(encode(extract(detect(render(page_idx)))))
+                    with _FITZ_LOCK:
+                        fitz.TOOLS.store_shrink(100)  # drop fonts / images MuPDF cached for this page
+            else:
+                done = run_stages(
+                    range(num_pages),
+                    [
+                        # MuPDF calls are serialised anyway, so one render worker.
+                        Stage("render", render, workers=1),
+                        # Several detect workers keep more than one page in the
+                        # batcher at a time so a single PDF can fill a batch.
+                        Stage("detect", detect, workers=DETECT_WORKERS),
+                        Stage("extract", extract, workers=OCR_WORKERS),
+                        Stage("encode", encode, workers=ENCODE_WORKERS),
+                    ],
+                    queue_size=STAGE_QUEUE_SIZE,
+                )
+    except BaseException:
+        if fields_part is not None:
+            fields_part.close()
+            (job_dir / "fields.part").unlink(missing_ok=True)
+        raise
+    finally:
+        with _FITZ_LOCK:
+            doc.close()
     elapsed = round(time.time() - t0, 2)
 
+    done.sort(key=lambda w: w["page"])
+    page_summaries = [w["summary"] for w in done]
+    value_sources: Counter = Counter()
+    for w in done:
+        value_sources.update(w["value_sources"])
+
     # Overall summary
-    all_checkboxes = [e for e in all_extracted if e["field_type"] == "checkbox"]
     result = {
         "job_id": job_id,
         "num_pages": num_pages,
-        "total_fields": len(all_extracted),
-        "total_checkboxes": len(all_checkboxes),
-        "total_checked": sum(1 for c in all_checkboxes if c.get("checked")),
-        "total_unchecked": sum(1 for c in all_checkboxes if not c.get("checked")),
+        "total_fields": sum(p["total_fields"] for p in page_summaries),
+        "total_checkboxes": sum(p["checkboxes"] for p in page_summaries),
+        "total_checked": sum(p["checked"] for p in page_summaries),
+        "total_unchecked": sum(p["unchecked"] for p in page_summaries),
+        "acroform_pages": sum(1 for p in page_summaries if p["source"] == "acroform"),
+        "template_pages": sum(1 for p in page_summaries if p["source"] == "template"),
+        "value_sources": dict(value_sources),
         "processing_time_sec": elapsed,
+        "dpi": dpi,
+        "adaptive": adaptive,
+        "artifacts": mode,
+        "rendered_mpx": round(sum(w.get("pixels", 0) for w in done) / 1e6, 2),
+        "memory": rss.info(),
+        "project": target.name,
+        "routing": {"by": routed_by, "distance": distance},
+        "model_version": version.version,
+        "cached": False,
+        "reused_pages": [w["page"] for w in done if "reused" in w],
         "pages": page_summaries,
-        "fields": all_extracted,
     }
 
     # Save JSON to job dir too
-    import json
-    (job_dir / "results.json").write_text(
-        json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    if low_memory:
+        with fields_part:
+            write_results(job_dir / "results.json", result, fields_part)
+        (job_dir / "fields.part").unlink()
+    else:
+        result["fields"] = [e for w in done for e in w["extracted"]]
+        write_results(job_dir / "results.json", result)
+    if key is not None:
+        cache = get_result_cache()
+        cache.put(key, job_id, owned=not queued)
+        if not low_memory:
+            cache.put_pages(job_id, [memo_entry(w, eager) for w in done if "page_key" in w and "reused" not in w])
 
     return job_id, result
 
 
+# ── Lazy artifacts ─────────────────────────────────────────────────────────
+
+
+_JOB_ID_RE = re.compile(r"[0-9a-f]{12}")
+_ARTIFACT_RE = re.compile(r"[\w.-]+\.(?:jpg|png|json)")
+
+
+def job_file(job_id: str, *parts: str) -> Path | None:
+    """Path of a job's artifact, or ``None`` when the request could leave the job's directory.
+
+    *job_id* must look like one this service issued and the last of *parts*
+    like an artifact name; the resolved path must stay under ``JOBS_DIR / job_id``.
+    """
+    if not _JOB_ID_RE.fullmatch(job_id) or not _ARTIFACT_RE.fullmatch(parts[-1]):
+        return None
+    job_dir = (JOBS_DIR / job_id).resolve()
+    path = job_dir.joinpath(*parts).resolve()
+    return path if path.is_relative_to(job_dir) else None
+
+
+def render_artifact(job_id: str, filename: str) -> Path | None:
+    """Write a lazy job's annotated page (``page_<n>.jpg``) or field crop on first request.
+
+    Rebuilt from the job's ``results.json`` and ``input.pdf``: crops are
+    rendered from the PDF at the result's ``dpi``, annotated pages at the
+    resolution the run used.  Returns the file's path, or ``None`` when the
+    job or the artifact doesn't exist.
+    """
+    if job_file(job_id, filename) is None:
+        return None
+    job_dir = JOBS_DIR / job_id
+    results_path, pdf_path = job_dir / "results.json", job_dir / "input.pdf"
+    if not results_path.exists() or not pdf_path.exists():
+        return None
+    result = json.loads(results_path.read_text(encoding="utf-8"))
+    if result.get("artifacts") != "lazy" or result["job_id"] != job_id:
+        return None
+    if filename.startswith("page_"):
+        page_idx = int(filename[5:-4]) if filename[5:-4].isdigit() else -1
+        entries = [e for e in result["fields"] if e["page"] == page_idx]
+        out = job_dir / filename
+    else:
+        entries = [e for e in result["fields"] if e["crop_file"] == filename]
+        page_idx = entries[0]["page"] if entries else -1
+        out = job_dir / "crops" / filename
+    if not 0 <= page_idx < result["num_pages"]:
+        return None
+
+    scale = result["dpi"] / 72
+    with _FITZ_LOCK:
+        doc = fitz.open(str(pdf_path))
+        try:
+            page = doc[page_idx]
+            if out.parent == job_dir:
+                zoom = coarse_zoom(page, scale) if result["adaptive"] else scale
+                img = PageImage.from_pixmap(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))).to_pil()
+            else:
+                rect = fitz.Rect(entries[0]["bbox"]) * ~fitz.Matrix(scale, scale)
+                img = Image.fromarray(render_region(page.get_displaylist(), rect, scale))
+        finally:
+            doc.close()
+    if out.parent == job_dir:
+        try:
+            project = get_project(result["project"])
+        except KeyError:
+            project = get_project()
+        img = draw_annotations(img, scale_boxes(entries, zoom / scale), project)
+    # Write-then-rename: a concurrent request for the same file never sees half of it.
+    tmp = out.with_name(f".{uuid.uuid4().hex[:8]}.{out.name}")
+    img.save(tmp, "JPEG", quality=95 if out.parent == job_dir else 75)
+    os.replace(tmp, out)
+    return out
+
+
+# ── Streaming ──────────────────────────────────────────────────────────────
+
+
+def _put_event(events: Any, event: dict) -> None:
+    # Module-level (not a closure) so it pickles into process-pool workers.
+    events.put(event)
+
+
+def process_pdf_streamed(events: Any, pdf_path: Path, **options) -> None:
+    """Run ``process_pdf``, reporting to the *events* queue instead of returning.
+
+    Puts one ``page`` event per finished page, then a ``summary`` event (the
+    result without ``pages`` / ``fields``, which were already sent), or an
+    ``error`` event if processing fails.
+    """
+    try:
+        _, result = process_pdf(pdf_path, on_page=functools.partial(_put_event, events), **options)
+    except Exception as exc:  # noqa: BLE001 — reported to the client as the last event
+        events.put({"event": "error", "error": f"{type(exc).__name__}: {exc}"})
+    else:
+        summary = {k: v for k, v in result.items() if k not in ("pages", "fields")}
+        events.put({"event": "summary", **summary})
+
+
+class LoopQueue:
+    """An ``asyncio.Queue`` that pool threads ``put`` into through the event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def put(self, item: Any) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+
+_manager = None  # multiprocessing manager, for event queues that cross into process workers
+_relay: ThreadPoolExecutor | None = None  # threads blocked on those queues, one per open stream
+
+
+def new_event_queue() -> Any:
+    """A queue ``process_pdf_streamed`` can fill from whichever pool runs it.
+
+    Thread pool: a ``LoopQueue``, awaited without tying up a thread.  Process
+    pool: a manager queue, read on the ``_relay`` threads (not the default
+    executor, which the job store and the other ``to_thread`` calls share).
+    """
+    global _manager, _relay
+    if EXECUTOR_KIND != "process":
+        return LoopQueue(asyncio.get_running_loop())
+    if _manager is None:
+        _manager = multiprocessing.get_context("spawn").Manager()
+        _relay = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix="formdex-stream")
+    return _manager.Queue()
+
+
+async def next_event(events: Any) -> dict:
+    """The next event from a ``new_event_queue()`` queue."""
+    if isinstance(events, LoopQueue):
+        return await events.queue.get()
+    return await asyncio.get_running_loop().run_in_executor(_relay, events.get)
+
+
+def format_event(event: dict, stream: str) -> str:
+    data = json.dumps(event, ensure_ascii=False)
+    if stream == "sse":
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+# ── Worker pool ────────────────────────────────────────────────────────────
+
+_executor: Executor | None = None
+_in_flight = 0  # only touched from the event loop, so no lock needed
+
+
+def _init_worker() -> None:
+    """Process-pool initializer: load and warm this worker's own model copies up front."""
+    for name in PINNED_PROJECTS:
+        get_model(name)
+    if WARMUP_RUNS > 0:
+        warmup(WARMUP_RUNS)
+
+
+def get_executor() -> Executor:
+    """Return the shared worker pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        if EXECUTOR_KIND == "process":
+            # spawn, not fork: torch and MuPDF don't survive a fork with live threads
+            _executor = ProcessPoolExecutor(
+                max_workers=EXECUTOR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        elif EXECUTOR_KIND == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=EXECUTOR_WORKERS,
+                thread_name_prefix="formdex",
+            )
+        else:
+            raise ValueError(f"Unknown FORMDEX_EXECUTOR: {EXECUTOR_KIND!r} (expected 'thread' or 'process')")
+    return _executor
+
+
+async def run_in_pool(fn, /, *args, **kwargs):
+    """Run a blocking function on the worker pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+# ── Warmup ─────────────────────────────────────────────────────────────────
+
+# starting → warming → ready | failed; /ready answers 503 until "ready".
+_readiness: dict = {"state": "starting", "error": None, "warmup_sec": None}
+
+
+def warmup(runs: int) -> float:
+    """Load everything a request needs and run *runs* dummy detection batches.
+
+    Each run pushes a full batch of blank ``_INFERENCE_IMGSZ`` pages through
+    the batcher for every pinned project, so the predictors, the batched
+    kernels and the thread pools behind them are all initialised before real
+    traffic arrives.  Also hashes the routing templates, loads registration
+    templates, starts the OCR engines and exercises the drawing fonts.
+    Returns seconds.
+    """
+    t0 = time.perf_counter()
+    with _FITZ_LOCK:
+        for project in get_projects().values():
+            project.signature()
+
+    blank = np.full((_INFERENCE_IMGSZ, _INFERENCE_IMGSZ, 3), 255, dtype=np.uint8)
+    for name in sorted(PINNED_PROJECTS):
+        project = get_project(name)
+        get_model(name)
+        if REGISTRATION:
+            get_template(project)
+        for _ in range(runs):
+            for fut in [submit_detection(blank, conf=0.25, project=project) for _ in range(BATCH_SIZE)]:
+                fut.result()
+
+    get_ocr_pool().warm()
+    extract_text_from_crop(Image.new("RGB", (200, 40), "white"), "text_field")
+    draw_annotations(
+        Image.new("RGB", (200, 80), "white"),
+        [{"field_type": "text_field", "confidence": 1.0, "bbox": [10, 30, 150, 60], "value": "warmup"}],
+    )
+    return time.perf_counter() - t0
+
+
+async def _warm_up() -> None:
+    """Background startup task: warm the pool, then flip readiness."""
+    if WARMUP_RUNS <= 0:
+        _readiness["state"] = "ready"
+        return
+    _readiness["state"] = "warming"
+    t0 = time.perf_counter()
+    try:
+        if EXECUTOR_KIND == "process":
+            # A worker runs _init_worker (load + warmup) before its first
+            # task, so a PID coming back means that worker is warm.  The
+            # first round makes the pool spawn every worker, but the first
+            # one up can answer all of its tasks alone: keep asking until
+            # every worker has answered.
+            warm: set[int] = set()
+            while len(warm) < EXECUTOR_WORKERS:
+                if warm:
+                    await asyncio.sleep(0.2)
+                warm.update(await asyncio.gather(*(run_in_pool(os.getpid) for _ in range(EXECUTOR_WORKERS))))
+        else:
+            await run_in_pool(warmup, WARMUP_RUNS)
+    except Exception as exc:
+        _readiness.update(state="failed", error=f"{type(exc).__name__}: {exc}")
+        return
+    _readiness.update(state="ready", warmup_sec=round(time.perf_counter() - t0, 2))
+
+
+# ── Job queue ──────────────────────────────────────────────────────────────
+
+_job_store: JobStore | None = None
+_jobs_wakeup = asyncio.Event()
+
+
+def get_job_store() -> JobStore:
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore(STATE_DIR / "jobs.db")
+    return _job_store
+
+
+def _record_job_progress(job_id: str, page_idx: int, num_pages: int) -> None:
+    # Module-level (not a closure) so it pickles into process-pool workers.
+    get_job_store().record_page(job_id, page_idx, num_pages)
+
+
+def _run_job(job_id: str, conf: float, dpi: int, **options) -> None:
+    """Process a queued job's stored upload; results land in its job dir."""
+    process_pdf(
+        JOBS_DIR / job_id / "input.pdf",
+        conf=conf,
+        dpi=dpi,
+        job_id=job_id,
+        progress=functools.partial(_record_job_progress, job_id),
+        **options,
+    )
+
+
+async def _job_worker() -> None:
+    """Pull queued jobs one at a time and run them on the worker pool."""
+    store = get_job_store()
+    while True:
+        _jobs_wakeup.clear()
+        job = await asyncio.to_thread(store.claim_next)
+        if job is None:
+            try:
+                await asyncio.wait_for(_jobs_wakeup.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        job_id = job["job_id"]
+        try:
+            await run_in_pool(_run_job, job_id, **job["params"])
+        except Exception as exc:
+            await asyncio.to_thread(store.fail, job_id, f"{type(exc).__name__}: {exc}")
+        else:
+            await asyncio.to_thread(store.finish, job_id)
+
+
+async def _model_sweeper() -> None:
+    """Unload idle project models even when no request comes in to trigger it."""
+    while True:
+        await asyncio.sleep(min(60.0, MODEL_IDLE_SEC))
+        if _model_cache is not None:
+            await asyncio.to_thread(_model_cache.sweep)
+
+
 # ── FastAPI app ────────────────────────────────────────────────────────────
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs that were mid-flight when the server last stopped start over.
+    await asyncio.to_thread(get_job_store().requeue_running)
+    workers = [asyncio.create_task(_job_worker()) for _ in range(JOB_WORKERS)]
+    # Warm in the background so /health answers (as not ready) meanwhile.
+    warming = asyncio.create_task(_warm_up())
+    if MODEL_IDLE_SEC > 0:
+        workers.append(asyncio.create_task(_model_sweeper()))
+    yield
+    warming.cancel()
+    for task in workers:
+        task.cancel()
+    if _batcher is not None:
+        _batcher.close()
+    get_ocr_pool().close()
+    if _model_cache is not None:
+        _model_cache.close()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    if _relay is not None:
+        _relay.shutdown(wait=False, cancel_futures=True)
+    if _manager is not None:
+        _manager.shutdown()
+
+
 app = FastAPI(
     title="FormDex — PDF Form Field Extractor",
     description="Upload a filled PDF form → get structured extraction of every text field, "
                 "checkbox state, date, dollar amount, signature, and case number.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -357,17 +1672,238 @@ async def root():
 async def health():
     return {
         "status": "ok",
-        "model_loaded": model is not None,
-        "weights": str(WEIGHTS),
-        "classes": get_class_names(),
+        "ready": _readiness["state"] == "ready",
+        "readiness": _readiness,
+        "model_loaded": _model_cache is not None and any(
+            r["loaded"] for r in _model_cache.stats()["resident"].values()
+        ),
+        "detector": DETECTOR_BACKEND,
+        "precision": DETECTOR_PRECISION,
+        "default_project": DEFAULT_PROJECT,
+        "weights": str(DETECTOR_MODEL),
+        "projects": sorted(get_projects()),
+        "models": _model_cache.stats() if _model_cache is not None else None,
+        "executor": EXECUTOR_KIND,
+        "workers": EXECUTOR_WORKERS,
+        "in_flight": _in_flight,
+        "max_in_flight": MAX_IN_FLIGHT,
+        "jobs": get_job_store().counts(),
+        "batching": get_batcher().stats() if _batcher is not None else None,
+        "tiling": {"tile": TILE_SIZE, "overlap": TILE_OVERLAP, "batch": TILE_BATCH} if TILING else None,
+        "ocr": get_ocr_pool().stats(),
+        "text_layer": text_layer_stats.stats() if TEXT_LAYER else None,
+        "registration": registration_stats.stats() if REGISTRATION else None,
+        "cache": get_result_cache().stats() if CACHE_ENABLED else None,
+    }
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the model and OCR engines are warm, else 503."""
+    if _readiness["state"] != "ready":
+        return JSONResponse(status_code=503, content=_readiness)
+    return _readiness
+
+
+def _per_worker_models() -> JSONResponse | None:
+    """409 in process mode, where every worker holds its own models, else None."""
+    if EXECUTOR_KIND == "process":
+        return JSONResponse(
+            status_code=409,
+            content={"error": "Models are per worker with FORMDEX_EXECUTOR=process; "
+                              "configure them through the environment and restart."},
+        )
+    return None
+
+
+def _unknown_project(name: str | None) -> JSONResponse | None:
+    """404 response for a project that doesn't exist under runs/, else None."""
+    try:
+        get_project(name)
+    except KeyError:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Unknown project: {name}", "projects": sorted(get_projects())},
+        )
+    return None
+
+
+@app.get("/projects")
+async def list_projects():
+    """Servable projects, which of them have a model resident, and cache limits."""
+    cache = get_model_cache().stats()
+    return {
+        "default": DEFAULT_PROJECT,
+        "projects": [
+            {**p.info(), **cache["resident"].get(p.name, {"loaded": False, "pinned": p.name in cache["pinned"]})}
+            for p in get_projects().values()
+        ],
+        "cache": {k: v for k, v in cache.items() if k != "resident"},
     }
 
 
+@app.post("/projects/{name}/pin")
+async def pin_project(name: str):
+    """Keep the project's model resident: never evicted or unloaded when idle."""
+    if (error := _per_worker_models() or _unknown_project(name)) is not None:
+        return error
+    get_model_cache().pin(name)
+    await run_in_pool(get_model, name)
+    return get_model_cache().stats()["resident"][name]
+
+
+@app.post("/projects/{name}/unpin")
+async def unpin_project(name: str):
+    """Make the project's model evictable again."""
+    if (error := _per_worker_models() or _unknown_project(name)) is not None:
+        return error
+    get_model_cache().unpin(name)
+    return {"name": name, "pinned": False}
+
+
+@app.post("/projects/{name}/unload")
+async def unload_project(name: str):
+    """Drop the project's model now (it reloads on the next request that needs it)."""
+    if (error := _per_worker_models() or _unknown_project(name)) is not None:
+        return error
+    if name in get_model_cache().pinned:
+        return JSONResponse(status_code=409, content={"error": f"Project {name} is pinned; unpin it first"})
+    return {"name": name, "unloaded": get_model_cache().unload(name)}
+
+
+@app.get("/models")
+async def list_models(
+    project: str | None = Query(None, description="Form project (default: FORMDEX_PROJECT)"),
+):
+    """Current model version, the versions kept for rollback and the last load."""
+    if (error := _unknown_project(project)) is not None:
+        return error
+    # peek: a status read must not load the project or evict another one.
+    registry = get_model_cache().peek(project or DEFAULT_PROJECT)
+    if registry is None:
+        return {"current": None, "previous": [], "keep": MODEL_HISTORY, "last_load": None}
+    return registry.status()
+
+
+@app.post("/models", status_code=202)
+async def load_model(
+    weights: str = Query(..., description="Weights to load, relative to the repo root (must be under runs/)"),
+    project: str | None = Query(None, description="Form project (default: FORMDEX_PROJECT)"),
+):
+    """Load new weights in the background and swap them in once validated.
+
+    Requests already running finish on the version they started with; poll
+    ``GET /models`` for ``last_load.state`` (``loading`` → ``active`` / ``failed``).
+    The project is pinned, so the swapped-in weights aren't lost to eviction.
+    """
+    if (error := _per_worker_models() or _unknown_project(project)) is not None:
+        return error
+    path = (ROOT / weights).resolve()
+    if not path.is_relative_to(RUNS_DIR.resolve()):
+        return JSONResponse(status_code=400, content={"error": f"Weights must be under {RUNS_DIR}"})
+    if not path.exists():
+        return JSONResponse(status_code=404, content={"error": f"Weights not found: {weights}"})
+    get_model_cache().pin(project or DEFAULT_PROJECT)
+    registry = get_registry(project)
+    registry.load_async(path)
+    return registry.status()
+
+
+@app.post("/models/rollback")
+async def rollback_model(
+    version: str | None = Query(None, description="Version to restore (default: the previous one)"),
+    project: str | None = Query(None, description="Form project (default: FORMDEX_PROJECT)"),
+):
+    """Swap a previously loaded version back in (instant: it is still in memory)."""
+    if (error := _per_worker_models() or _unknown_project(project)) is not None:
+        return error
+    try:
+        current = get_registry(project).rollback(version)
+    except LookupError as exc:
+        return JSONResponse(status_code=409, content={"error": str(exc)})
+    return {"current": current.info()}
+
+
+async def spool_upload(file: UploadFile, dest: Path) -> int | None:
+    """Copy an upload to *dest* ``UPLOAD_CHUNK`` bytes at a time; returns its size.
+
+    Returns ``None`` (and leaves no file behind) as soon as the upload turns
+    out to be larger than ``MAX_UPLOAD_MB``.
+    """
+    limit = MAX_UPLOAD_MB << 20
+    if file.size is not None and file.size > limit:
+        return None
+    size = 0
+    with open(dest, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK):
+            size += len(chunk)
+            if size > limit:
+                break
+            out.write(chunk)
+    if size > limit:
+        dest.unlink()
+        return None
+    return size
+
+
+def _upload_error(size: int | None) -> JSONResponse | None:
+    if size is None:
+        return JSONResponse(status_code=413, content={"error": f"File is larger than {MAX_UPLOAD_MB} MB."})
+    if size < 100:
+        return JSONResponse(status_code=400, content={"error": "File appears empty or too small."})
+    return None
+
+
+_streams: set[asyncio.Future] = set()  # running streamed extractions, kept referenced until done
+
+
+def _stream_extract(pdf_path: Path, options: dict, stream: str) -> StreamingResponse:
+    """Start ``process_pdf_streamed`` on the pool and stream its events as NDJSON or SSE.
+
+    Frees the caller's in-flight slot and deletes the spooled upload once
+    the work is done, even if the client went away before that.
+    """
+    events = new_event_queue()
+    task = asyncio.ensure_future(run_in_pool(process_pdf_streamed, events, pdf_path, **options))
+    _streams.add(task)
+
+    def finished(fut: asyncio.Future) -> None:
+        global _in_flight
+        _streams.discard(fut)
+        _in_flight -= 1
+        pdf_path.unlink(missing_ok=True)
+        # A broken pool never runs the function, so nothing else would end the stream.
+        if not fut.cancelled() and (exc := fut.exception()) is not None:
+            events.put({"event": "error", "error": f"{type(exc).__name__}: {exc}"})
+
+    task.add_done_callback(finished)
+
+    async def body():
+        while True:
+            event = await next_event(events)
+            yield format_event(event, stream)
+            if event["event"] != "page":
+                return
+
+    media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+
 @app.post("/extract")
 async def extract_form(
     file: UploadFile = File(..., description="A filled PDF form"),
     conf: float = Query(0.25, ge=0.01, le=1.0, description="Detection confidence threshold"),
     dpi: int = Query(200, ge=72, le=600, description="Render DPI for PDF pages"),
+    acroform: bool = Query(True, description="Read filled AcroForm widgets directly instead of detecting + OCR"),
+    annotate: bool = Query(True, description="Write annotated page images and field crops"),
+    project: str | None = Query(None, description="Form project (runs/<project>/); default: route by page layout"),
+    adaptive: bool = Query(False, description="Detect on a low-DPI render, re-render only field regions at dpi"),
+    artifacts: Literal["none", "lazy", "eager"] | None = Query(
+        None, description="When to write annotated images and crops (default: FORMDEX_ARTIFACTS)"
+    ),
+    stream: Literal["ndjson", "sse"] | None = Query(
+        None, description="Stream each page's fields as it finishes, summary last, as NDJSON or server-sent events"
+    ),
 ):
     """Upload a filled PDF form and extract all form fields.
 
@@ -375,43 +1911,173 @@ async def extract_form(
     - Per-page summaries (field counts, annotated image URLs)
     - Every detected field with: type, value/checked state, confidence, bbox
     - Links to annotated page images and individual field crops
+
+    With ``stream`` the same content arrives as one ``page`` event per page
+    (summary + fields) as soon as it is done, then a ``summary`` event.
+
+    The work runs on the worker pool; once ``FORMDEX_MAX_IN_FLIGHT`` requests
+    are already being processed, new ones get a 503 with ``Retry-After``.
     """
+    global _in_flight
+
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         return JSONResponse(
             status_code=400,
             content={"error": "Please upload a PDF file."},
         )
 
-    pdf_bytes = await file.read()
-    if len(pdf_bytes) < 100:
+    if project is not None and (error := _unknown_project(project)) is not None:
+        return error
+
+    if _in_flight >= MAX_IN_FLIGHT:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server busy, please retry shortly."},
+            headers={"Retry-After": "5"},
+        )
+
+    _in_flight += 1
+    streaming = False
+    upload = UPLOADS_DIR / f"{uuid.uuid4().hex}.pdf"
+    try:
+        size = await spool_upload(file, upload)
+        if (error := _upload_error(size)) is not None:
+            return error
+
+        options = {
+            "conf": conf, "dpi": dpi, "acroform": acroform, "annotate": annotate, "project": project,
+            "adaptive": adaptive, "artifacts": artifacts or ARTIFACTS,
+        }
+        if stream is not None:
+            streaming = True  # the stream releases the in-flight slot and the upload when the work ends
+            return _stream_extract(upload, options, stream)
+        job_id, result = await run_in_pool(process_pdf, upload, **options)
+        if "fields" not in result:
+            # Low-memory run: the fields were never collected in memory, serve them from the file.
+            return FileResponse(JOBS_DIR / job_id / "results.json", media_type="application/json")
+        return result
+    finally:
+        if not streaming:
+            _in_flight -= 1
+            upload.unlink(missing_ok=True)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(..., description="A filled PDF form"),
+    conf: float = Query(0.25, ge=0.01, le=1.0, description="Detection confidence threshold"),
+    dpi: int = Query(200, ge=72, le=600, description="Render DPI for PDF pages"),
+    acroform: bool = Query(True, description="Read filled AcroForm widgets directly instead of detecting + OCR"),
+    annotate: bool = Query(True, description="Write annotated page images and field crops"),
+    project: str | None = Query(None, description="Form project (runs/<project>/); default: route by page layout"),
+    adaptive: bool = Query(False, description="Detect on a low-DPI render, re-render only field regions at dpi"),
+    artifacts: Literal["none", "lazy", "eager"] | None = Query(
+        None, description="When to write annotated images and crops (default: FORMDEX_ARTIFACTS)"
+    ),
+):
+    """Queue a PDF for extraction and return its job_id immediately.
+
+    Poll ``GET /jobs/{job_id}`` for progress, then fetch
+    ``GET /jobs/{job_id}/result`` once the status is ``done``.
+    """
+    if not file.filename or not file.filename.lower().endswith(".pdf"):
         return JSONResponse(
             status_code=400,
-            content={"error": "File appears empty or too small."},
+            content={"error": "Please upload a PDF file."},
         )
 
-    job_id, result = process_pdf(pdf_bytes, conf=conf, dpi=dpi)
-    return result
+    if project is not None and (error := _unknown_project(project)) is not None:
+        return error
+
+    job_id = uuid.uuid4().hex[:12]
+    job_dir = JOBS_DIR / job_id
+    job_dir.mkdir(parents=True)
+    size = await spool_upload(file, job_dir / "input.pdf")
+    if (error := _upload_error(size)) is not None:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return error
+
+    params = {
+        "conf": conf, "dpi": dpi, "acroform": acroform, "annotate": annotate, "project": project, "adaptive": adaptive,
+        "artifacts": artifacts or ARTIFACTS,
+    }
+    await asyncio.to_thread(get_job_store().enqueue, job_id, params)
+    _jobs_wakeup.set()
+
+    return {
+        "job_id": job_id,
+        "status": jobs.QUEUED,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Report a job's status and which pages have finished."""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+    num_pages = job["num_pages"]
+    done = set(job["pages_done"])
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "num_pages": num_pages,
+        "pages_done": len(done),
+        "pages": [
+            {"page": i, "done": i in done} for i in range(num_pages or 0)
+        ],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result_url": f"/jobs/{job_id}/result" if job["status"] == jobs.DONE else None,
+    }
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """Return the results.json of a finished job."""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    if job["status"] != jobs.DONE:
+        return JSONResponse(
+            status_code=409,
+            content={"error": f"Job is {job['status']}", "status": job["status"], "detail": job["error"]},
+        )
+    return FileResponse(JOBS_DIR / job_id / "results.json", media_type="application/json")
 
 
 @app.get("/files/{job_id}/{filename}")
 async def serve_file(job_id: str, filename: str):
-    """Serve annotated images and crop files for a given job."""
+    """Serve annotated images and crop files for a given job (rendered on first request for lazy jobs)."""
     # Check main job dir first, then crops subdir
-    path = JOBS_DIR / job_id / filename
+    path = job_file(job_id, filename)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "File not found"})
     if not path.exists():
-        path = JOBS_DIR / job_id / "crops" / filename
+        path = job_file(job_id, "crops", filename)
     if not path.exists():
+        path = await run_in_pool(render_artifact, job_id, filename)
+    if path is None:
         return JSONResponse(status_code=404, content={"error": "File not found"})
-    return FileResponse(path, media_type="image/jpeg")
+    return FileResponse(path)
 
 
 @app.get("/files/{job_id}/crops/{filename}")
 async def serve_crop(job_id: str, filename: str):
     """Serve individual cropped field images."""
-    path = JOBS_DIR / job_id / "crops" / filename
+    path = job_file(job_id, "crops", filename)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "Crop not found"})
     if not path.exists():
+        path = await run_in_pool(render_artifact, job_id, filename)
+    if path is None:
         return JSONResponse(status_code=404, content={"error": "Crop not found"})
-    return FileResponse(path, media_type="image/jpeg")
+    return FileResponse(path)
 
 
 # ── Run directly ───────────────────────────────────────────────────────────
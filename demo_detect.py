@@ -20,11 +20,12 @@ from pathlib import Path
 
 import fitz  # pymupdf
 import numpy as np
-import pytesseract
 from faker import Faker
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 from ultralytics import YOLO
 
+from shared.ocr import extract_text_from_crop
+
 # ── Paths ──────────────────────────────────────────────────────────────────
 ROOT = Path(__file__).resolve().parent
 WEIGHTS = ROOT / "runs" / "ud100-form" / "weights" / "best.pt"
@@ -123,37 +124,6 @@ def is_checkbox_checked(crop: Image.Image) -> bool:
     return dark_ratio > 0.05
 
 
-# ── OCR text extraction ───────────────────────────────────────────────────
-
-def extract_text_from_crop(crop: Image.Image, field_class: str) -> str:
-    """Run Tesseract OCR on a cropped field image and return cleaned text."""
-    # Upscale small crops for better OCR accuracy
-    w, h = crop.size
-    scale = max(1, 150 // max(h, 1))
-    if scale > 1:
-        crop = crop.resize((w * scale, h * scale), Image.LANCZOS)
-
-    # Preprocess: convert to grayscale, sharpen, binarize
-    gray = ImageOps.grayscale(crop)
-    gray = gray.filter(ImageFilter.SHARPEN)
-
-    # Tesseract config based on field type
-    if field_class in ("date_field", "dollar_amount", "case_number"):
-        # Mostly digits, slashes, dashes, dots
-        config = "--psm 7 -c tessedit_char_whitelist=0123456789/.-$,ABCDEFGHIJKLMNOPQRSTUVWXYZ "
-    else:
-        # General text
-        config = "--psm 7"
-
-    try:
-        text = pytesseract.image_to_string(gray, config=config).strip()
-        # Clean up common OCR artifacts
-        text = text.replace("|", "").replace("\\", "").strip()
-        return text
-    except Exception:
-        return ""
-
-
 # ── Inference image size ──────────────────────────────────────────────────
 # Must match training imgsz.  YOLO handles letterbox resizing internally;
 # no pre-standardisation needed (avoids lossy double-resize).
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Check an exported detector against the PyTorch model and compare latency.
+
+Renders sample PDF pages, runs them through the ultralytics ``best.pt`` path
+and through the ONNX Runtime / OpenVINO backend, and matches the boxes
+(same class, IoU above ``--iou``).  Exits non-zero when fewer than
+``--min-match`` of the reference boxes are reproduced, so it doubles as the
+parity check after every export.
+
+Usage:
+    uv run scripts/bench_detector.py --backend onnx
+    uv run scripts/bench_detector.py --backend openvino --pdf my_form.pdf --repeat 5 --batch 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared.detector import default_model_path, make_detector  # noqa: E402
+
+DEFAULT_PDF = ROOT / "api_test_output" / "test_filled_ud100.pdf"
+DEFAULT_WEIGHTS = ROOT / "runs" / "ud100-form" / "weights" / "best.pt"
+
+
+def render_pages(pdf_path: Path, dpi: int) -> list[np.ndarray]:
+    doc = fitz.open(str(pdf_path))
+    mat = fitz.Matrix(dpi / 72, dpi / 72)
+    pages = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=mat)
+        pages.append(np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3).copy())
+    doc.close()
+    return pages
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(ref: np.ndarray, cand: np.ndarray, iou: float) -> tuple[int, list[float]]:
+    """Greedily pair reference boxes with same-class candidates; returns (matched, |Δscore|s)."""
+    used: set[int] = set()
+    deltas: list[float] = []
+    for r in ref:
+        best, best_iou = -1, iou
+        for j, c in enumerate(cand):
+            if j in used or int(c[5]) != int(r[5]):
+                continue
+            v = _iou(r, c)
+            if v >= best_iou:
+                best, best_iou = j, v
+        if best >= 0:
+            used.add(best)
+            deltas.append(abs(float(r[4]) - float(cand[best][4])))
+    return len(deltas), deltas
+
+
+def time_backend(detector, pages: list[np.ndarray], conf: float, batch: int, repeat: int) -> tuple[list, float]:
+    """Return (first-run outputs, ms per page averaged over *repeat* runs)."""
+    detector.predict(pages[:1], conf)  # warm-up
+    outputs: list[np.ndarray] = []
+    t0 = time.perf_counter()
+    for rep in range(repeat):
+        for i in range(0, len(pages), batch):
+            res = detector.predict(pages[i:i + batch], conf)
+            if rep == 0:
+                outputs.extend(res)
+    elapsed = time.perf_counter() - t0
+    return outputs, elapsed / repeat / len(pages) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parity + latency of an exported detector vs best.pt")
+    parser.add_argument("--backend", choices=("onnx", "openvino"), default="onnx")
+    parser.add_argument("--model", type=str, default="", help="Exported model (default: next to --weights)")
+    parser.add_argument("--weights", type=str, default=str(DEFAULT_WEIGHTS), help="Reference best.pt")
+    parser.add_argument("--pdf", type=str, default=str(DEFAULT_PDF), help="Sample PDF")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    parser.add_argument("--imgsz", type=int, default=1280, help="Inference size (default: 1280)")
+    parser.add_argument("--conf", type=float, default=0.25, help="Confidence threshold")
+    parser.add_argument("--batch", type=int, default=1, help="Pages per predict() call")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (default: 3)")
+    parser.add_argument("--iou", type=float, default=0.9, help="IoU for two boxes to count as the same")
+    parser.add_argument("--min-match", type=float, default=0.98, help="Required share of reference boxes matched")
+    parser.add_argument("--out", type=str, default="", help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    weights = Path(args.weights)
+    model_path = Path(args.model) if args.model else default_model_path(args.backend, weights)
+    for path in (Path(args.pdf), weights, model_path):
+        if not path.exists():
+            print(f"Error: not found: {path}", file=sys.stderr)
+            return 1
+
+    pages = render_pages(Path(args.pdf), args.dpi)
+    print(f"[bench_detector] {len(pages)} page(s) at {args.dpi} DPI, batch {args.batch}")
+
+    reference = make_detector("ultralytics", weights, args.imgsz)
+    candidate = make_detector(args.backend, model_path, args.imgsz)
+    ref_out, ref_ms = time_backend(reference, pages, args.conf, args.batch, args.repeat)
+    cand_out, cand_ms = time_backend(candidate, pages, args.conf, args.batch, args.repeat)
+
+    ref_total = sum(len(r) for r in ref_out)
+    cand_total = sum(len(c) for c in cand_out)
+    matched = 0
+    deltas: list[float] = []
+    for r, c in zip(ref_out, cand_out):
+        m, d = match(r, c, args.iou)
+        matched += m
+        deltas.extend(d)
+    match_rate = matched / ref_total if ref_total else 1.0
+
+    report = {
+        "backend": args.backend,
+        "model": str(model_path),
+        "pages": len(pages),
+        "dpi": args.dpi,
+        "batch": args.batch,
+        "reference_boxes": ref_total,
+        "candidate_boxes": cand_total,
+        "matched": matched,
+        "match_rate": round(match_rate, 4),
+        "mean_score_delta": round(float(np.mean(deltas)), 4) if deltas else 0.0,
+        "max_score_delta": round(float(np.max(deltas)), 4) if deltas else 0.0,
+        "ultralytics_ms_per_page": round(ref_ms, 1),
+        f"{args.backend}_ms_per_page": round(cand_ms, 1),
+        "speedup": round(ref_ms / cand_ms, 2) if cand_ms else None,
+        "parity_ok": match_rate >= args.min_match,
+    }
+
+    print(f"  boxes     : {ref_total} reference / {cand_total} {args.backend}, {match_rate:.1%} matched "
+          f"(IoU ≥ {args.iou}, max |Δscore| {report['max_score_delta']})")
+    print(f"  latency   : ultralytics {ref_ms:8.1f} ms/page   {args.backend} {cand_ms:8.1f} ms/page "
+          f"({report['speedup']}×)")
+    print(f"  parity    : {'OK' if report['parity_ok'] else 'FAILED'} (need ≥ {args.min_match:.0%})")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[bench_detector] Report → {args.out}")
+    return 0 if report["parity_ok"] else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
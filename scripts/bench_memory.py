@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Peak RSS of ``process_pdf`` by page count, with and without low-memory mode.
+
+Builds PDFs of increasing length by repeating a form and runs each through
+``api.process_pdf`` in a fresh subprocess (result cache off), so every run
+starts from the same baseline and its ``ru_maxrss`` is that run's peak.
+With ``FORMDEX_LOW_MEMORY`` the peak should stay flat as pages are added;
+without it, it grows with the page count.
+
+Usage:
+    uv run scripts/bench_memory.py
+    uv run scripts/bench_memory.py --pages 4 32 128 --dpi 300 --out bench_memory.json
+    uv run scripts/bench_memory.py --acroform --artifacts lazy   # widget path, no detector pass
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # pymupdf
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_PDF = ROOT / "api_test_output" / "test_filled_ud100.pdf"
+
+
+def build_pdf(src: Path, pages: int, out: Path) -> None:
+    """Repeat the pages of *src* until the document has *pages* pages."""
+    form = fitz.open(str(src))
+    doc = fitz.open()
+    while len(doc) < pages:
+        doc.insert_pdf(form, to_page=min(len(form), pages - len(doc)) - 1)
+    doc.save(str(out), garbage=3, deflate=True)
+    doc.close()
+    form.close()
+
+
+def child(args: argparse.Namespace) -> int:
+    """Run one extraction in this process and print its numbers as JSON."""
+    import api  # reads FORMDEX_* at import, set by the parent
+
+    t0 = time.perf_counter()
+    job_id, result = api.process_pdf(
+        Path(args.child), conf=0.25, dpi=args.dpi, acroform=args.acroform, artifacts=args.artifacts,
+    )
+    seconds = time.perf_counter() - t0
+    results_mb = (api.JOBS_DIR / job_id / "results.json").stat().st_size / 2**20
+    shutil.rmtree(api.JOBS_DIR / job_id, ignore_errors=True)
+    print(json.dumps({
+        "seconds": round(seconds, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # KiB on Linux
+        "memory": result["memory"],
+        "fields": result["total_fields"],
+        "results_mb": round(results_mb, 2),
+    }))
+    return 0
+
+
+def run(pdf: Path, low_memory: bool, args: argparse.Namespace) -> dict:
+    env = {**os.environ, "FORMDEX_CACHE": "0", "FORMDEX_LOW_MEMORY": "1" if low_memory else "0"}
+    cmd = [sys.executable, __file__, "--child", str(pdf), "--dpi", str(args.dpi), "--artifacts", args.artifacts]
+    if args.acroform:
+        cmd.append("--acroform")
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Peak RSS vs page count, normal and low-memory processing")
+    parser.add_argument("--pdf", type=str, default=str(DEFAULT_PDF), help="Form to repeat (default: UD-100)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[4, 16, 64], help="Page counts to try")
+    parser.add_argument("--dpi", type=int, default=300, help="Render DPI (default: 300)")
+    parser.add_argument("--acroform", action="store_true", help="Read widgets instead of the vision path")
+    parser.add_argument("--artifacts", type=str, default="eager", help="Artifacts mode (default: eager)")
+    parser.add_argument("--out", type=str, default="", help="Optional path for a JSON report")
+    parser.add_argument("--child", type=str, default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    print(f"[bench_memory] {Path(args.pdf).name} × {args.pages} pages, {args.dpi} DPI, "
+          f"{'acroform' if args.acroform else 'vision'} path, artifacts={args.artifacts}")
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf = Path(tmp) / f"pages_{pages}.pdf"
+            build_pdf(Path(args.pdf), pages, pdf)
+            for low_memory in (False, True):
+                entry = {"pages": pages, "low_memory": low_memory, **run(pdf, low_memory, args)}
+                runs.append(entry)
+                mem = entry["memory"] or {}
+                print(f"  {pages:>4} pages  {'low-memory' if low_memory else 'normal    '}: "
+                      f"peak RSS {entry['max_rss_mb']:7.1f} MB (pipeline +{mem.get('peak_delta_mb', '?')} MB), "
+                      f"{entry['seconds']:6.2f} s, {entry['fields']} fields, results.json {entry['results_mb']} MB")
+
+    if args.out:
+        report = {"pdf": args.pdf, "dpi": args.dpi, "acroform": args.acroform, "artifacts": args.artifacts,
+                  "runs": runs}
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[bench_memory] Report → {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
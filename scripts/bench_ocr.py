@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Benchmark per-crop OCR against single-pass page OCR.
+
+Field boxes come from the PDF's own AcroForm widgets (no model needed), so
+each field's ``field_value`` doubles as ground truth.  For every page both
+modes OCR the same boxes; the report compares latency, how often the two
+modes agree, and how often each matches the filled-in value.
+
+Usage:
+    uv run scripts/bench_ocr.py
+    uv run scripts/bench_ocr.py --pdf my_filled_form.pdf --dpi 300 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import sys
+import time
+from pathlib import Path
+
+import fitz  # pymupdf
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared.forms import classify_field  # noqa: E402
+from shared.ocr import extract_text_from_crop, ocr_fields_on_page  # noqa: E402
+
+DEFAULT_PDF = ROOT / "api_test_output" / "test_filled_ud100.pdf"
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.upper().split())
+
+
+def _similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, _norm(a), _norm(b)).ratio()
+
+
+def load_pages(pdf_path: Path, dpi: int) -> list[tuple[Image.Image, list[dict]]]:
+    """Render each page and collect its filled text widgets as OCR targets."""
+    doc = fitz.open(str(pdf_path))
+    scale = dpi / 72
+    mat = fitz.Matrix(scale, scale)
+    pages: list[tuple[Image.Image, list[dict]]] = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=mat)
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        fields: list[dict] = []
+        for widget in page.widgets():
+            cls = classify_field(widget)
+            if cls in ("checkbox", "signature"):
+                continue
+            r = widget.rect
+            fields.append({
+                "bbox": (int(r.x0 * scale), int(r.y0 * scale), int(r.x1 * scale), int(r.y1 * scale)),
+                "class_name": cls,
+                "truth": str(widget.field_value or ""),
+            })
+        pages.append((img, fields))
+    doc.close()
+    return pages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare per-crop and page-level Tesseract OCR")
+    parser.add_argument("--pdf", type=str, default=str(DEFAULT_PDF), help="Filled AcroForm PDF")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    parser.add_argument("--repeat", type=int, default=1, help="Timing repetitions (default: 1)")
+    parser.add_argument("--out", type=str, default="", help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    pdf_path = Path(args.pdf)
+    if not pdf_path.exists():
+        print(f"Error: PDF not found: {pdf_path}", file=sys.stderr)
+        return 1
+
+    pages = load_pages(pdf_path, args.dpi)
+    num_fields = sum(len(f) for _, f in pages)
+    if not num_fields:
+        print("Error: no text widgets found — use a filled AcroForm PDF.", file=sys.stderr)
+        return 1
+    print(f"[bench_ocr] {len(pages)} page(s), {num_fields} text field(s) at {args.dpi} DPI")
+
+    crop_time = page_time = 0.0
+    crop_texts: list[str] = []
+    page_texts: list[str] = []
+    for rep in range(args.repeat):
+        for img, fields in pages:
+            t0 = time.perf_counter()
+            texts = [
+                extract_text_from_crop(img.crop(f["bbox"]), f["class_name"]) for f in fields
+            ]
+            crop_time += time.perf_counter() - t0
+            if rep == 0:
+                crop_texts.extend(texts)
+
+            t0 = time.perf_counter()
+            texts = ocr_fields_on_page(img, [(f["bbox"], f["class_name"]) for f in fields])
+            page_time += time.perf_counter() - t0
+            if rep == 0:
+                page_texts.extend(texts)
+
+    truths = [f["truth"] for _, fields in pages for f in fields]
+    filled = [i for i, t in enumerate(truths) if t.strip()]
+
+    def exact(a: list[str], b: list[str], idx: list[int]) -> float:
+        return sum(_norm(a[i]) == _norm(b[i]) for i in idx) / max(1, len(idx))
+
+    def mean_sim(a: list[str], b: list[str], idx: list[int]) -> float:
+        return sum(_similarity(a[i], b[i]) for i in idx) / max(1, len(idx))
+
+    every = list(range(num_fields))
+    report = {
+        "pdf": str(pdf_path),
+        "dpi": args.dpi,
+        "pages": len(pages),
+        "fields": num_fields,
+        "filled_fields": len(filled),
+        "crop_ms_per_page": round(crop_time / args.repeat / len(pages) * 1000, 1),
+        "page_ms_per_page": round(page_time / args.repeat / len(pages) * 1000, 1),
+        "speedup": round(crop_time / page_time, 2) if page_time else None,
+        "agreement_exact": round(exact(crop_texts, page_texts, every), 4),
+        "agreement_similarity": round(mean_sim(crop_texts, page_texts, every), 4),
+        "crop_vs_truth_exact": round(exact(crop_texts, truths, filled), 4),
+        "page_vs_truth_exact": round(exact(page_texts, truths, filled), 4),
+        "crop_vs_truth_similarity": round(mean_sim(crop_texts, truths, filled), 4),
+        "page_vs_truth_similarity": round(mean_sim(page_texts, truths, filled), 4),
+    }
+
+    print(f"  per-crop : {report['crop_ms_per_page']:8.1f} ms/page")
+    print(f"  page     : {report['page_ms_per_page']:8.1f} ms/page   ({report['speedup']}× faster)")
+    print(f"  agreement: {report['agreement_exact']:.1%} exact, {report['agreement_similarity']:.1%} char similarity")
+    print(f"  vs truth : crop {report['crop_vs_truth_exact']:.1%} / page {report['page_vs_truth_exact']:.1%} exact "
+          f"({len(filled)} filled fields)")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[bench_ocr] Report → {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Per-page cost of getting a rendered page to the detector and into field crops.
+
+Compares the old path (``pix.samples`` → ``Image.frombytes`` →
+``np.array`` for detection, PIL crops) with ``PageImage`` (a NumPy view of
+the pixmap, crops as slices).  Both render the same pixmap; for each page
+the script reports time and the heap bytes held on top of it at the peak
+(glibc ``mallinfo2``, which sees MuPDF, PIL and NumPy alike; elsewhere
+falls back to ``tracemalloc``, which misses PIL's buffers).  Field boxes
+are the PDF's widget rects.
+
+Usage:
+    uv run scripts/bench_page_image.py
+    uv run scripts/bench_page_image.py --dpi 300 --repeat 5 --out bench_page_image.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import json
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared.forms import read_widget_fields  # noqa: E402
+from shared.page_image import PageImage  # noqa: E402
+
+DEFAULT_PDF = ROOT / "api_test_output" / "test_filled_ud100.pdf"
+
+
+class _MallInfo2(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_size_t) for name in (
+        "arena", "ordblks", "smblks", "hblks", "hblkhd", "usmblks", "fsmblks", "uordblks", "fordblks", "keepcost",
+    )]
+
+
+def _mallinfo() -> Callable[[], int] | None:
+    try:
+        fn = ctypes.CDLL(None).mallinfo2
+    except (OSError, AttributeError):
+        return None
+    fn.restype = _MallInfo2
+
+    def in_use() -> int:
+        info = fn()
+        return info.uordblks + info.hblkhd  # heap chunks + mmapped blocks
+
+    return in_use
+
+
+_heap = _mallinfo()
+
+
+def held() -> int:
+    """Bytes currently allocated (malloc in use, or traced Python / NumPy memory)."""
+    return _heap() if _heap is not None else tracemalloc.get_traced_memory()[0]
+
+
+def legacy(pix: fitz.Pixmap, boxes: list[tuple[int, int, int, int]], peak: Callable[[], None]) -> None:
+    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    peak()
+    detector_input = np.array(img)
+    peak()
+    crops = [img.crop(b) for b in boxes]
+    peak()
+    del detector_input, crops
+
+
+def view(pix: fitz.Pixmap, boxes: list[tuple[int, int, int, int]], peak: Callable[[], None]) -> None:
+    page = PageImage.from_pixmap(pix)
+    peak()
+    detector_input = page.array
+    peak()
+    crops = [page.crop(b) for b in boxes]
+    peak()
+    del detector_input, crops
+
+
+def measure(path, pix: fitz.Pixmap, boxes: list, repeat: int) -> tuple[float, int]:
+    """Return (ms per run, most bytes held above the bare pixmap)."""
+    most = 0
+    seconds = 0.0
+    for _ in range(repeat):
+        base = held()
+        top = [base]
+
+        def peak() -> None:
+            top[0] = max(top[0], held())
+
+        t0 = time.perf_counter()
+        path(pix, boxes, peak)
+        seconds += time.perf_counter() - t0
+        most = max(most, top[0] - base)
+    return seconds / repeat * 1000, most
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pixmap → detector input + crops: old PIL path vs PageImage")
+    parser.add_argument("--pdf", type=str, default=str(DEFAULT_PDF), help="PDF with widgets (for field boxes)")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per page and path")
+    parser.add_argument("--out", type=str, default="", help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    if _heap is None:
+        tracemalloc.start()
+    scale = args.dpi / 72
+    doc = fitz.open(args.pdf)
+    print(f"[bench_page_image] {len(doc)} page(s) at {args.dpi} DPI, heap measured with "
+          f"{'mallinfo2' if _heap else 'tracemalloc (PIL buffers not counted)'}")
+    pages = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        boxes = [tuple(int(v * scale) for v in f["rect"]) for f in read_widget_fields(page)]
+        ms_old, bytes_old = measure(legacy, pix, boxes, args.repeat)
+        ms_new, bytes_new = measure(view, pix, boxes, args.repeat)
+        page_mb = pix.width * pix.height * pix.n / 2**20
+        pages.append({
+            "page": page.number,
+            "size": [pix.width, pix.height],
+            "pixmap_mb": round(page_mb, 1),
+            "fields": len(boxes),
+            "legacy": {"ms": round(ms_old, 2), "extra_mb": round(bytes_old / 2**20, 1)},
+            "page_image": {"ms": round(ms_new, 2), "extra_mb": round(bytes_new / 2**20, 1)},
+        })
+        print(f"  page {page.number} ({pix.width}×{pix.height}, pixmap {page_mb:.1f} MB, {len(boxes)} fields): "
+              f"legacy {ms_old:7.2f} ms +{bytes_old / 2**20:6.1f} MB  |  "
+              f"PageImage {ms_new:6.2f} ms +{bytes_new / 2**20:5.1f} MB")
+    doc.close()
+
+    if args.out:
+        report = {"pdf": args.pdf, "dpi": args.dpi, "heap": "mallinfo2" if _heap else "tracemalloc", "pages": pages}
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[bench_page_image] Report → {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
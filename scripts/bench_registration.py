@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Compare template registration with the YOLO detector on a known form.
+
+Takes a filled AcroForm PDF of the project's form, flattens it to images
+(optionally perturbed like a scan: small rotation, scale, shift and noise)
+and wraps them back into a PDF, so neither path can read the widgets.  The
+widget rects of the original, moved by the same perturbation, are the
+ground truth.  Each path is scored on field recall (same class, IoU above
+``--iou``) and timed per page.
+
+Usage:
+    uv run scripts/bench_registration.py
+    uv run scripts/bench_registration.py --scan --seed 3 --out bench_registration.json
+    uv run scripts/bench_registration.py --scan --skip-yolo      # no weights needed
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared.detector import make_detector  # noqa: E402
+from shared.forms import read_widget_fields  # noqa: E402
+from shared.projects import layout_signature, load_project  # noqa: E402
+from shared.templates import align, load_template, project_fields, to_gray  # noqa: E402
+
+DEFAULT_PDF = ROOT / "api_test_output" / "test_filled_ud100.pdf"
+
+
+def _affine(rng: np.random.Generator, w: int, h: int) -> np.ndarray:
+    """A random scanner-like 2×3 transform about the page centre."""
+    angle = np.deg2rad(rng.uniform(-1.5, 1.5))
+    scale = rng.uniform(0.98, 1.02)
+    shift = rng.uniform(-0.01, 0.01, 2) * (w, h)
+    c, s = np.cos(angle) * scale, np.sin(angle) * scale
+    cx, cy = w / 2, h / 2
+    return np.array([
+        [c, -s, cx - c * cx + s * cy + shift[0]],
+        [s, c, cy - s * cx - c * cy + shift[1]],
+    ])
+
+
+def _move_box(box: list[float], m: np.ndarray) -> list[float]:
+    x0, y0, x1, y1 = box
+    pts = np.array([[x0, y0, 1], [x1, y0, 1], [x1, y1, 1], [x0, y1, 1]]) @ m.T
+    return [*pts.min(axis=0), *pts.max(axis=0)]
+
+
+def flatten(pdf_path: Path, dpi: int, scan: bool, seed: int) -> tuple[fitz.Document, list[list[dict]]]:
+    """Image-only copy of *pdf_path* plus per-page ground-truth boxes in render pixels."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    src = fitz.open(str(pdf_path))
+    out = fitz.open()
+    truth: list[list[dict]] = []
+    scale = dpi / 72
+    for page in src:
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
+        boxes = [
+            {"class_name": f["class_name"], "bbox": [v * scale for v in f["rect"]]}
+            for f in read_widget_fields(page)
+        ]
+        if scan:
+            m = _affine(rng, pix.width, pix.height)
+            img = cv2.warpAffine(img, m, (pix.width, pix.height), borderValue=(255, 255, 255))
+            noisy = img.astype(np.int16) + rng.normal(0, 6, img.shape[:2] + (1,)).astype(np.int16)
+            img = np.clip(noisy, 0, 255).astype(np.uint8)
+            boxes = [{**b, "bbox": _move_box(b["bbox"], m)} for b in boxes]
+        buf = io.BytesIO()
+        Image.fromarray(img).save(buf, "JPEG", quality=80 if scan else 95)
+        out.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, stream=buf.getvalue())
+        truth.append(boxes)
+    src.close()
+    return out, truth
+
+
+def _iou(a: list[float], b: list[float]) -> float:
+    iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def recall(truth: list[dict], found: list[dict], iou: float) -> int:
+    """Ground-truth boxes matched one-to-one by a same-class box with IoU ≥ *iou*."""
+    used: set[int] = set()
+    hits = 0
+    for t in truth:
+        best, best_iou = -1, iou
+        for j, f in enumerate(found):
+            if j in used or f["class_name"] != t["class_name"]:
+                continue
+            v = _iou(t["bbox"], f["bbox"])
+            if v >= best_iou:
+                best, best_iou = j, v
+        if best >= 0:
+            used.add(best)
+            hits += 1
+    return hits
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Template registration vs YOLO: field recall and ms/page")
+    parser.add_argument("--project", type=str, default="ud100-form", help="Project under runs/ (template + classes)")
+    parser.add_argument("--pdf", type=str, default=str(DEFAULT_PDF), help="Filled AcroForm PDF of that form")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    parser.add_argument("--scan", action="store_true", help="Perturb pages like a scan (rotation, scale, noise)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --scan")
+    parser.add_argument("--max-distance", type=int, default=64, help="Layout-hash bits to accept a template page")
+    parser.add_argument("--min-inliers", type=int, default=40, help="Inliers to trust an alignment")
+    parser.add_argument("--backend", type=str, default="ultralytics", help="Detector backend for the YOLO path")
+    parser.add_argument("--model", type=str, default="", help="Model for the YOLO path (default: project best.pt)")
+    parser.add_argument("--imgsz", type=int, default=1280, help="Inference size (default: 1280)")
+    parser.add_argument("--conf", type=float, default=0.25, help="Detector confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for a field to count as found")
+    parser.add_argument("--skip-yolo", action="store_true", help="Only run the registration path")
+    parser.add_argument("--out", type=str, default="", help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    project = load_project(ROOT / "runs" / args.project)
+    if not project.template.exists():
+        print(f"Error: not found: {project.template}", file=sys.stderr)
+        return 1
+    template = load_template(project.template)
+    doc, truth = flatten(Path(args.pdf), args.dpi, args.scan, args.seed)
+    total = sum(len(t) for t in truth)
+    print(f"[bench_registration] {len(doc)} page(s), {total} fields, {'scanned' if args.scan else 'flattened'}, "
+          f"{args.dpi} DPI")
+
+    scale = args.dpi / 72
+    images = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        images.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+
+    # Registration: layout hash → template page → homography → projected widgets.
+    reg_found, reg_truth, registered, alignments = 0, 0, 0, []
+    t0 = time.perf_counter()
+    for page, img, page_truth in zip(doc, images, truth):
+        template_page, _ = template.match_page(layout_signature(page), args.max_distance, index=page.number)
+        alignment = align(to_gray(img, args.dpi), template_page) if template_page is not None else None
+        if alignment is None or alignment.inliers < args.min_inliers:
+            alignments.append(None)
+            continue
+        registered += 1
+        alignments.append(alignment.info())
+        found = project_fields(template_page, alignment, args.dpi, img.size, project.classes)
+        reg_found += recall(page_truth, found, args.iou)
+        reg_truth += len(page_truth)
+    reg_ms = (time.perf_counter() - t0) / len(images) * 1000
+
+    report: dict = {
+        "project": args.project,
+        "pages": len(images),
+        "fields": total,
+        "scan": args.scan,
+        "registration": {
+            "pages_registered": registered,
+            "alignments": alignments,
+            "recall": round(reg_found / total, 4) if total else None,
+            # recall over the pages that aligned (the rest would go to YOLO)
+            "recall_aligned": round(reg_found / reg_truth, 4) if reg_truth else None,
+            "ms_per_page": round(reg_ms, 1),
+        },
+    }
+    print(f"  registration : {registered}/{len(images)} pages aligned, recall {reg_found}/{total} "
+          f"({reg_found}/{reg_truth} on aligned pages), {reg_ms:8.1f} ms/page")
+
+    if not args.skip_yolo:
+        model_path = Path(args.model) if args.model else project.weights
+        detector = make_detector(args.backend, model_path, args.imgsz)
+        arrays = [np.asarray(img) for img in images]
+        detector.predict(arrays[:1], args.conf)  # warm-up
+        yolo_found = 0
+        t0 = time.perf_counter()
+        outputs = [detector.predict([a], args.conf)[0] for a in arrays]
+        yolo_ms = (time.perf_counter() - t0) / len(images) * 1000
+        for boxes, page_truth in zip(outputs, truth):
+            found = [
+                {"class_name": project.classes[int(c)] if int(c) < len(project.classes) else "", "bbox": [x0, y0, x1, y1]}
+                for x0, y0, x1, y1, _, c in boxes.tolist()
+            ]
+            yolo_found += recall(page_truth, found, args.iou)
+        report["yolo"] = {
+            "backend": args.backend,
+            "recall": round(yolo_found / total, 4) if total else None,
+            "ms_per_page": round(yolo_ms, 1),
+        }
+        report["speedup"] = round(yolo_ms / reg_ms, 2) if reg_ms else None
+        print(f"  yolo         : recall {yolo_found}/{total}, {yolo_ms:8.1f} ms/page (registration {report['speedup']}× faster)")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[bench_registration] Report → {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
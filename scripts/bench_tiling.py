@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Compare whole-page and sliced (tiled) detection on high-DPI pages.
+
+Renders a filled AcroForm PDF at ``--dpi`` and uses its widget rects as
+ground truth.  Each page is detected once letterboxed whole (what the API
+does by default) and once through ``predict_tiled`` for every ``--tile``
+size; both are scored on field recall per class (same class, IoU above
+``--iou``) and timed per page.
+
+Usage:
+    uv run scripts/bench_tiling.py
+    uv run scripts/bench_tiling.py --dpi 300 --tile 960 1280 --overlap 256 --out bench_tiling.json
+    uv run scripts/bench_tiling.py --backend onnx --tile-batch 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared.detector import default_model_path, make_detector, predict_tiled, tile_windows  # noqa: E402
+from shared.forms import read_widget_fields  # noqa: E402
+from shared.projects import load_project  # noqa: E402
+
+DEFAULT_PDF = ROOT / "api_test_output" / "test_filled_ud100.pdf"
+
+
+def render(pdf_path: Path, dpi: int) -> tuple[list[np.ndarray], list[list[dict]]]:
+    """Pages as RGB arrays plus per-page ground-truth boxes in render pixels."""
+    doc = fitz.open(str(pdf_path))
+    scale = dpi / 72
+    pages, truth = [], []
+    for page in doc:
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        pages.append(np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3).copy())
+        truth.append([
+            {"class_name": f["class_name"], "bbox": [v * scale for v in f["rect"]]}
+            for f in read_widget_fields(page)
+        ])
+    doc.close()
+    return pages, truth
+
+
+def _iou(a: list[float], b: list[float]) -> float:
+    iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def recall(truth: list[dict], found: list[dict], iou: float) -> Counter:
+    """Ground-truth boxes matched one-to-one by a same-class box, counted per class."""
+    used: set[int] = set()
+    hits: Counter = Counter()
+    for t in truth:
+        best, best_iou = -1, iou
+        for j, f in enumerate(found):
+            if j in used or f["class_name"] != t["class_name"]:
+                continue
+            v = _iou(t["bbox"], f["bbox"])
+            if v >= best_iou:
+                best, best_iou = j, v
+        if best >= 0:
+            used.add(best)
+            hits[t["class_name"]] += 1
+    return hits
+
+
+def score(outputs: list[np.ndarray], truth: list[list[dict]], classes: list[str], iou: float) -> dict:
+    hits: Counter = Counter()
+    detections = 0
+    for boxes, page_truth in zip(outputs, truth):
+        found = [
+            {"class_name": classes[int(c)] if int(c) < len(classes) else "", "bbox": [x0, y0, x1, y1]}
+            for x0, y0, x1, y1, _, c in boxes.tolist()
+        ]
+        detections += len(found)
+        hits += recall(page_truth, found, iou)
+    totals = Counter(t["class_name"] for page_truth in truth for t in page_truth)
+    return {
+        "recall": round(sum(hits.values()) / sum(totals.values()), 4) if totals else None,
+        "recall_by_class": {c: f"{hits[c]}/{n}" for c, n in sorted(totals.items())},
+        "detections": detections,
+    }
+
+
+def timed(run, pages: list[np.ndarray], repeat: int) -> tuple[list[np.ndarray], float]:
+    """Return (first-run outputs, ms per page averaged over *repeat* runs)."""
+    run(pages[:1])  # warm-up
+    outputs: list[np.ndarray] = []
+    t0 = time.perf_counter()
+    for rep in range(repeat):
+        res = [run([p])[0] for p in pages]
+        if rep == 0:
+            outputs = res
+    return outputs, (time.perf_counter() - t0) / (repeat * len(pages)) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Whole-page vs tiled detection: recall per class and ms/page")
+    parser.add_argument("--project", type=str, default="ud100-form", help="Project under runs/ (weights + classes)")
+    parser.add_argument("--pdf", type=str, default=str(DEFAULT_PDF), help="Filled AcroForm PDF of that form")
+    parser.add_argument("--dpi", type=int, default=300, help="Render DPI (default: 300)")
+    parser.add_argument("--backend", type=str, default="ultralytics", help="Detector backend")
+    parser.add_argument("--model", type=str, default="", help="Model path (default: the project's, for --backend)")
+    parser.add_argument("--imgsz", type=int, default=1280, help="Inference size (default: 1280)")
+    parser.add_argument("--tile", type=int, nargs="+", default=[1280], help="Tile sizes to try (default: 1280)")
+    parser.add_argument("--overlap", type=int, default=256, help="Tile overlap in pixels (default: 256)")
+    parser.add_argument("--tile-batch", type=int, default=8, help="Images per predict() call (default: 8)")
+    parser.add_argument("--conf", type=float, default=0.25, help="Detector confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for a field to count as found")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the pages")
+    parser.add_argument("--out", type=str, default="", help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    project = load_project(ROOT / "runs" / args.project)
+    model_path = Path(args.model) if args.model else default_model_path(args.backend, project.weights)
+    if not model_path.exists():
+        print(f"Error: not found: {model_path}", file=sys.stderr)
+        return 1
+    detector = make_detector(args.backend, model_path, args.imgsz)
+    pages, truth = render(Path(args.pdf), args.dpi)
+    h, w = pages[0].shape[:2]
+    print(f"[bench_tiling] {len(pages)} page(s) at {args.dpi} DPI ({w}×{h}), "
+          f"{sum(len(t) for t in truth)} fields, {args.backend} @ {args.imgsz}")
+
+    outputs, ms = timed(lambda imgs: detector.predict(imgs, args.conf), pages, args.repeat)
+    whole = {**score(outputs, truth, project.classes, args.iou), "ms_per_page": round(ms, 1)}
+    print(f"  whole page         : recall {whole['recall']}, {ms:8.1f} ms/page  {whole['recall_by_class']}")
+
+    runs = []
+    for tile in args.tile:
+        def run(imgs: list[np.ndarray], tile: int = tile) -> list[np.ndarray]:
+            return predict_tiled(detector, imgs, args.conf, tile, args.overlap, args.tile_batch)
+
+        outputs, ms = timed(run, pages, args.repeat)
+        tiles = len(tile_windows(w, h, tile, args.overlap))
+        entry = {
+            "tile": tile,
+            "overlap": args.overlap,
+            "tiles_per_page": tiles,
+            **score(outputs, truth, project.classes, args.iou),
+            "ms_per_page": round(ms, 1),
+        }
+        runs.append(entry)
+        print(f"  tiled {tile:>5} ({tiles:>2}+1) : recall {entry['recall']}, {ms:8.1f} ms/page  "
+              f"{entry['recall_by_class']}")
+
+    if args.out:
+        report = {
+            "pdf": args.pdf,
+            "dpi": args.dpi,
+            "backend": args.backend,
+            "imgsz": args.imgsz,
+            "tile_batch": args.tile_batch,
+            "whole_page": whole,
+            "tiled": runs,
+        }
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[bench_tiling] Report → {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
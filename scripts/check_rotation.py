@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Check that field boxes line up with the rendered page on rotated pages.
+
+Builds a page with a filled text widget and one with a single word of
+text, sets ``/Rotate`` to each of 0/90/180/270 and renders them the way
+``process_pdf`` does.  Widget entries must land on the ink of their own
+widget in the rendered pixels, and a detection drawn around the word's ink
+must read that word from the text layer.  With OpenCV installed, the
+widget page (plus some text for features) is also saved as a registration
+template and aligned to its own render; the projected field must match the
+widget entry.  Exits non-zero on a mismatch.
+
+Usage:
+    uv run scripts/check_rotation.py
+    uv run scripts/check_rotation.py --dpi 150
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from api import extract_fields, widget_entries  # noqa: E402
+from shared.forms import read_widget_fields  # noqa: E402
+from shared.page_image import PageImage  # noqa: E402
+from shared.templates import align, cv2, load_template, project_fields, to_gray  # noqa: E402
+from shared.text_layer import page_words  # noqa: E402
+
+WIDGET_RECT = fitz.Rect(60, 220, 200, 250)
+WORD = "HELLO"
+
+
+def build_page(rotation: int, text: bool = False, features: bool = False) -> tuple[fitz.Document, fitz.Page]:
+    """A 300×400 pt page with one filled, bordered text widget (or with *text*, one word).
+
+    With *features*, lines of text around the widget give registration
+    something to match.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=400)
+    if text:
+        page.insert_text((100, 100), WORD, fontsize=20)
+        page.set_rotation(rotation)
+        return doc, page
+    if features:
+        for i, y in enumerate(range(40, 380, 24)):
+            if not 200 <= y <= 270:
+                page.insert_text((20 + 7 * (i % 5), y), f"Line {i}: Form 7{i}Q - JKWXZ {i * 37}", fontsize=11)
+    widget = fitz.Widget()
+    widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+    widget.field_name = "name"
+    widget.field_value = "WIDGET"
+    widget.rect = WIDGET_RECT
+    widget.border_color = (0, 0, 0)
+    widget.border_width = 1
+    page.add_widget(widget)
+    page.set_rotation(rotation)
+    return doc, page
+
+
+def ink_box(pixels: np.ndarray) -> tuple[int, int, int, int] | None:
+    """Bounding box ``(x0, y0, x1, y1)`` of the dark pixels, or ``None``."""
+    ys, xs = np.nonzero(pixels.min(axis=2) < 128)
+    if not len(xs):
+        return None
+    return int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+
+
+def inside(inner: tuple[int, ...], outer: list[int], slack: int) -> bool:
+    return (inner[0] >= outer[0] - slack and inner[1] >= outer[1] - slack
+            and inner[2] <= outer[2] + slack and inner[3] <= outer[3] + slack)
+
+
+def render(page: fitz.Page, mat: fitz.Matrix) -> tuple[fitz.Pixmap, np.ndarray]:
+    pix = page.get_displaylist().get_pixmap(matrix=mat)
+    return pix, np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+
+def no_ocr(bbox: tuple[int, int, int, int]) -> np.ndarray:
+    raise LookupError("no text-layer match, fell back to OCR")
+
+
+def check(rotation: int, dpi: int) -> list[str]:
+    mat = fitz.Matrix(dpi / 72, dpi / 72)
+    slack = max(2, dpi // 36)
+    errors = []
+
+    doc, page = build_page(rotation)
+    _, pixels = render(page, mat)
+    entry = widget_entries(read_widget_fields(page), page.number, page.rotation_matrix * mat)[0]
+    ink = ink_box(pixels)
+    if ink is None or not inside(ink, entry["bbox"], slack):
+        errors.append(f"widget bbox {entry['bbox']} misses its ink at {ink}")
+    doc.close()
+
+    doc, page = build_page(rotation, text=True)
+    pix, pixels = render(page, mat)
+    ink = ink_box(pixels)
+    box = [ink[0] - slack, ink[1] - slack, ink[2] + slack, ink[3] + slack]
+    img = PageImage.from_pixmap(pix)
+    try:
+        entry = extract_fields(
+            img, [{"class_name": "text_field", "confidence": 1.0, "bbox": box}], page.number,
+            words=page_words(page), mat=page.rotation_matrix * mat, crop=img.crop, ocr_crop=no_ocr,
+        )[0]
+    except LookupError as exc:
+        errors.append(f"text field at {box}: {exc}")
+    else:
+        if entry["value"] != WORD:
+            errors.append(f"text field at {box} read {entry['value']!r} instead of {WORD!r}")
+    doc.close()
+
+    if cv2 is not None:
+        doc, page = build_page(rotation, features=True)
+        entry = widget_entries(read_widget_fields(page), page.number, page.rotation_matrix * mat)[0]
+        _, pixels = render(page, mat)
+        with tempfile.TemporaryDirectory() as tmp:
+            doc.save(Path(tmp) / "form_template.pdf")
+            template = load_template(Path(tmp) / "form_template.pdf")
+        doc.close()
+        alignment = align(to_gray(pixels, dpi), template.pages[0])
+        if alignment is None:
+            errors.append("template page did not align to its own render")
+        else:
+            (field,) = project_fields(template.pages[0], alignment, dpi, pixels.shape[1::-1], ["text_field"])
+            if any(abs(a - b) > slack for a, b in zip(field["bbox"], entry["bbox"])):
+                errors.append(f"template field projected to {field['bbox']}, widget is at {entry['bbox']}")
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check field boxes against rendered pixels on rotated pages")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    args = parser.parse_args()
+
+    failed = False
+    for rotation in (0, 90, 180, 270):
+        errors = check(rotation, args.dpi)
+        failed = failed or bool(errors)
+        print(f"  /Rotate {rotation:>3}: {'ok' if not errors else 'FAIL'}")
+        for error in errors:
+            print(f"    {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
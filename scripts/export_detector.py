@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Export the trained detector for the ONNX Runtime / OpenVINO API backends.
+
+Writes next to the weights, where ``api.py`` looks by default:
+``best.onnx`` for ``FORMDEX_DETECTOR=onnx`` and ``best_openvino_model/``
+for ``FORMDEX_DETECTOR=openvino``.  Needs ultralytics (and torch) — run it
+once on a training box, then ship the exported files to CPU nodes.
+
+Usage:
+    uv run scripts/export_detector.py --format onnx
+    uv run scripts/export_detector.py --format openvino --weights runs/ud101-form/weights/best.pt
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WEIGHTS = ROOT / "runs" / "ud100-form" / "weights" / "best.pt"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export YOLO weights to ONNX or OpenVINO IR")
+    parser.add_argument("--weights", type=str, default=str(DEFAULT_WEIGHTS), help="Trained best.pt")
+    parser.add_argument("--format", choices=("onnx", "openvino"), default="onnx")
+    parser.add_argument("--imgsz", type=int, default=1280, help="Inference size (default: 1280, match training)")
+    parser.add_argument("--static", action="store_true",
+                        help="Fixed 1×imgsz×imgsz input instead of dynamic batch / shape")
+    args = parser.parse_args()
+
+    weights = Path(args.weights)
+    if not weights.exists():
+        print(f"Error: weights not found: {weights}", file=sys.stderr)
+        return 1
+
+    from ultralytics import YOLO
+
+    out = YOLO(str(weights)).export(
+        format=args.format,
+        imgsz=args.imgsz,
+        dynamic=not args.static,
+        simplify=args.format == "onnx",
+    )
+    print(f"[export_detector] {args.format} model → {out}")
+    print(f"[export_detector] serve with: FORMDEX_DETECTOR={args.format} uv run uvicorn api:app")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""Micro-batching scheduler: group single-item requests into model batches.
+
+Callers submit one item at a time from any thread and get a ``Future`` back.
+A single background thread gathers up to ``max_batch`` items, waiting at
+most ``max_wait_ms`` after the first one arrives, runs them through
+``run_batch`` in one call and resolves each caller's future with its own
+result.
+
+``close()`` stops the thread; items it never got to fail with
+``RuntimeError`` instead of leaving their callers waiting, and later
+``submit`` calls raise.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class _Pending:
+    item: Any
+    future: Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """Background batching front-end for a ``run_batch(items) -> results`` function.
+
+    ``run_batch`` must return exactly one result per item, in order.  It is
+    only ever called from the batcher's own thread, so it doesn't need to be
+    thread-safe.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[Any]], list[Any]],
+        max_batch: int = 4,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+    ) -> None:
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: queue.Queue[_Pending | None] = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._sizes: dict[int, int] = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            self._queue.put(_Pending(item, fut))
+        return fut
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=5)
+        # Whatever the thread didn't take (queued behind the sentinel, or
+        # everything if it is stuck in a batch past the timeout) fails now.
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if pending is not None:
+                pending.future.set_exception(RuntimeError("batcher closed before the item ran"))
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "batch_sizes": dict(sorted(self._sizes.items())),
+                "avg_queue_wait_ms": round(self._wait_total / self._items * 1000.0, 2) if self._items else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000.0, 2),
+                "queued": self._queue.qsize(),
+            }
+
+    def _gather(self, first: _Pending) -> tuple[list[_Pending], bool]:
+        """Collect a batch starting with *first*; returns (batch, closing)."""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                nxt = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is None:
+                return batch, True
+            batch.append(nxt)
+        return batch, False
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, closing = self._gather(first)
+
+            started = time.perf_counter()
+            waits = [started - p.enqueued_at for p in batch]
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._sizes[len(batch)] = self._sizes.get(len(batch), 0) + 1
+                self._wait_total += sum(waits)
+                self._wait_max = max(self._wait_max, *waits)
+
+            try:
+                results = self.run_batch([p.item for p in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"run_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as exc:  # noqa: BLE001 — surfaced to every caller
+                for p in batch:
+                    p.future.set_exception(exc)
+            else:
+                for p, res in zip(batch, results):
+                    p.future.set_result(res)
+
+            if closing:
+                return
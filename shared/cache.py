@@ -0,0 +1,252 @@
+"""Content-addressed cache of finished extraction results, backed by SQLite.
+
+A cache key covers everything that determines a result (PDF bytes, request
+options, model weights, class list); the value is the job directory that
+already holds ``results.json`` plus its annotated pages and crops.  Entries
+are evicted least-recently-used first once either the entry count or the
+total size of the cached directories goes over its limit.
+
+Pages are memoised the same way, keyed on a fingerprint of the page's own
+content (see ``page_fingerprint``), so an amended filing only reprocesses
+the pages that actually changed.
+
+Like the job store, every call opens its own connection so the cache works
+from the event loop, pool threads and spawned worker processes alike.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key        TEXT PRIMARY KEY,
+    job_id     TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    owned      INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_lru ON results (last_used);
+CREATE TABLE IF NOT EXISTS pages (
+    key        TEXT PRIMARY KEY,
+    job_id     TEXT NOT NULL,
+    page       INTEGER NOT NULL,
+    data       TEXT NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def cache_key(pdf_bytes: bytes, **params: Any) -> str:
+    """Hash the PDF bytes together with every parameter that shapes the result."""
+    h = hashlib.sha256(pdf_bytes)
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file, read in chunks (model weights can be large)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def page_fingerprint(page: Any) -> str:
+    """Hash what a page looks like: content stream, resources, annotations, widget values.
+
+    Resources are hashed by content rather than xref number, so the same page
+    inside a different file (other pages added or removed) still matches.
+    """
+    doc = page.parent
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(page.read_contents())
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    for xobj in page.get_xobjects():
+        h.update(doc.xref_stream_raw(xobj[0]) or b"")
+    for font in page.get_fonts(full=True):
+        h.update(repr(font[1:6]).encode())  # ext, type, basefont, name, encoding
+    for annot in page.annots():
+        h.update(repr((annot.type, tuple(annot.rect), annot.info.get("content"))).encode())
+    for widget in page.widgets():
+        h.update(repr((widget.field_name, widget.field_value, tuple(widget.rect))).encode())
+    return h.hexdigest()
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class ResultCache:
+    """LRU index of result directories under *root*.
+
+    ``owned`` entries (``/extract`` results) have their directory deleted on
+    eviction; for queued jobs only the index row goes, since the job keeps
+    serving its own result.
+
+    Page entries only point at files inside some job directory; they are
+    dropped LRU beyond ``max_pages`` and treated as misses once any of
+    their files is gone.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        root: Path,
+        max_entries: int = 256,
+        max_bytes: int = 2 << 30,
+        max_pages: int = 4096,
+    ) -> None:
+        self.db_path = db_path
+        self.root = root
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.max_pages = max(0, max_pages)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached result for *key* (and mark it used), or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT job_id FROM results WHERE key = ?", (key,)).fetchone()
+        result = None
+        if row is not None:
+            try:
+                result = json.loads((self.root / row["job_id"] / "results.json").read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass  # evicted by a concurrent put(), or removed behind our back
+        with self._transaction() as conn:
+            if result is None:
+                if row is not None:
+                    conn.execute("DELETE FROM results WHERE key = ? AND job_id = ?", (key, row["job_id"]))
+                self._bump(conn, "misses")
+            else:
+                conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._bump(conn, "hits")
+        return result
+
+    def put(self, key: str, job_id: str, owned: bool = True) -> None:
+        """Record *job_id*'s directory as the result for *key*, then evict."""
+        size = dir_size(self.root / job_id)
+        now = time.time()
+        evicted: list[str] = []
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, job_id, size_bytes, owned, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, job_id, size, int(owned), now, now),
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM results").fetchone()
+            for row in conn.execute("SELECT key, job_id, size_bytes, owned FROM results ORDER BY last_used").fetchall():
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                if row["key"] == key:
+                    continue  # never evict what was just stored
+                conn.execute("DELETE FROM results WHERE key = ?", (row["key"],))
+                self._bump(conn, "evictions")
+                count -= 1
+                total -= row["size_bytes"]
+                if row["owned"]:
+                    evicted.append(row["job_id"])
+        for old in evicted:
+            shutil.rmtree(self.root / old, ignore_errors=True)
+
+    def get_page(self, key: str) -> tuple[str, int, dict[str, Any]] | None:
+        """Return ``(job_id, page, data)`` of a memoised page, or None.
+
+        ``data["files"]`` lists the artifacts (relative to the job directory)
+        the entry relies on; if any has disappeared the entry is dropped.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT job_id, page, data FROM pages WHERE key = ?", (key,)).fetchone()
+            data = json.loads(row["data"]) if row else None
+            if data is not None and not all((self.root / row["job_id"] / f).exists() for f in data.get("files", [])):
+                conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                data = None
+            if data is None:
+                self._bump(conn, "page_misses")
+                return None
+            conn.execute("UPDATE pages SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._bump(conn, "page_hits")
+        return row["job_id"], row["page"], data
+
+    def put_pages(self, job_id: str, pages: list[tuple[str, int, dict[str, Any]]]) -> None:
+        """Memoise ``(key, page, data)`` entries produced by *job_id*, then evict."""
+        if not pages or not self.max_pages:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (key, job_id, page, data, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(key, job_id, page, json.dumps(data, ensure_ascii=False), now) for key, page, data in pages],
+            )
+            conn.execute(
+                "DELETE FROM pages WHERE key IN "
+                "(SELECT key FROM pages ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_pages,),
+            )
+
+    def stats(self) -> dict[str, Any]:
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM results").fetchone()
+            page_count = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            counters = {r["name"]: r["value"] for r in conn.execute("SELECT name, value FROM counters")}
+        return {
+            "entries": count,
+            "size_mb": round(total / (1 << 20), 1),
+            "max_entries": self.max_entries,
+            "max_mb": round(self.max_bytes / (1 << 20), 1),
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "pages": page_count,
+            "max_pages": self.max_pages,
+            "page_hits": counters.get("page_hits", 0),
+            "page_misses": counters.get("page_misses", 0),
+        }
@@ -0,0 +1,408 @@
+"""Pluggable backends for the YOLO field detector.
+
+* ``UltralyticsDetector`` — the trained PyTorch ``best.pt`` through
+  ultralytics (needs torch).
+* ``OnnxDetector`` / ``OpenVinoDetector`` — a model exported with
+  ``scripts/export_detector.py``.  Letterboxing and NMS are done here in
+  NumPy, so CPU nodes only need onnxruntime or openvino, not torch.
+
+Every backend returns, per image, an ``(N, 6)`` float array of
+``x1, y1, x2, y2, score, class_id`` in original image pixels, sorted by
+score, so callers build identical detection dicts whichever one is loaded.
+
+``predict_tiled`` wraps any backend for sliced inference: large pages are
+also cut into overlapping tiles that go in at native resolution, and the
+tile detections are merged with the whole-page pass by cross-tile NMS.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+from PIL import Image
+
+try:
+    import onnxruntime
+except ImportError:  # optional: pip install formdex[onnx]
+    onnxruntime = None
+
+try:
+    import openvino
+except ImportError:  # optional: pip install formdex[openvino]
+    openvino = None
+
+BACKENDS = ("ultralytics", "onnx", "openvino")
+
+# ultralytics predict() defaults, mirrored so exported models give the same boxes.
+NMS_IOU = 0.7
+MAX_DET = 300
+MAX_NMS = 30000  # candidate boxes kept before NMS
+_MAX_WH = 7680  # per-class box offset for batched NMS
+_PAD_VALUE = 114
+_STRIDE = 32
+
+
+class Detector(Protocol):
+    name: str
+    model_path: Path
+
+    def predict(self, images: list[np.ndarray], conf: float) -> list[np.ndarray]:
+        """Detect on RGB ``uint8`` arrays; one ``(N, 6)`` array per image."""
+
+
+class UltralyticsDetector:
+    name = "ultralytics"
+
+    def __init__(self, model_path: Path, imgsz: int) -> None:
+        from ultralytics import YOLO
+
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.model = YOLO(str(model_path))
+
+    def predict(self, images: list[np.ndarray], conf: float) -> list[np.ndarray]:
+        results = self.model.predict(source=images, conf=conf, imgsz=self.imgsz, verbose=False)
+        # Boxes.data columns: x1, y1, x2, y2, conf, cls (already in original coords)
+        return [r.boxes.data.cpu().numpy().astype(np.float32) for r in results]
+
+
+# ── NumPy pre/post-processing ──────────────────────────────────────────────
+
+
+def letterbox(
+    img: np.ndarray, shape: tuple[int, int], auto: bool
+) -> tuple[np.ndarray, float, tuple[int, int]]:
+    """Resize *img* into *shape* (h, w) keeping aspect ratio, pad with grey.
+
+    ``auto`` pads only up to the next multiple of the stride (what ultralytics
+    does for dynamic-shape models) instead of the full *shape*.  Returns the
+    ``(3, H, W)`` float32 input tensor, the scale and the (left, top) pad.
+    """
+    h, w = img.shape[:2]
+    gain = min(shape[0] / h, shape[1] / w)
+    new_w, new_h = round(w * gain), round(h * gain)
+    dw, dh = shape[1] - new_w, shape[0] - new_h
+    if auto:
+        dw, dh = dw % _STRIDE, dh % _STRIDE
+    if (new_w, new_h) != (w, h):
+        img = np.asarray(Image.fromarray(img).resize((new_w, new_h), Image.BILINEAR))
+    top, bottom = round(dh / 2 - 0.1), round(dh / 2 + 0.1)
+    left, right = round(dw / 2 - 0.1), round(dw / 2 + 0.1)
+    out = np.full((new_h + top + bottom, new_w + left + right, 3), _PAD_VALUE, dtype=np.uint8)
+    out[top:top + new_h, left:left + new_w] = img
+    # ultralytics treats numpy input as BGR and flips it; do the same so the
+    # exported model sees exactly what the PyTorch path feeds it.
+    tensor = np.ascontiguousarray(out[..., ::-1].transpose(2, 0, 1), dtype=np.float32) / 255.0
+    return tensor, gain, (left, top)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou: float) -> np.ndarray:
+    """Greedy non-maximum suppression; returns kept indices, best first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep: list[int] = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= iou]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(
+    pred: np.ndarray,
+    conf: float,
+    gain: float,
+    pad: tuple[int, int],
+    orig_shape: tuple[int, int],
+) -> np.ndarray:
+    """Decode one raw YOLOv8 output ``(4 + classes, anchors)`` into ``(N, 6)`` boxes."""
+    pred = pred.T
+    class_scores = pred[:, 4:]
+    cls = class_scores.argmax(axis=1)
+    score = class_scores[np.arange(len(pred)), cls]
+    mask = score >= conf
+    xywh, score, cls = pred[mask, :4], score[mask], cls[mask]
+    if len(score) > MAX_NMS:
+        top = score.argsort()[::-1][:MAX_NMS]
+        xywh, score, cls = xywh[top], score[top], cls[top]
+
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    # Offset boxes by class so one NMS pass never suppresses across classes.
+    keep = nms(boxes + cls[:, None] * _MAX_WH, score, NMS_IOU)[:MAX_DET]
+    boxes, score, cls = boxes[keep], score[keep], cls[keep]
+
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= gain
+    h, w = orig_shape
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+    return np.column_stack([boxes, score, cls]).astype(np.float32)
+
+
+class _ExportedDetector:
+    """Shared letterbox → infer → NMS loop for exported YOLOv8 models.
+
+    Subclasses set ``input_shape`` as ``(batch, h, w)`` with ``None`` for
+    dynamic dimensions and implement ``_infer``.
+    """
+
+    name = "exported"
+    model_path: Path
+    input_shape: tuple[int | None, int | None, int | None]
+
+    def __init__(self, imgsz: int) -> None:
+        self.imgsz = imgsz
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, images: list[np.ndarray], conf: float) -> list[np.ndarray]:
+        fixed_batch, h, w = self.input_shape
+        dynamic = h is None or w is None
+        shape = (h or self.imgsz, w or self.imgsz)
+        prepped = [letterbox(img, shape, auto=dynamic) for img in images]
+
+        # Batch when the model allows it and all letterboxed inputs match.
+        if fixed_batch in (None, len(images)) and len({t.shape for t, _, _ in prepped}) == 1:
+            raw = list(self._infer(np.stack([t for t, _, _ in prepped])))
+        else:
+            raw = [self._infer(t[None])[0] for t, _, _ in prepped]
+        return [
+            postprocess(pred, conf, gain, pad, img.shape[:2])
+            for pred, (_, gain, pad), img in zip(raw, prepped, images)
+        ]
+
+
+def _dim(value: Any) -> int | None:
+    return value if isinstance(value, int) and value > 0 else None
+
+
+class OnnxDetector(_ExportedDetector):
+    name = "onnx"
+
+    def __init__(self, model_path: Path, imgsz: int, threads: int = 0) -> None:
+        if onnxruntime is None:
+            raise RuntimeError("Detector backend 'onnx' requested but onnxruntime is not installed")
+        super().__init__(imgsz)
+        self.model_path = model_path
+        opts = onnxruntime.SessionOptions()
+        opts.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_path), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_shape = (_dim(inp.shape[0]), _dim(inp.shape[2]), _dim(inp.shape[3]))
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoDetector(_ExportedDetector):
+    name = "openvino"
+
+    def __init__(self, model_path: Path, imgsz: int, device: str = "CPU") -> None:
+        if openvino is None:
+            raise RuntimeError("Detector backend 'openvino' requested but openvino is not installed")
+        super().__init__(imgsz)
+        # ultralytics exports a directory holding <name>.xml + .bin
+        if model_path.is_dir():
+            model_path = next(model_path.glob("*.xml"))
+        self.model_path = model_path
+        core = openvino.Core()
+        model = core.read_model(str(model_path))
+        shape = model.input(0).get_partial_shape()
+        self.input_shape = tuple(d.get_length() if d.is_static else None for d in (shape[0], shape[2], shape[3]))
+        self.compiled = core.compile_model(model, device)
+        self.output = self.compiled.output(0)
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled(batch)[self.output]
+
+
+def default_model_path(backend: str, weights: Path, precision: str = "fp32") -> Path:
+    """Where ``scripts/export_detector.py`` (or the quantize skill, for int8) puts the model."""
+    if precision == "int8":
+        if backend != "onnx":
+            raise ValueError("INT8 models are only produced for the 'onnx' backend")
+        return weights.parent / f"{weights.stem}_int8.onnx"
+    if backend == "onnx":
+        return weights.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights.parent / f"{weights.stem}_openvino_model"
+    return weights
+
+
+def make_detector(backend: str, model_path: Path, imgsz: int) -> Detector:
+    if backend == "ultralytics":
+        return UltralyticsDetector(model_path, imgsz)
+    if backend == "onnx":
+        return OnnxDetector(model_path, imgsz)
+    if backend == "openvino":
+        return OpenVinoDetector(model_path, imgsz)
+    raise ValueError(f"Unknown detector backend: {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+
+# ── Sliced inference ───────────────────────────────────────────────────────
+
+_TILE_EDGE_PX = 2  # a tile box this close to an inner tile edge was cut off
+
+
+def tile_windows(width: int, height: int, tile: int, overlap: int) -> list[tuple[int, int, int, int]]:
+    """Overlapping ``tile``-sized windows ``(x0, y0, x1, y1)`` covering the image.
+
+    Neighbours share at least *overlap* pixels; the last row and column are
+    shifted back inside the image, so every window has the same shape.  An
+    image that fits in one tile gets a single window.
+    """
+    stride = max(1, tile - overlap)
+
+    def starts(length: int) -> list[int]:
+        if length <= tile:
+            return [0]
+        out = list(range(0, length - tile, stride))
+        return out + [length - tile]
+
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def _stitch(fragments: np.ndarray) -> np.ndarray:
+    """Join same-class fragments of one object cut by tile edges into their union.
+
+    Two fragments belong together when they overlap and line up across the
+    cut (1-D IoU ≥ 0.5 along either axis); the union keeps the best score.
+    """
+    boxes = [row.copy() for row in fragments[fragments[:, 4].argsort()[::-1]]]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[5] != b[5]:
+                    continue
+                iw = min(a[2], b[2]) - max(a[0], b[0])
+                ih = min(a[3], b[3]) - max(a[1], b[1])
+                if iw <= 0 or ih <= 0:
+                    continue
+                along_x = iw / (max(a[2], b[2]) - min(a[0], b[0]))
+                along_y = ih / (max(a[3], b[3]) - min(a[1], b[1]))
+                if max(along_x, along_y) < 0.5:
+                    continue
+                a[:4] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                del boxes[j]
+                merged = True
+                break
+            if merged:
+                break
+    return np.array(boxes, dtype=np.float32).reshape(-1, 6)
+
+
+def merge_tiles(
+    full: np.ndarray,
+    tiles: list[np.ndarray],
+    windows: list[tuple[int, int, int, int]],
+    size: tuple[int, int],
+    overlap: int,
+    iou: float = NMS_IOU,
+) -> np.ndarray:
+    """Combine a whole-page pass with per-tile detections into one ``(N, 6)`` array.
+
+    Anything up to *overlap* pixels across appears whole in some tile, so
+    small objects come from the tiles and the whole-page pass only
+    contributes boxes wider or taller than *overlap*.  Whole boxes go
+    through one class-aware NMS, which removes duplicates from overlapping
+    tiles.  Boxes cut off by an inner tile edge are only used when no kept
+    box already covers most of them; fragments of one object from
+    neighbouring tiles are stitched back together first.
+    """
+    width, height = size
+    whole = [full[np.maximum(full[:, 2] - full[:, 0], full[:, 3] - full[:, 1]) > overlap]]
+    cut_parts = []
+    for boxes, (x0, y0, x1, y1) in zip(tiles, windows):
+        boxes = boxes.copy()
+        boxes[:, [0, 2]] += x0
+        boxes[:, [1, 3]] += y0
+        cut = np.zeros(len(boxes), dtype=bool)
+        if x0 > 0:
+            cut |= boxes[:, 0] <= x0 + _TILE_EDGE_PX
+        if y0 > 0:
+            cut |= boxes[:, 1] <= y0 + _TILE_EDGE_PX
+        if x1 < width:
+            cut |= boxes[:, 2] >= x1 - _TILE_EDGE_PX
+        if y1 < height:
+            cut |= boxes[:, 3] >= y1 - _TILE_EDGE_PX
+        whole.append(boxes[~cut])
+        cut_parts.append(boxes[cut])
+    offset = max(width, height) + 1  # per-class box offset, as in postprocess
+
+    kept = np.concatenate(whole).astype(np.float32)
+    kept = kept[nms(kept[:, :4] + kept[:, 5:6] * offset, kept[:, 4], iou)]
+
+    fragments = np.concatenate(cut_parts).astype(np.float32) if cut_parts else np.empty((0, 6), np.float32)
+    if len(fragments) and len(kept):
+        # Drop fragments mostly inside a kept box of the same class.
+        f, k = fragments[:, None, :], kept[None, :, :]
+        iw = np.clip(np.minimum(f[..., 2], k[..., 2]) - np.maximum(f[..., 0], k[..., 0]), 0, None)
+        ih = np.clip(np.minimum(f[..., 3], k[..., 3]) - np.maximum(f[..., 1], k[..., 1]), 0, None)
+        area = (fragments[:, 2] - fragments[:, 0]) * (fragments[:, 3] - fragments[:, 1])
+        covered = (iw * ih / (area[:, None] + 1e-9) > 0.5) & (f[..., 5] == k[..., 5])
+        fragments = fragments[~covered.any(axis=1)]
+    if len(fragments):
+        kept = np.concatenate([kept, _stitch(fragments)])
+        kept = kept[nms(kept[:, :4] + kept[:, 5:6] * offset, kept[:, 4], iou)]
+    return kept[:MAX_DET]
+
+
+def predict_tiled(
+    detector: Detector,
+    images: list[np.ndarray],
+    conf: float,
+    tile: int,
+    overlap: int,
+    batch: int = 8,
+) -> list[np.ndarray]:
+    """``detector.predict`` with sliced inference for images larger than *tile*.
+
+    Every image gets its usual whole-image pass; larger ones also get
+    ``tile_windows`` crops at native resolution.  All inputs of the call
+    are predicted together, *batch* at a time, then merged per image with
+    ``merge_tiles``.  Same return contract as ``Detector.predict``.
+    """
+    inputs: list[np.ndarray] = []
+    plans: list[list[tuple[int, int, int, int]]] = []
+    for img in images:
+        h, w = img.shape[:2]
+        windows = tile_windows(w, h, tile, overlap)
+        plans.append(windows if len(windows) > 1 else [])
+        inputs.append(img)
+        inputs.extend(np.ascontiguousarray(img[y0:y1, x0:x1]) for x0, y0, x1, y1 in plans[-1])
+
+    batch = max(1, batch)
+    raw: list[np.ndarray] = []
+    for start in range(0, len(inputs), batch):
+        raw.extend(detector.predict(inputs[start:start + batch], conf))
+
+    out: list[np.ndarray] = []
+    pos = 0
+    for img, windows in zip(images, plans):
+        full, tiles = raw[pos], raw[pos + 1:pos + 1 + len(windows)]
+        pos += 1 + len(windows)
+        out.append(merge_tiles(full, tiles, windows, (img.shape[1], img.shape[0]), overlap) if windows else full)
+    return out
@@ -0,0 +1,100 @@
+"""AcroForm helpers: map pymupdf widgets to our YOLO classes and read their values."""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+# Heuristic patterns to classify text fields more precisely
+_DATE_PATTERNS = re.compile(r"(date|dob|birth|filed|entered)", re.I)
+_DOLLAR_PATTERNS = re.compile(r"(amount|dollar|rent|cost|fee|price|damages|sum|payment|money|\$)", re.I)
+_CASE_PATTERNS = re.compile(r"(case.*num|case.*no|docket|file.*num)", re.I)
+_SIGNATURE_PATTERNS = re.compile(r"(sign|signature)", re.I)
+
+_OFF_VALUES = ("", "off", "false", "no")
+
+
+def classify_field(widget: Any) -> str:
+    """Map a pymupdf Widget to one of our YOLO class names.
+
+    Uses ``widget.field_type_string`` (e.g. "CheckBox", "Text", "Button")
+    which is reliable across pymupdf versions, rather than integer constants
+    which vary.
+    """
+    fts = (widget.field_type_string or "").lower()
+    name = (widget.field_name or "").lower()
+
+    # Checkbox / radio button
+    if fts in ("checkbox", "radiobutton"):
+        return "checkbox"
+    # Signature widget
+    if fts == "signature" or _SIGNATURE_PATTERNS.search(name):
+        return "signature"
+    # Push buttons — not a fillable field, but label as checkbox for detection
+    if fts == "button":
+        return "checkbox"
+
+    # Text or choice fields — refine by name heuristics
+    if _CASE_PATTERNS.search(name):
+        return "case_number"
+    if _DATE_PATTERNS.search(name):
+        return "date_field"
+    if _DOLLAR_PATTERNS.search(name):
+        return "dollar_amount"
+    return "text_field"
+
+
+def widget_is_checked(widget: Any) -> bool:
+    """Return whether a checkbox / radio widget is switched on.
+
+    Widgets of one button group share a field value, so a widget only counts
+    as checked when that value is its own on-state.
+    """
+    value = widget.field_value
+    if isinstance(value, bool):
+        return value
+    value = str(value or "")
+    if value.lower() in _OFF_VALUES:
+        return False
+    try:
+        on = widget.on_state()
+    except Exception:
+        on = None
+    return value == on if on else True
+
+
+def read_widget_fields(page: Any) -> list[dict[str, Any]]:
+    """Read every widget on *page* as ``{class_name, field_name, rect, value, checked}``.
+
+    ``rect`` is a ``fitz.Rect`` in PDF points; ``checked`` is only set for
+    checkbox-class widgets.  Push buttons carry no state and read as unchecked.
+    """
+    fields: list[dict[str, Any]] = []
+    for widget in page.widgets():
+        cls = classify_field(widget)
+        field: dict[str, Any] = {
+            "class_name": cls,
+            "field_name": widget.field_name,
+            "rect": widget.rect,
+        }
+        if cls == "checkbox":
+            fts = (widget.field_type_string or "").lower()
+            field["checked"] = fts != "button" and widget_is_checked(widget)
+            field["value"] = ""
+        elif cls == "signature" and (widget.field_type_string or "").lower() == "signature":
+            field["value"] = ""  # signature dictionaries aren't text
+        else:
+            field["value"] = str(widget.field_value or "").strip()
+        fields.append(field)
+    return fields
+
+
+def acroform_is_filled(doc: Any) -> bool:
+    """True when *doc* is an AcroForm with at least one filled-in widget."""
+    if not doc.is_form_pdf:
+        return False
+    for page in doc:
+        for field in read_widget_fields(page):
+            if field.get("checked") or field.get("value"):
+                return True
+    return False
@@ -0,0 +1,160 @@
+"""Persistent job queue for the extraction API, backed by SQLite.
+
+The database lives next to the job directories so queued work survives a
+server restart.  Every call opens its own connection, which keeps the store
+safe to use from the event loop, pool threads and spawned worker processes.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    num_pages   INTEGER,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_pages (
+    job_id      TEXT NOT NULL,
+    page        INTEGER NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (job_id, page)
+);
+"""
+
+
+class JobStore:
+    """FIFO job queue with per-page progress tracking."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # isolation_level=None → autocommit; multi-statement updates use
+        # explicit BEGIN IMMEDIATE so concurrent workers can't double-claim.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, job_id: str, params: dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, params, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(params), time.time()),
+            )
+
+    def claim_next(self) -> dict[str, Any] | None:
+        """Atomically move the oldest queued job to ``running`` and return it."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?",
+                (RUNNING, time.time(), row["job_id"]),
+            )
+        job = dict(row)
+        job["status"] = RUNNING
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def record_page(self, job_id: str, page: int, num_pages: int) -> None:
+        """Mark one page of a running job as finished."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO job_pages (job_id, page, finished_at) VALUES (?, ?, ?)",
+                (job_id, page, time.time()),
+            )
+            conn.execute("UPDATE jobs SET num_pages = ? WHERE job_id = ?", (num_pages, job_id))
+
+    def finish(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?",
+                (DONE, time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """Put jobs interrupted by a restart back on the queue.
+
+        Their partial page progress is cleared since the job reruns from page 0.
+        """
+        with self._transaction() as conn:
+            ids = [r["job_id"] for r in conn.execute("SELECT job_id FROM jobs WHERE status = ?", (RUNNING,))]
+            for job_id in ids:
+                conn.execute("DELETE FROM job_pages WHERE job_id = ?", (job_id,))
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL WHERE job_id = ?",
+                    (QUEUED, job_id),
+                )
+        return len(ids)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Return a job row plus the sorted list of finished page indices."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            pages = [
+                r["page"]
+                for r in conn.execute(
+                    "SELECT page FROM job_pages WHERE job_id = ? ORDER BY page", (job_id,)
+                )
+            ]
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["pages_done"] = pages
+        return job
+
+    def counts(self) -> dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
@@ -0,0 +1,78 @@
+"""Resident memory of this process, for reporting per-request peaks.
+
+``rss_bytes()`` reads the current RSS through psutil (installed with
+ultralytics), falling back to ``/proc/self/statm`` on Linux.  ``PeakRss``
+samples it on a background thread while a block runs, so short spikes
+(a full-page pixmap that lives for a few milliseconds) are caught too.
+
+RSS is process-wide: with several requests in one process (thread pool),
+a request's peak includes whatever the others held at the time.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any
+
+try:
+    import psutil
+except ImportError:  # ships with ultralytics; absent on slim onnx-only installs
+    psutil = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size of this process, or ``None`` if it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+class PeakRss:
+    """Highest RSS seen while the ``with`` block runs, sampled every *interval* seconds."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.start: int | None = None
+        self.peak: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def sample(self) -> None:
+        rss = rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self) -> PeakRss:
+        self.start = rss_bytes()
+        self.peak = self.start
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._run, name="formdex-rss", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+    def info(self) -> dict[str, Any] | None:
+        """``rss_start_mb``, ``rss_peak_mb`` and ``peak_delta_mb`` (``None`` without an RSS source)."""
+        if self.start is None or self.peak is None:
+            return None
+        return {
+            "rss_start_mb": round(self.start / 2**20, 1),
+            "rss_peak_mb": round(self.peak / 2**20, 1),
+            "peak_delta_mb": round((self.peak - self.start) / 2**20, 1),
+        }
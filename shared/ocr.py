@@ -0,0 +1,366 @@
+"""Tesseract OCR for detected form fields.
+
+OCR runs on a pool of long-lived engines.  With the ``tesserocr`` binding
+installed each engine is an in-process ``PyTessBaseAPI`` that loads its
+traineddata once and is reused across requests; without it the pool hands
+out ``pytesseract`` engines, which spawn the tesseract binary per call.
+
+Two ways to read field values:
+
+* ``extract_text_from_crop`` — one Tesseract call per field crop, with a
+  single-line page-segmentation mode and a per-class character whitelist.
+* ``ocr_fields_on_page`` — one Tesseract call for the whole page; the word
+  boxes it returns are mapped back onto each field's bbox.  This trades the
+  per-class whitelist (applied as a post-filter instead) for a single
+  process spawn per page.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Protocol
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageFilter, ImageOps
+
+try:
+    import tesserocr
+except ImportError:  # optional: pip install formdex[ocr]
+    tesserocr = None
+
+log = logging.getLogger(__name__)
+
+# Fields whose values are mostly digits / separators get a restricted charset.
+DIGIT_FIELD_CLASSES = ("date_field", "dollar_amount", "case_number")
+DIGIT_WHITELIST = "0123456789/.-$,ABCDEFGHIJKLMNOPQRSTUVWXYZ "
+
+# Crops shorter than this are upscaled (integer factor) before OCR.  The API
+# renders field regions from the PDF at this height instead, so they don't
+# need it.
+OCR_TARGET_HEIGHT = 150
+
+# Sparse-text segmentation: find as many words as possible anywhere on the
+# page without assuming a reading layout (forms are mostly scattered fields).
+PAGE_OCR_CONFIG = "--psm 11"
+
+
+@dataclass
+class Word:
+    text: str
+    conf: float
+    bbox: tuple[int, int, int, int]
+    order: tuple[int, ...]  # Tesseract reading order, sortable
+
+
+# ── Engines ────────────────────────────────────────────────────────────────
+
+
+class OcrEngine(Protocol):
+    name: str
+
+    def read_line(self, img: Image.Image, field_class: str) -> str:
+        """OCR a single-line field crop with the per-class config."""
+
+    def read_words(self, img: Image.Image) -> list[Word]:
+        """OCR a full page in sparse-text mode and return word boxes."""
+
+    def close(self) -> None: ...
+
+
+class PytesseractEngine:
+    """Fallback engine: every call forks the tesseract binary."""
+
+    name = "pytesseract"
+
+    def read_line(self, img: Image.Image, field_class: str) -> str:
+        return pytesseract.image_to_string(img, config=tesseract_config(field_class))
+
+    def read_words(self, img: Image.Image) -> list[Word]:
+        data = pytesseract.image_to_data(img, config=PAGE_OCR_CONFIG, output_type=pytesseract.Output.DICT)
+        words: list[Word] = []
+        for i, text in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            text = text.strip()
+            if conf < 0 or not text:
+                continue
+            left, top = int(data["left"][i]), int(data["top"][i])
+            words.append(Word(
+                text=text,
+                conf=conf,
+                bbox=(left, top, left + int(data["width"][i]), top + int(data["height"][i])),
+                order=(data["block_num"][i], data["par_num"][i], data["line_num"][i], data["word_num"][i]),
+            ))
+        return words
+
+    def close(self) -> None:
+        pass
+
+
+class TesserocrEngine:
+    """In-process Tesseract instance that stays initialised between calls.
+
+    Mirrors the pytesseract configs: ``--psm 7`` plus the digit whitelist
+    for single fields, ``--psm 11`` for whole pages.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng") -> None:
+        self._api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.SINGLE_LINE)
+
+    def read_line(self, img: Image.Image, field_class: str) -> str:
+        self._api.SetPageSegMode(tesserocr.PSM.SINGLE_LINE)
+        whitelist = DIGIT_WHITELIST if field_class in DIGIT_FIELD_CLASSES else ""
+        self._api.SetVariable("tessedit_char_whitelist", whitelist)
+        self._api.SetImage(img)
+        return self._api.GetUTF8Text()
+
+    def read_words(self, img: Image.Image) -> list[Word]:
+        self._api.SetPageSegMode(tesserocr.PSM.SPARSE_TEXT)
+        self._api.SetVariable("tessedit_char_whitelist", "")
+        self._api.SetImage(img)
+        self._api.Recognize()
+        words: list[Word] = []
+        level = tesserocr.RIL.WORD
+        for i, it in enumerate(tesserocr.iterate_level(self._api.GetIterator(), level)):
+            text = (it.GetUTF8Text(level) or "").strip()
+            box = it.BoundingBox(level)
+            if not text or box is None:
+                continue
+            words.append(Word(text=text, conf=float(it.Confidence(level)), bbox=tuple(box), order=(i,)))
+        return words
+
+    def close(self) -> None:
+        self._api.End()
+
+
+def _make_engine(backend: str) -> OcrEngine:
+    if backend == "pytesseract":
+        return PytesseractEngine()
+    if backend == "tesserocr":
+        if tesserocr is None:
+            raise RuntimeError("OCR backend 'tesserocr' requested but tesserocr is not installed")
+        return TesserocrEngine()
+    if backend == "auto":
+        if tesserocr is not None:
+            try:
+                return TesserocrEngine()
+            except Exception as exc:  # noqa: BLE001 — e.g. missing traineddata
+                log.warning("tesserocr unavailable (%s); falling back to pytesseract", exc)
+        return PytesseractEngine()
+    raise ValueError(f"Unknown OCR backend: {backend!r} (expected 'auto', 'tesserocr' or 'pytesseract')")
+
+
+class OcrEnginePool:
+    """Checkout pool of long-lived OCR engines.
+
+    Engines are created lazily up to ``size`` and handed to one thread at a
+    time (Tesseract instances aren't thread-safe).  They outlive the threads
+    that use them, so per-request worker threads still get a warm engine.
+
+    ``close()`` ends idle engines at once and checked-out ones as they are
+    returned, so no engine is ended while a thread is still using it; after
+    it, ``acquire()`` raises ``RuntimeError``.
+    """
+
+    def __init__(self, backend: str = "auto", size: int = 4) -> None:
+        self.backend = backend
+        self.size = max(1, size)
+        self._idle: queue.LifoQueue[OcrEngine | None] = queue.LifoQueue()  # None: closed, wake up
+        self._lock = threading.Lock()
+        self._engines: list[OcrEngine] = []
+        self._closed = False
+
+    @contextmanager
+    def acquire(self) -> Iterator[OcrEngine]:
+        engine = self._checkout()
+        try:
+            yield engine
+        finally:
+            self._release(engine)
+
+    def _checkout(self) -> OcrEngine:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("OCR engine pool is closed")
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if len(self._engines) < self.size:
+                engine = _make_engine(self.backend)
+                self._engines.append(engine)
+                return engine
+        engine = self._idle.get()
+        if engine is None:
+            self._idle.put(None)  # pass the wake-up on to the next waiter
+            raise RuntimeError("OCR engine pool is closed")
+        return engine
+
+    def _release(self, engine: OcrEngine) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.put(engine)
+                return
+            self._engines.remove(engine)
+        engine.close()
+
+    def warm(self, count: int | None = None) -> None:
+        """Create engines up front so the first requests don't pay for init."""
+        with self._lock:
+            if self._closed:
+                return
+            target = min(self.size, count or self.size)
+            while len(self._engines) < target:
+                engine = _make_engine(self.backend)
+                self._engines.append(engine)
+                self._idle.put(engine)
+
+    def stats(self) -> dict:
+        with self._lock:
+            engines = list(self._engines)
+        return {
+            "backend": engines[0].name if engines else self.backend,
+            "size": self.size,
+            "engines": len(engines),
+            "idle": self._idle.qsize(),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle = []
+            while True:
+                try:
+                    engine = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if engine is not None:
+                    idle.append(engine)
+                    self._engines.remove(engine)
+            self._idle.put(None)
+        for engine in idle:
+            engine.close()
+
+
+_pool: OcrEnginePool | None = None
+_pool_lock = threading.Lock()
+
+
+def configure_ocr_pool(backend: str = "auto", size: int = 4) -> OcrEnginePool:
+    """Replace the process-wide engine pool (closing the old one)."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, OcrEnginePool(backend=backend, size=size)
+    if old is not None:
+        old.close()
+    return _pool
+
+
+def get_ocr_pool() -> OcrEnginePool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OcrEnginePool()
+    return _pool
+
+
+# ── Field OCR ──────────────────────────────────────────────────────────────
+
+
+def tesseract_config(field_class: str) -> str:
+    """Return the single-line Tesseract config for a field class."""
+    if field_class in DIGIT_FIELD_CLASSES:
+        return f"--psm 7 -c tessedit_char_whitelist={DIGIT_WHITELIST}"
+    return "--psm 7"
+
+
+def clean_ocr_text(text: str) -> str:
+    """Strip whitespace and common OCR artifacts from field text."""
+    return text.strip().replace("|", "").replace("\\", "").strip()
+
+
+def _as_image(img: Image.Image | np.ndarray) -> Image.Image:
+    # Tesseract takes PIL images: RGB arrays (page views, crops) are copied here.
+    return Image.fromarray(img) if isinstance(img, np.ndarray) else img
+
+
+def _preprocess(img: Image.Image) -> Image.Image:
+    gray = ImageOps.grayscale(img)
+    return gray.filter(ImageFilter.SHARPEN)
+
+
+def extract_text_from_crop(crop: Image.Image | np.ndarray, field_class: str) -> str:
+    """Run Tesseract OCR on a cropped field image (PIL or RGB array)."""
+    crop = _as_image(crop)
+    w, h = crop.size
+    scale = max(1, OCR_TARGET_HEIGHT // max(h, 1))
+    if scale > 1:
+        crop = crop.resize((w * scale, h * scale), Image.LANCZOS)
+    try:
+        with get_ocr_pool().acquire() as engine:
+            text = engine.read_line(_preprocess(crop), field_class)
+        return clean_ocr_text(text)
+    except Exception:
+        return ""
+
+
+def ocr_page_words(img: Image.Image | np.ndarray) -> list[Word]:
+    """Run Tesseract once over a full page and return every recognised word."""
+    gray = _preprocess(_as_image(img))
+    with get_ocr_pool().acquire() as engine:
+        return engine.read_words(gray)
+
+
+def assign_words(words: list[Word], boxes: list[tuple[int, int, int, int]]) -> list[list[Word]]:
+    """Group words by the box containing their centre.
+
+    A word whose centre falls in several (overlapping) boxes goes to the
+    smallest one.  Words outside every box — labels, instructions — are
+    dropped.
+    """
+    assigned: list[list[Word]] = [[] for _ in boxes]
+    areas = [max(1, (x2 - x1) * (y2 - y1)) for x1, y1, x2, y2 in boxes]
+    for word in words:
+        cx = (word.bbox[0] + word.bbox[2]) / 2
+        cy = (word.bbox[1] + word.bbox[3]) / 2
+        best = -1
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            if x1 <= cx <= x2 and y1 <= cy <= y2 and (best < 0 or areas[i] < areas[best]):
+                best = i
+        if best >= 0:
+            assigned[best].append(word)
+    return assigned
+
+
+def _join_words(words: list[Word], field_class: str) -> str:
+    text = " ".join(w.text for w in sorted(words, key=lambda w: w.order))
+    if field_class in DIGIT_FIELD_CLASSES:
+        # Page OCR can't use a per-field whitelist; filter afterwards instead.
+        text = "".join(ch for ch in text.upper() if ch in DIGIT_WHITELIST)
+    return clean_ocr_text(text)
+
+
+def ocr_fields_on_page(
+    img: Image.Image | np.ndarray,
+    fields: list[tuple[tuple[int, int, int, int], str]],
+) -> list[str]:
+    """OCR every ``(bbox, field_class)`` on *img* with a single Tesseract pass.
+
+    Returns one string per field, in the order given.
+    """
+    if not fields:
+        return []
+    try:
+        words = ocr_page_words(img)
+    except Exception:
+        return [""] * len(fields)
+    grouped = assign_words(words, [bbox for bbox, _ in fields])
+    return [_join_words(ws, cls) for ws, (_, cls) in zip(grouped, fields)]
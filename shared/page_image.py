@@ -0,0 +1,81 @@
+"""Rendered pages as NumPy views of MuPDF's pixmap memory.
+
+``pix.samples`` copies a pixmap into a ``bytes`` object and
+``Image.frombytes`` copies it again; detection then made a third copy with
+``np.array(img)``.  ``PageImage.from_pixmap`` wraps the pixmap's own buffer
+instead, so a page exists once, in MuPDF's memory.  The detector reads
+``array`` directly, field crops are slices of it, and a PIL copy is made
+only where an image is encoded or drawn on (``to_pil``).
+
+Arrays made here keep their pixmap alive (it is their ``base``), so slices
+can outlive the ``PageImage`` safely.  They are read-only.  The pixmap is
+then freed by whichever thread drops the last view (the batcher, a stage
+worker); pass the lock that serialises MuPDF and that release happens
+while holding it.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, ContextManager
+
+import numpy as np
+from PIL import Image
+
+
+class _Samples:
+    """A pixmap's samples exposed through the NumPy array interface, without copying."""
+
+    def __init__(self, pix: Any, lock: ContextManager | None = None) -> None:
+        self.pixmap = pix  # owns the memory; referenced by every array built on this
+        self._lock = lock
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": (pix.height, pix.width, pix.n),
+            "strides": (pix.stride, pix.n, 1),
+            "typestr": "|u1",
+            "data": (pix.samples_ptr, True),  # read-only
+        }
+
+    def __del__(self) -> None:
+        if self._lock is not None:
+            with self._lock:
+                self.pixmap = None
+
+
+def pixmap_array(pix: Any, lock: ContextManager | None = None) -> np.ndarray:
+    """``(height, width, n)`` uint8 view of *pix*'s samples; *pix* is freed under *lock*."""
+    return np.asarray(_Samples(pix, lock))
+
+
+@dataclass(frozen=True)
+class PageImage:
+    """An RGB page as an ``(H, W, 3)`` uint8 array (usually a pixmap view)."""
+
+    array: np.ndarray
+
+    @classmethod
+    def from_pixmap(cls, pix: Any, lock: ContextManager | None = None) -> PageImage:
+        return cls(pixmap_array(pix, lock))
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """``(width, height)``, like ``PIL.Image.size``."""
+        return self.width, self.height
+
+    def crop(self, box: tuple[float, float, float, float]) -> np.ndarray:
+        """The pixels inside *box* (``x0, y0, x1, y1``, clipped to the page) as a view."""
+        x0, y0, x1, y1 = (int(round(v)) for v in box)
+        return self.array[max(0, y0):max(0, y1), max(0, x0):max(0, x1)]
+
+    def to_pil(self) -> Image.Image:
+        """A PIL copy of the page, for drawing on and encoding."""
+        return Image.fromarray(self.array)
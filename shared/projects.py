@@ -0,0 +1,277 @@
+"""Form projects served side by side by the extraction API.
+
+Every ``runs/<project>/`` holding a ``classes.txt`` is a project with its
+own weights (``weights/best.pt``), class list, optional ``colors.json``
+(class name → ``[r, g, b]``) and optional ``form_template.pdf``, whose
+first page is the reference for routing uploads by layout.
+
+Loaded models live in a ``ModelCache``: one ``ModelRegistry`` per project,
+unloaded least-recently-used first when too many are resident, and after
+sitting idle, unless pinned.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import fitz  # pymupdf
+from PIL import Image
+
+from shared.registry import ModelRegistry
+
+# Default class colours, by class id (ud100: text_field, checkbox, date_field,
+# dollar_amount, signature, case_number).
+PALETTE = [
+    (30, 144, 255),   # dodger blue
+    (0, 200, 83),     # green
+    (255, 165, 0),    # orange
+    (220, 20, 60),    # crimson
+    (148, 103, 189),  # purple
+    (0, 191, 255),    # deep sky blue
+]
+
+_HASH_SIZE = 16  # layout hash is _HASH_SIZE² bits
+_THUMB_PX = 96  # longer side of the grey thumbnail the hash is taken from
+_SIZE_TOLERANCE = 2.0  # points; pages of one form are the same size
+
+
+@dataclass(frozen=True)
+class LayoutSignature:
+    """Page size plus a difference hash of a tiny greyscale render."""
+
+    width: float
+    height: float
+    bits: int
+
+    def distance(self, other: LayoutSignature) -> int | None:
+        """Differing hash bits, or ``None`` when the page sizes don't match."""
+        if abs(self.width - other.width) > _SIZE_TOLERANCE or abs(self.height - other.height) > _SIZE_TOLERANCE:
+            return None
+        return (self.bits ^ other.bits).bit_count()
+
+
+def layout_signature(page: Any) -> LayoutSignature:
+    """Fingerprint a page's layout for routing (a ~96 px render, no OCR).
+
+    The hash compares neighbouring cells of a ``17 × 16`` downscale, so it
+    follows the printed boxes and rules of a form and barely moves when the
+    fields are filled in.
+    """
+    rect = page.rect
+    zoom = _THUMB_PX / max(rect.width, rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    thumb = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    cells = list(thumb.resize((_HASH_SIZE + 1, _HASH_SIZE), Image.BOX).getdata())
+    bits = 0
+    for row in range(_HASH_SIZE):
+        for col in range(_HASH_SIZE):
+            i = row * (_HASH_SIZE + 1) + col
+            bits = (bits << 1) | (cells[i + 1] > cells[i])
+    return LayoutSignature(round(rect.width, 1), round(rect.height, 1), bits)
+
+
+@dataclass
+class Project:
+    name: str
+    root: Path
+    classes: list[str]
+    colors: list[tuple[int, int, int]]  # by class id
+    _signature: LayoutSignature | None = field(default=None, repr=False)
+
+    @property
+    def weights(self) -> Path:
+        return self.root / "weights" / "best.pt"
+
+    @property
+    def template(self) -> Path:
+        return self.root / "form_template.pdf"
+
+    def color(self, cls_name: str) -> tuple[int, int, int]:
+        cls_id = self.classes.index(cls_name) if cls_name in self.classes else 0
+        return self.colors[cls_id % len(self.colors)]
+
+    def signature(self) -> LayoutSignature | None:
+        """Layout signature of the template's first page (``None`` without a template)."""
+        if self._signature is None and self.template.exists():
+            doc = fitz.open(str(self.template))
+            try:
+                self._signature = layout_signature(doc[0])
+            finally:
+                doc.close()
+        return self._signature
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "classes": self.classes,
+            "weights": str(self.weights),
+            "routable": self.template.exists(),
+        }
+
+
+def load_project(root: Path) -> Project:
+    classes = root.joinpath("classes.txt").read_text().strip().splitlines()
+    colors = [PALETTE[i % len(PALETTE)] for i in range(len(classes))]
+    colors_file = root / "colors.json"
+    if colors_file.exists():
+        custom = json.loads(colors_file.read_text())
+        colors = [tuple(custom.get(name, c)) for name, c in zip(classes, colors)]
+    return Project(name=root.name, root=root, classes=classes, colors=colors or PALETTE)
+
+
+def discover_projects(runs_dir: Path) -> dict[str, Project]:
+    """Every ``runs_dir/<name>/`` with a ``classes.txt``, by name."""
+    if not runs_dir.is_dir():
+        return {}
+    return {
+        p.name: load_project(p)
+        for p in sorted(runs_dir.iterdir())
+        if p.joinpath("classes.txt").is_file()
+    }
+
+
+def route(
+    signature: LayoutSignature, projects: list[Project], max_distance: int
+) -> tuple[Project | None, int | None]:
+    """The project whose template is closest to *signature*, if within *max_distance* bits."""
+    best: Project | None = None
+    best_distance: int | None = None
+    for project in projects:
+        ref = project.signature()
+        distance = ref.distance(signature) if ref is not None else None
+        if distance is not None and distance <= max_distance and (best_distance is None or distance < best_distance):
+            best, best_distance = project, distance
+    return best, best_distance
+
+
+class ModelCache:
+    """Least-recently-used set of per-project model registries.
+
+    ``factory(name)`` builds a project's ``ModelRegistry`` (which loads its
+    weights lazily).  After every ``get``, unpinned registries are unloaded,
+    oldest first, while more than ``max_models`` are resident or their
+    combined size (on-disk model size, history included) is over
+    ``max_bytes``.  A registry that hasn't loaded yet counts at the size of
+    its initial weights, so the cap holds before the new model is in memory.  ``sweep()`` (also run on every ``get``) unloads those
+    idle for ``idle_sec``.
+    Requests that already pinned a model version keep it until they finish.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], ModelRegistry],
+        max_models: int,
+        max_bytes: int,
+        idle_sec: float = 0,
+        pinned: set[str] | None = None,
+    ) -> None:
+        self._factory = factory
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.idle_sec = idle_sec
+        self.pinned = set(pinned or ())
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, ModelRegistry] = OrderedDict()
+        self._last_used: dict[str, float] = {}
+        self.unloads = 0
+
+    def get(self, name: str) -> ModelRegistry:
+        self.sweep()
+        with self._lock:
+            registry = self._entries.get(name)
+            if registry is None:
+                registry = self._entries[name] = self._factory(name)
+            self._entries.move_to_end(name)
+            self._last_used[name] = time.time()
+            evicted = self._evict(keep=name)
+        for old in evicted:
+            old.close()
+        return registry
+
+    def peek(self, name: str) -> ModelRegistry | None:
+        """The project's registry if it is resident (doesn't load or touch it)."""
+        with self._lock:
+            return self._entries.get(name)
+
+    def _evict(self, keep: str) -> list[ModelRegistry]:
+        candidates = [n for n in self._entries if n != keep and n not in self.pinned]
+        total = sum(r.expected_nbytes() for r in self._entries.values())
+        evicted = []
+        while candidates and (len(self._entries) > self.max_models or (self.max_bytes and total > self.max_bytes)):
+            registry = self._pop(candidates.pop(0))
+            total -= registry.expected_nbytes()
+            evicted.append(registry)
+        return evicted
+
+    def _pop(self, name: str) -> ModelRegistry:
+        self._last_used.pop(name, None)
+        self.unloads += 1
+        return self._entries.pop(name)
+
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            registry = self._pop(name) if name in self._entries else None
+        if registry is None:
+            return False
+        registry.close()
+        return True
+
+    def sweep(self) -> list[str]:
+        """Unload unpinned models unused for ``idle_sec``; returns their names."""
+        if self.idle_sec <= 0:
+            return []
+        cutoff = time.time() - self.idle_sec
+        with self._lock:
+            idle = [n for n, t in self._last_used.items() if t < cutoff and n not in self.pinned]
+            evicted = [self._pop(n) for n in idle]
+        for registry in evicted:
+            registry.close()
+        return idle
+
+    def pin(self, name: str) -> None:
+        with self._lock:
+            self.pinned.add(name)
+
+    def unpin(self, name: str) -> None:
+        with self._lock:
+            self.pinned.discard(name)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+            last_used = dict(self._last_used)
+            pinned = sorted(self.pinned)
+        resident = {
+            name: {
+                "loaded": registry.loaded,
+                "pinned": name in pinned,
+                "mb": round(registry.nbytes() / 2**20, 1),
+                "idle_sec": round(now - last_used.get(name, now), 1),
+            }
+            for name, registry in entries
+        }
+        return {
+            "resident": resident,
+            "pinned": pinned,
+            "total_mb": round(sum(r["mb"] for r in resident.values()), 1),
+            "max_models": self.max_models,
+            "max_mb": self.max_bytes >> 20,
+            "idle_sec": self.idle_sec,
+            "unloads": self.unloads,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            registries = list(self._entries.values())
+            self._entries.clear()
+            self._last_used.clear()
+        for registry in registries:
+            registry.close()
@@ -0,0 +1,165 @@
+"""Versioned detector registry with background loading and atomic swaps.
+
+A new weights file is loaded and validated off the request path; only once
+it passes does it replace the current version, in a single reference swap.
+Callers pin the version they started with (``current()``), so requests that
+are already running finish on the model they began with.  The last few
+versions stay loaded for instant rollback.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from shared.cache import dir_size, file_digest
+
+
+def model_digest(path: Path) -> str:
+    """Content digest of a weights file (or of the .bin of an OpenVINO export dir)."""
+    if path.is_dir():
+        path = next(path.glob("*.bin"), path / "missing")
+    return file_digest(path)
+
+
+def model_bytes(path: Path) -> int:
+    """On-disk size of a model, used as a proxy for its resident memory."""
+    return dir_size(path) if path.is_dir() else path.stat().st_size
+
+
+@dataclass
+class ModelVersion:
+    version: str  # short content digest: same file → same version
+    digest: str
+    path: Path
+    detector: Any
+    nbytes: int = 0
+    loaded_at: float = field(default_factory=time.time)
+
+    def info(self) -> dict[str, Any]:
+        return {"version": self.version, "path": str(self.path), "mb": round(self.nbytes / 2**20, 1),
+                "loaded_at": self.loaded_at}
+
+
+class ModelRegistry:
+    """Current detector plus up to ``keep`` previous versions.
+
+    ``load(path)`` builds a detector; ``validate(detector)`` raises if it is
+    unfit to serve (run on the loading thread, before the swap).
+    """
+
+    def __init__(
+        self,
+        initial: Path,
+        load: Callable[[Path], Any],
+        validate: Callable[[Any], None] | None = None,
+        keep: int = 2,
+    ) -> None:
+        self.initial = initial
+        self._load = load
+        self._validate = validate
+        self._lock = threading.Lock()
+        self._current: ModelVersion | None = None
+        self._previous: deque[ModelVersion] = deque(maxlen=max(0, keep))
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="formdex-model-load")
+        self._last_load: dict[str, Any] | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def current(self) -> ModelVersion:
+        """The version new work should use (loads the initial weights on first call)."""
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._build(self.initial)
+                current = self._current
+        return current
+
+    def _build(self, path: Path) -> ModelVersion:
+        digest = model_digest(path)
+        return ModelVersion(
+            version=digest[:12], digest=digest, path=path, detector=self._load(path), nbytes=model_bytes(path)
+        )
+
+    def activate(self, path: Path) -> ModelVersion:
+        """Load, validate and swap in *path* (blocking)."""
+        candidate = self._build(path)
+        if self._validate is not None:
+            self._validate(candidate.detector)
+        with self._lock:
+            if self._current is not None and self._current.version != candidate.version:
+                self._previous.appendleft(self._current)
+            self._current = candidate
+        return candidate
+
+    def load_async(self, path: Path) -> Future:
+        """Activate *path* on the background loader; progress shows in ``status()``."""
+        self._last_load = {"path": str(path), "state": "loading", "version": None, "error": None,
+                           "started_at": time.time()}
+        record = self._last_load
+
+        def run() -> ModelVersion:
+            try:
+                version = self.activate(path)
+            except Exception as exc:
+                record.update(state="failed", error=f"{type(exc).__name__}: {exc}")
+                raise
+            record.update(state="active", version=version.version)
+            return version
+
+        return self._loader.submit(run)
+
+    def rollback(self, version: str | None = None) -> ModelVersion:
+        """Swap back to the most recent previous version, or to *version*."""
+        with self._lock:
+            if not self._previous:
+                raise LookupError("No previous model version to roll back to")
+            if version is None:
+                target = self._previous.popleft()
+            else:
+                matches = [v for v in self._previous if v.version == version]
+                if not matches:
+                    raise LookupError(f"Model version {version!r} is not loaded")
+                target = matches[0]
+                self._previous.remove(target)
+            if self._current is not None:
+                self._previous.appendleft(self._current)
+            self._current = target
+        return target
+
+    def nbytes(self) -> int:
+        """Size of every loaded version (current plus rollback history)."""
+        with self._lock:
+            versions = [self._current, *self._previous] if self._current else list(self._previous)
+        return sum(v.nbytes for v in versions)
+
+    def expected_nbytes(self) -> int:
+        """``nbytes()``, or before the first load the size the initial weights will take."""
+        if self.loaded:
+            return self.nbytes()
+        try:
+            return model_bytes(self.initial)
+        except OSError:
+            return 0
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            current, previous = self._current, list(self._previous)
+        return {
+            "current": current.info() if current else None,
+            "previous": [v.info() for v in previous],
+            "keep": self._previous.maxlen,
+            "last_load": dict(self._last_load) if self._last_load else None,
+        }
+
+    def close(self) -> None:
+        self._loader.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,104 @@
+"""Run work items through a chain of thread-backed stages.
+
+Each stage has its own worker count and reads from a bounded queue, so a
+slow stage applies back-pressure upstream instead of letting intermediate
+results (e.g. rendered page images) pile up in memory.  Throughput ends up
+limited by the slowest stage rather than the sum of all stages.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+_DONE = object()  # end-of-stream sentinel, one per downstream worker
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+
+
+def run_stages(
+    items: Iterable[Any],
+    stages: list[Stage],
+    queue_size: int = 2,
+) -> list[Any]:
+    """Feed *items* through *stages* and return the last stage's outputs.
+
+    Outputs are returned in completion order, which differs from input order
+    whenever a stage has more than one worker.
+
+    The first exception raised by any stage stops the feed, lets the items
+    already in flight drain without further work, and is re-raised here.
+    """
+    if not stages:
+        return list(items)
+
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    outputs: list[Any] = []
+    outputs_lock = threading.Lock()
+    errors: list[BaseException] = []
+    abort = threading.Event()
+
+    # Number of stage-i workers still running; the last one to finish hands
+    # one sentinel to each worker of stage i + 1.
+    remaining = [max(1, s.workers) for s in stages]
+    remaining_lock = threading.Lock()
+
+    def worker(idx: int) -> None:
+        stage = stages[idx]
+        inbox = queues[idx]
+        outbox = queues[idx + 1] if idx + 1 < len(stages) else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if abort.is_set():
+                continue  # drain without working so upstream never blocks
+            try:
+                result = stage.fn(item)
+                if outbox is not None:
+                    outbox.put(result)
+                else:
+                    with outputs_lock:
+                        outputs.append(result)
+            except BaseException as exc:  # noqa: BLE001 — re-raised in caller
+                with outputs_lock:
+                    errors.append(exc)
+                abort.set()
+
+        with remaining_lock:
+            remaining[idx] -= 1
+            last = remaining[idx] == 0
+        if last and outbox is not None:
+            for _ in range(max(1, stages[idx + 1].workers)):
+                outbox.put(_DONE)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"stage-{s.name}-{w}", daemon=True)
+        for i, s in enumerate(stages)
+        for w in range(max(1, s.workers))
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        for item in items:
+            if abort.is_set():
+                break
+            queues[0].put(item)
+    finally:
+        for _ in range(max(1, stages[0].workers)):
+            queues[0].put(_DONE)
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
+    return outputs
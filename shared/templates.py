@@ -0,0 +1,237 @@
+"""Registration-based extraction for known form templates.
+
+A project's ``form_template.pdf`` already says where every field is: its
+widget rects.  A flattened or scanned copy of the same form is matched to
+the right template page by layout hash, aligned to it with ORB features and
+a RANSAC homography, and the widget rects are projected onto the page, so
+those fields need no detector pass.  When too few features agree the
+caller falls back to YOLO.
+
+Needs OpenCV (installed with ultralytics); without it ``load_template``
+raises and callers skip registration.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import fitz  # pymupdf
+import numpy as np
+from PIL import Image
+
+from shared.forms import read_widget_fields
+from shared.projects import LayoutSignature, layout_signature
+
+try:
+    import cv2
+except ImportError:  # ships with ultralytics; absent on slim onnx-only installs
+    cv2 = None
+
+REG_DPI = 100  # resolution features are matched at
+_ORB_FEATURES = 1500
+_LOWE_RATIO = 0.75
+_RANSAC_PX = 3.0
+# A page that scales or shears further than this from its template is a
+# bad fit, however many matches agree.
+_MIN_SCALE, _MAX_SCALE = 0.5, 2.0
+_MAX_PERSPECTIVE = 1e-3
+
+
+@dataclass
+class TemplateField:
+    class_name: str
+    field_name: str
+    rect: tuple[float, float, float, float]  # PDF points, in the rotated page as rendered
+
+
+@dataclass
+class TemplatePage:
+    index: int
+    signature: LayoutSignature
+    fields: list[TemplateField]
+    keypoints: np.ndarray  # (N, 2) float32, REG_DPI pixels
+    descriptors: np.ndarray
+
+
+@dataclass
+class FormTemplate:
+    path: Path
+    pages: list[TemplatePage]
+
+    def match_page(
+        self, signature: LayoutSignature, max_distance: int, index: int | None = None
+    ) -> tuple[TemplatePage | None, int | None]:
+        """The template page laid out most like *signature*, if within *max_distance* bits.
+
+        Failing that, the template page at *index*: skew and scan noise can
+        push the hash past the limit, and the homography check that follows
+        rejects a wrong guess anyway.
+        """
+        best: TemplatePage | None = None
+        best_distance: int | None = None
+        for page in self.pages:
+            distance = page.signature.distance(signature)
+            if distance is not None and distance <= max_distance and (best_distance is None or distance < best_distance):
+                best, best_distance = page, distance
+        if best is None and index is not None:
+            best = next((page for page in self.pages if page.index == index), None)
+        return best, best_distance
+
+
+@dataclass
+class Alignment:
+    homography: np.ndarray  # template REG_DPI pixels → page REG_DPI pixels
+    inliers: int
+    matches: int
+
+    @property
+    def inlier_ratio(self) -> float:
+        return self.inliers / self.matches if self.matches else 0.0
+
+    def info(self) -> dict[str, Any]:
+        return {"inliers": self.inliers, "matches": self.matches, "inlier_ratio": round(self.inlier_ratio, 3)}
+
+
+def _features(gray: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+    orb = cv2.ORB_create(nfeatures=_ORB_FEATURES)
+    keypoints, descriptors = orb.detectAndCompute(gray, None)
+    return np.float32([k.pt for k in keypoints]).reshape(-1, 2), descriptors
+
+
+def to_gray(img: Image.Image | np.ndarray, dpi: float) -> np.ndarray:
+    """Greyscale copy of a page (PIL or RGB array) rendered at *dpi*, resampled to ``REG_DPI``."""
+    if isinstance(img, np.ndarray):
+        gray = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_RGB2GRAY))  # one byte per pixel, no RGB copy
+    else:
+        gray = img.convert("L")
+    if dpi != REG_DPI:
+        gray = gray.resize((round(gray.width * REG_DPI / dpi), round(gray.height * REG_DPI / dpi)), Image.BILINEAR)
+    return np.asarray(gray)
+
+
+def load_template(path: Path) -> FormTemplate:
+    """Read widget rects and matching features from every page of *path*.
+
+    Must be called wherever the caller serialises MuPDF access.
+    """
+    if cv2 is None:
+        raise RuntimeError("Template registration needs OpenCV (pip install opencv-python-headless)")
+    pages: list[TemplatePage] = []
+    doc = fitz.open(str(path))
+    try:
+        for page in doc:
+            # Widget rects are unrotated; features come from the rotated render.
+            fields = [
+                TemplateField(f["class_name"], f["field_name"] or "", tuple(fitz.Rect(f["rect"]) * page.rotation_matrix))
+                for f in read_widget_fields(page)
+            ]
+            if not fields:
+                continue
+            pix = page.get_pixmap(matrix=fitz.Matrix(REG_DPI / 72, REG_DPI / 72), colorspace=fitz.csGRAY)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+            keypoints, descriptors = _features(gray)
+            pages.append(TemplatePage(page.number, layout_signature(page), fields, keypoints, descriptors))
+    finally:
+        doc.close()
+    return FormTemplate(path, pages)
+
+
+def align(gray: np.ndarray, template_page: TemplatePage) -> Alignment | None:
+    """Estimate the homography from *template_page* onto a ``REG_DPI`` greyscale page.
+
+    Returns ``None`` when there aren't enough matches to fit one, or the fit
+    is geometrically implausible.
+    """
+    keypoints, descriptors = _features(gray)
+    if descriptors is None or template_page.descriptors is None:
+        return None
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    pairs = matcher.knnMatch(template_page.descriptors, descriptors, k=2)
+    good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < _LOWE_RATIO * p[1].distance]
+    if len(good) < 4:
+        return None
+    src = template_page.keypoints[[m.queryIdx for m in good]]
+    dst = keypoints[[m.trainIdx for m in good]]
+    homography, mask = cv2.findHomography(src, dst, cv2.RANSAC, _RANSAC_PX)
+    if homography is None:
+        return None
+    det = np.linalg.det(homography[:2, :2])
+    scale = det ** 0.5 if det > 0 else 0.0
+    if not _MIN_SCALE <= scale <= _MAX_SCALE or np.abs(homography[2, :2]).max() > _MAX_PERSPECTIVE:
+        return None
+    return Alignment(homography, int(mask.sum()), len(good))
+
+
+def project_fields(
+    template_page: TemplatePage,
+    alignment: Alignment,
+    dpi: float,
+    size: tuple[int, int],
+    classes: list[str],
+) -> list[dict]:
+    """Map the template's widget rects onto a page rendered at *dpi* (*size* = width, height).
+
+    Returns detection dicts (``class_id``, ``class_name``, ``confidence``,
+    ``bbox``, ``field_name``) like the detector's; ``confidence`` is the
+    alignment's inlier ratio.
+    """
+    to_reg = REG_DPI / 72
+    to_page = dpi / REG_DPI
+    width, height = size
+    detections: list[dict] = []
+    for field in template_page.fields:
+        x0, y0, x1, y1 = field.rect
+        corners = np.float32([[x0, y0], [x1, y0], [x1, y1], [x0, y1]]).reshape(-1, 1, 2) * to_reg
+        mapped = cv2.perspectiveTransform(corners, alignment.homography).reshape(-1, 2) * to_page
+        bx0, by0 = mapped.min(axis=0)
+        bx1, by1 = mapped.max(axis=0)
+        bbox = [
+            max(0, min(int(bx0), width)),
+            max(0, min(int(by0), height)),
+            max(0, min(int(round(bx1)), width)),
+            max(0, min(int(round(by1)), height)),
+        ]
+        if bbox[2] - bbox[0] < 2 or bbox[3] - bbox[1] < 2:
+            continue  # projected off the page
+        detections.append({
+            "class_id": classes.index(field.class_name) if field.class_name in classes else -1,
+            "class_name": field.class_name,
+            "confidence": round(alignment.inlier_ratio, 3),
+            "bbox": bbox,
+            "field_name": field.field_name,
+        })
+    return detections
+
+
+class RegistrationStats:
+    """Process-wide counters: pages registered against a template vs. sent to YOLO."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._registered = 0
+        self._fallbacks = 0
+        self._seconds = 0.0
+
+    def record(self, registered: bool, seconds: float) -> None:
+        with self._lock:
+            if registered:
+                self._registered += 1
+            else:
+                self._fallbacks += 1
+            self._seconds += seconds
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            attempts = self._registered + self._fallbacks
+            return {
+                "registered": self._registered,
+                "fallbacks": self._fallbacks,
+                "avg_ms": round(self._seconds / attempts * 1000, 1) if attempts else None,
+            }
+
+
+registration_stats = RegistrationStats()
+
@@ -0,0 +1,68 @@
+"""Read field values from a PDF's embedded text layer.
+
+Flattened digital PDFs lose their AcroForm widgets but usually keep the
+filled-in values as real text.  Reading that text back is exact and costs
+one ``page.get_text("words")`` per page, against one Tesseract call per
+field (or page) on a rendered image.
+
+Word boxes stay in unrotated PDF points; callers map detection bboxes back
+from render pixels with the inverse of ``page.rotation_matrix`` times the
+render matrix.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+from shared.ocr import Word, assign_words
+
+
+def page_words(page: Any) -> list[Word]:
+    """Every word of *page*'s text layer, bbox in unrotated PDF points.
+
+    Must be called wherever the caller serialises MuPDF access.
+    """
+    words: list[Word] = []
+    for x0, y0, x1, y1, text, block, line, word in page.get_text("words"):
+        text = text.strip()
+        if text:
+            words.append(Word(text=text, conf=100.0, bbox=(x0, y0, x1, y1), order=(block, line, word)))
+    return words
+
+
+def text_in_boxes(words: list[Word], boxes: list[tuple[float, float, float, float]]) -> list[str]:
+    """Join the words whose centre falls in each box, in reading order.
+
+    Uses the same smallest-box-wins assignment as page-mode OCR, so a word
+    never ends up in two overlapping fields.
+    """
+    grouped = assign_words(words, boxes)
+    return [" ".join(w.text for w in sorted(ws, key=lambda w: w.order)) for ws in grouped]
+
+
+class TextLayerStats:
+    """Process-wide counters: fields read from the text layer, OCR calls saved."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pages = 0
+        self._fields = 0
+        self._ocr_calls_avoided = 0
+
+    def record(self, fields: int, ocr_calls_avoided: int) -> None:
+        with self._lock:
+            self._pages += 1
+            self._fields += fields
+            self._ocr_calls_avoided += ocr_calls_avoided
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "pages": self._pages,
+                "fields": self._fields,
+                "ocr_calls_avoided": self._ocr_calls_avoided,
+            }
+
+
+text_layer_stats = TextLayerStats()